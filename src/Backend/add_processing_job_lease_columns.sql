@@ -0,0 +1,65 @@
+-- Durable job queue: lease / heartbeat columns on ProcessingJobs
+-- A worker claims a job by setting LeaseOwner + LeaseExpiresAt in one
+-- UPDATE ... OUTPUT statement and keeps extending the lease while it runs.
+-- Jobs whose lease expired (crashed process / restart) are picked up again
+-- by the recovery sweep and resume from LastCompletedStage.
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'SessionID'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ADD SessionID INT NULL;
+END
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'LeaseOwner'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ADD LeaseOwner NVARCHAR(100) NULL;
+END
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'LeaseExpiresAt'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ADD LeaseExpiresAt DATETIME NULL;
+END
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'HeartbeatAt'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ADD HeartbeatAt DATETIME NULL;
+END
+
+-- 'transcribed' once TranscriptURL is stored, 'saved' once the Sessions row exists
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'LastCompletedStage'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ADD LastCompletedStage NVARCHAR(20) NULL;
+END
+GO
+
+-- Recovery sweep: runnable jobs whose lease is missing or expired
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_ProcessingJobs_Status_LeaseExpiresAt'
+)
+BEGIN
+    CREATE INDEX IX_ProcessingJobs_Status_LeaseExpiresAt
+        ON ProcessingJobs (Status, LeaseExpiresAt)
+        INCLUDE (LeaseOwner, CreatedAt);
+END
+
+PRINT 'Lease columns added successfully to ProcessingJobs table';
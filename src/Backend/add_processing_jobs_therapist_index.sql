@@ -0,0 +1,18 @@
+-- "My active jobs": a therapist's pending / processing jobs, newest first
+-- WHERE TherapistEmail = @email AND Status IN ('pending', 'processing')
+-- ORDER BY CreatedAt DESC
+-- becomes two short range seeks instead of a scan of ProcessingJobs. The
+-- small status columns are included so most of the row comes from the
+-- index; only TranscriptURL / TranscriptionError need a key lookup.
+
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_ProcessingJobs_TherapistEmail_Status_CreatedAt'
+)
+BEGIN
+    CREATE INDEX IX_ProcessingJobs_TherapistEmail_Status_CreatedAt
+        ON ProcessingJobs (TherapistEmail, Status, CreatedAt)
+        INCLUDE (TranscriptionStatus, Progress, UpdatedAt, CompletedAt, RetryCount, MaxRetries);
+END
+
+PRINT 'Therapist/status index added to ProcessingJobs table';
@@ -0,0 +1,24 @@
+-- Sentiment counters stored next to each session
+-- Written when an analysis is produced (routes/sentiment_analysis.py), so the
+-- dashboard trend (/sentiment/trend) is a single query and never reads the
+-- analysis JSON blobs. Existing rows: run backfill_session_sentiment_counts.py
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'Sessions' 
+    AND COLUMN_NAME = 'PositiveCount'
+)
+BEGIN
+    ALTER TABLE Sessions ADD PositiveCount INT NULL;
+END
+
+IF NOT EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'Sessions' 
+    AND COLUMN_NAME = 'NegativeCount'
+)
+BEGIN
+    ALTER TABLE Sessions ADD NegativeCount INT NULL;
+END
+
+PRINT 'Sentiment count columns added successfully to Sessions table';
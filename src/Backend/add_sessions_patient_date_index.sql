@@ -0,0 +1,25 @@
+-- Keyset pagination of a patient's session history (/patientsdb/sessions)
+-- Matches the ORDER BY SessionDate DESC, SessionID DESC seek, so each page
+-- is an index range scan no matter how many sessions the patient has.
+
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_Sessions_PatientID_SessionDate'
+)
+BEGIN
+    CREATE INDEX IX_Sessions_PatientID_SessionDate
+        ON Sessions (PatientID, SessionDate DESC, SessionID DESC)
+        INCLUDE (TherapistID);
+END
+
+-- Patient lookups by email (every patient endpoint starts with one)
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_Patients_PatientEmail'
+)
+BEGIN
+    CREATE INDEX IX_Patients_PatientEmail
+        ON Patients (PatientEmail);
+END
+
+PRINT 'Session history indexes created successfully';
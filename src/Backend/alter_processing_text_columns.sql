@@ -0,0 +1,36 @@
+-- ProcessingJobs: NTEXT -> NVARCHAR(MAX) for SessionNotes and TranscriptionError
+-- NTEXT always lives in separate LOB pages, so every row read (status
+-- polls, the worker loading a job) paid extra page reads for it, and NTEXT
+-- can't be used in OUTPUT clauses or compared. NVARCHAR(MAX) keeps values
+-- up to ~8000 bytes in the row itself.
+
+IF EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'SessionNotes'
+    AND DATA_TYPE = 'ntext'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ALTER COLUMN SessionNotes NVARCHAR(MAX) NULL;
+END
+
+IF EXISTS (
+    SELECT * FROM INFORMATION_SCHEMA.COLUMNS 
+    WHERE TABLE_NAME = 'ProcessingJobs' 
+    AND COLUMN_NAME = 'TranscriptionError'
+    AND DATA_TYPE = 'ntext'
+)
+BEGIN
+    ALTER TABLE ProcessingJobs ALTER COLUMN TranscriptionError NVARCHAR(MAX) NULL;
+END
+GO
+
+-- Changing the type leaves existing values where they were (off-row);
+-- rewriting them moves the ones that fit back into the row
+UPDATE ProcessingJobs
+SET SessionNotes = SessionNotes,
+    TranscriptionError = TranscriptionError
+WHERE SessionNotes IS NOT NULL OR TranscriptionError IS NOT NULL;
+GO
+
+PRINT 'ProcessingJobs text columns converted to NVARCHAR(MAX)';
@@ -0,0 +1,60 @@
+"""
+One-off backfill for Sessions.PositiveCount / NegativeCount
+Run after add_session_sentiment_counts.sql. Reads each existing analysis
+JSON once and stores its counters, so /sentiment/trend never has to.
+Safe to re-run: only rows with missing counters are touched.
+"""
+
+import sys
+import os
+
+# Add the Backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from services.db_pool import pooled_connection
+from services.azure_sentiment import get_analysis_from_blob
+from services.sql_service import update_session_sentiment_counts
+
+BATCH_SIZE = 200
+
+
+def backfill_sentiment_counts():
+    done = failed = 0
+    last_id = 0
+    while True:
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT TOP (%s) SessionID, analysis
+                FROM dbo.Sessions
+                WHERE SessionID > %s
+                  AND analysis LIKE 'http%%'
+                  AND (PositiveCount IS NULL OR NegativeCount IS NULL)
+                ORDER BY SessionID
+                """,
+                (BATCH_SIZE, last_id),
+            )
+            rows = cur.fetchall()
+        if not rows:
+            break
+
+        for session_id, analysis_url in rows:
+            last_id = session_id
+            try:
+                data = get_analysis_from_blob(analysis_url)
+                update_session_sentiment_counts(
+                    session_id, int(data["total_positive"]), int(data["total_negative"])
+                )
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ Session {session_id}: {e}")
+
+        print(f"... {done} sessions backfilled so far")
+
+    print(f"✅ Backfill finished: {done} updated, {failed} failed")
+
+
+if __name__ == "__main__":
+    backfill_sentiment_counts()
@@ -0,0 +1,93 @@
+"""
+Benchmark for the patient autocomplete index (services/patient_search.py)
+Builds an index of synthetic patients (Hebrew + Latin names) and replays
+queries one keystroke at a time, like the dashboard autocomplete does.
+No database needed.
+
+    python benchmark_patient_search.py [--patients 100000] [--queries 300]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import os
+import time
+
+# Add the Backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+
+from services.patient_search import PatientSearchIndex
+
+HEBREW_FIRST = ["נועה", "יוסף", "מרים", "אברהם", "שרה", "דוד", "רחל", "משה",
+                "תמר", "אליהו", "שִׁירָה", "יעקב", "לאה", "נתן", "מיכל", "עמית"]
+HEBREW_LAST = ["כהן", "לוי", "מזרחי", "פרץ", "ביטון", "דהן", "אברהם", "פרידמן",
+               "שלום", "אזולאי", "גבאי", "חדד", "קליין", "רוזן", "בן דוד", "כץ"]
+LATIN_FIRST = ["Dana", "Noam", "Maya", "Ethan", "Zoë", "José", "Amélie", "Liam",
+               "Olivia", "Ariel", "Yael", "Daniel", "Sofía", "Lucas", "Ella", "Omer"]
+LATIN_LAST = ["Cohen", "Levi", "Smith", "García", "Müller", "Dubois", "Rossi",
+              "Friedman", "O'Brien", "Nguyen", "Katz", "Rosen", "Peretz", "Klein"]
+DOMAINS = ["gmail.com", "walla.co.il", "outlook.com", "clinic.org.il"]
+
+
+def synthetic_patients(n: int, rng: random.Random):
+    for pid in range(1, n + 1):
+        if rng.random() < 0.5:
+            name = f"{rng.choice(HEBREW_FIRST)} {rng.choice(HEBREW_LAST)}"
+        else:
+            name = f"{rng.choice(LATIN_FIRST)} {rng.choice(LATIN_LAST)}"
+        local = f"{rng.choice(LATIN_FIRST)}.{rng.choice(LATIN_LAST)}{pid}".lower()
+        yield pid, name, f"{local}@{rng.choice(DOMAINS)}"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(patients: int, queries: int, limit: int, seed: int):
+    rng = random.Random(seed)
+    rows = list(synthetic_patients(patients, rng))
+
+    index = PatientSearchIndex()
+    started = time.perf_counter()
+    index.rebuild(rows)
+    print(f"Built index for {patients} patients in {time.perf_counter() - started:.2f}s: {index.stats()}")
+
+    # Typed queries: a real name / email from the data, revealed char by char
+    samples = rng.sample(rows, min(queries, len(rows)))
+    name_times, email_times = [], []
+    for _, name, email in samples:
+        for i in range(1, len(name) + 1):
+            t0 = time.perf_counter()
+            index.search_names(name[:i], limit)
+            name_times.append((time.perf_counter() - t0) * 1000)
+        for i in range(1, min(len(email), 16) + 1):
+            t0 = time.perf_counter()
+            index.search_emails(email[:i], limit)
+            email_times.append((time.perf_counter() - t0) * 1000)
+
+    for label, times in (("name", name_times), ("email", email_times)):
+        print(
+            f"{label:>5} keystrokes: {len(times):6d}  "
+            f"p50 {statistics.median(times):7.3f} ms  "
+            f"p95 {percentile(times, 95):7.3f} ms  "
+            f"p99 {percentile(times, 99):7.3f} ms  "
+            f"max {max(times):7.3f} ms"
+        )
+
+    # Live insert (what /patients/add does)
+    t0 = time.perf_counter()
+    for pid, name, email in synthetic_patients(100, rng):
+        index.upsert(patients + pid, name, email)
+    print(f"upsert: {(time.perf_counter() - t0) * 1000 / 100:.3f} ms per patient")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.patients, args.queries, args.limit, args.seed)
@@ -39,3 +39,118 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "True").lower() == "true"
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL", SMTP_USERNAME)  # Can be different from SMTP_USERNAME
+
+# Background processing (services/job_scheduler.py)
+PROCESSING_MAX_WORKERS = int(os.getenv("PROCESSING_MAX_WORKERS", "4"))
+PROCESSING_QUEUE_SIZE = int(os.getenv("PROCESSING_QUEUE_SIZE", "50"))
+PROCESSING_BLOB_CONCURRENCY = int(os.getenv("PROCESSING_BLOB_CONCURRENCY", "4"))
+PROCESSING_TRANSCRIPTION_CONCURRENCY = int(os.getenv("PROCESSING_TRANSCRIPTION_CONCURRENCY", "2"))
+PROCESSING_DB_CONCURRENCY = int(os.getenv("PROCESSING_DB_CONCURRENCY", "2"))
+PROCESSING_SHUTDOWN_TIMEOUT = float(os.getenv("PROCESSING_SHUTDOWN_TIMEOUT", "30"))
+PROCESSING_LEASE_SECONDS = int(os.getenv("PROCESSING_LEASE_SECONDS", "120"))
+PROCESSING_HEARTBEAT_SECONDS = float(os.getenv("PROCESSING_HEARTBEAT_SECONDS", "30"))
+PROCESSING_RECOVERY_INTERVAL = float(os.getenv("PROCESSING_RECOVERY_INTERVAL", "60"))
+
+# Shared DB connection pool (services/db_pool.py)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # seconds
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))  # idle seconds
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+# Log every SQL statement through the SQLAlchemy engine (database.py) - debugging only
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+# Outbound HTTP (services/http_client.py)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))  # concurrent requests per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BASE_DELAY = float(os.getenv("HTTP_RETRY_BASE_DELAY", "1"))  # seconds, doubled per attempt
+HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "30"))  # also caps Retry-After
+
+# Azure Speech batch transcription (services/azure_transcription.py)
+SPEECH_POLL_MIN_INTERVAL = float(os.getenv("SPEECH_POLL_MIN_INTERVAL", "5"))
+SPEECH_POLL_MAX_INTERVAL = float(os.getenv("SPEECH_POLL_MAX_INTERVAL", "60"))
+SPEECH_JOB_DEADLINE = float(os.getenv("SPEECH_JOB_DEADLINE", "3600"))  # seconds per job
+# Public URL of /transcription/callback - enables webhook mode instead of polling
+AZURE_SPEECH_WEBHOOK_URL = os.getenv("AZURE_SPEECH_WEBHOOK_URL", "")
+AZURE_SPEECH_WEBHOOK_SECRET = os.getenv("AZURE_SPEECH_WEBHOOK_SECRET", "")
+# Safety-net status check while waiting for a webhook
+SPEECH_WEBHOOK_FALLBACK_POLL = float(os.getenv("SPEECH_WEBHOOK_FALLBACK_POLL", "300"))
+# Recordings queued within this window go to Azure as one multi-file job
+SPEECH_BATCH_WINDOW = float(os.getenv("SPEECH_BATCH_WINDOW", "5"))
+SPEECH_BATCH_MAX_SIZE = int(os.getenv("SPEECH_BATCH_MAX_SIZE", "20"))
+
+# Sentiment analysis result cache (services/analysis_cache.py)
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+
+# Streaming audio uploads (services/streaming_upload.py)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(4 * 1024 * 1024)))
+# Resumable chunked uploads (services/resumable_upload.py); chunks = UPLOAD_BLOCK_SIZE
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))  # seconds
+
+# SQL statements per endpoint (services/query_budget.py): 1 = raise when over budget
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+
+# Patient autocomplete index (services/patient_search.py)
+PATIENT_SEARCH_REFRESH_SECONDS = float(os.getenv("PATIENT_SEARCH_REFRESH_SECONDS", "300"))
+PATIENT_SEARCH_DEFAULT_LIMIT = int(os.getenv("PATIENT_SEARCH_DEFAULT_LIMIT", "20"))
+# Typeahead result cache, per therapist (services/typeahead.py)
+TYPEAHEAD_CACHE_TTL = float(os.getenv("TYPEAHEAD_CACHE_TTL", "30"))
+TYPEAHEAD_CANDIDATES = int(os.getenv("TYPEAHEAD_CANDIDATES", "200"))  # cached set size
+TYPEAHEAD_CACHE_ENTRIES = int(os.getenv("TYPEAHEAD_CACHE_ENTRIES", "32"))  # queries per therapist
+TYPEAHEAD_CACHE_USERS = int(os.getenv("TYPEAHEAD_CACHE_USERS", "500"))
+
+# Verified-principal cache for Bearer auth (services/token_service.py)
+AUTH_PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "60"))  # seconds
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "1024"))
+
+# Token lifecycle (services/token_service.py, services/token_revocation.py)
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))  # 15 minutes
+REFRESH_TOKEN_TTL = int(os.getenv("REFRESH_TOKEN_TTL", str(7 * 24 * 3600)))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "30"))  # pick up other replicas' revocations
+
+# Login lockout / rate limiting, in memory (services/login_limiter.py)
+LOGIN_IP_MAX_FAILURES = int(os.getenv("LOGIN_IP_MAX_FAILURES", "20"))  # failures per IP per window
+LOGIN_IP_WINDOW_SECONDS = float(os.getenv("LOGIN_IP_WINDOW_SECONDS", "300"))
+LOGIN_FLUSH_SECONDS = float(os.getenv("LOGIN_FLUSH_SECONDS", "5"))  # write-behind to FailedLoginAttempts
+LOGIN_LIMITER_MAX_ENTRIES = int(os.getenv("LOGIN_LIMITER_MAX_ENTRIES", "100000"))
+
+# Outbound email queue (services/email_queue.py)
+EMAIL_QUEUE_SIZE = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))  # messages per connection use
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "5"))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "60"))  # close the reused connection after
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Blocking work from async handlers (services/blocking.py)
+BLOCKING_DB_WORKERS = int(os.getenv("BLOCKING_DB_WORKERS", os.getenv("DB_POOL_MAX_SIZE", "10")))
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "16"))  # blob transfers, sentiment runs
+# Event-loop lag monitor (services/loop_monitor.py)
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))  # heartbeat, seconds
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))  # report stalls longer than this
+
+# Job progress push (services/job_events.py, /audio-async/upload-status/*)
+JOB_EVENTS_MAX_JOBS = int(os.getenv("JOB_EVENTS_MAX_JOBS", "5000"))
+JOB_EVENTS_RESYNC_SECONDS = float(os.getenv("JOB_EVENTS_RESYNC_SECONDS", "20"))  # re-read the row when quiet
+JOB_EVENTS_LONG_POLL_SECONDS = float(os.getenv("JOB_EVENTS_LONG_POLL_SECONDS", "25"))
+
+# Live job status held in memory (services/job_state.py)
+JOB_STATE_MAX_JOBS = int(os.getenv("JOB_STATE_MAX_JOBS", "5000"))
+JOB_STATE_LINGER_SECONDS = float(os.getenv("JOB_STATE_LINGER_SECONDS", "60"))  # serve finished jobs this long
+
+# Bulk job status (/audio-async/upload-status:batch, /audio-async/my-active-jobs)
+JOB_STATUS_BATCH_MAX = int(os.getenv("JOB_STATUS_BATCH_MAX", "200"))   # ids per batch request
+ACTIVE_JOBS_LIMIT = int(os.getenv("ACTIVE_JOBS_LIMIT", "50"))
+
+# ProcessingJobs retention (services/job_retention.py)
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "30"))                  # 0 disables archiving
+JOB_ARCHIVE_RETENTION_DAYS = int(os.getenv("JOB_ARCHIVE_RETENTION_DAYS", "0"))   # 0 keeps the archive forever
+JOB_RETENTION_INTERVAL = float(os.getenv("JOB_RETENTION_INTERVAL", "3600"))
+JOB_RETENTION_BATCH_SIZE = int(os.getenv("JOB_RETENTION_BATCH_SIZE", "500"))     # rows per transaction
+JOB_RETENTION_MAX_BATCHES = int(os.getenv("JOB_RETENTION_MAX_BATCHES", "200"))   # per run
+JOB_RETENTION_BATCH_PAUSE = float(os.getenv("JOB_RETENTION_BATCH_PAUSE", "0.2"))
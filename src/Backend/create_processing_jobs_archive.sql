@@ -0,0 +1,57 @@
+-- Archive for finished processing jobs (see services/job_retention.py)
+-- Completed / failed jobs older than JOB_RETENTION_DAYS are moved here in
+-- small batches (DELETE ... OUTPUT deleted.* INTO ProcessingJobsArchive),
+-- so ProcessingJobs only holds recent work.
+-- Run alter_processing_text_columns.sql first on databases that still have
+-- NTEXT columns: OUTPUT INTO can't move NTEXT values.
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='ProcessingJobsArchive' AND xtype='U')
+BEGIN
+    CREATE TABLE ProcessingJobsArchive (
+        JobID NVARCHAR(36) NOT NULL,
+        PatientEmail NVARCHAR(255) NOT NULL,
+        TherapistEmail NVARCHAR(255) NOT NULL,
+        SessionDate NVARCHAR(10) NOT NULL,
+        SessionNotes NVARCHAR(MAX) NULL,
+        AudioURL NVARCHAR(2083) NOT NULL,
+        TranscriptURL NVARCHAR(2083) NULL,
+        Status NVARCHAR(20) NULL,
+        TranscriptionStatus NVARCHAR(20) NULL,
+        Progress INT NULL,
+        TranscriptionError NVARCHAR(MAX) NULL,
+        CreatedAt DATETIME NULL,
+        UpdatedAt DATETIME NULL,
+        CompletedAt DATETIME NULL,
+        RetryCount INT NULL,
+        MaxRetries INT NULL,
+        SessionID INT NULL,
+        LastCompletedStage NVARCHAR(20) NULL,
+        ArchivedAt DATETIME NOT NULL CONSTRAINT DF_ProcessingJobsArchive_ArchivedAt DEFAULT GETUTCDATE()
+    );
+
+    -- Clustered by archive time: new rows append at the end and old ones
+    -- are purged from the front (and it is the partitioning column)
+    CREATE CLUSTERED INDEX CIX_ProcessingJobsArchive_ArchivedAt
+        ON ProcessingJobsArchive (ArchivedAt);
+
+    -- Includes ArchivedAt so it stays aligned if the table is partitioned
+    CREATE UNIQUE NONCLUSTERED INDEX UX_ProcessingJobsArchive_JobID
+        ON ProcessingJobsArchive (JobID, ArchivedAt);
+
+    CREATE NONCLUSTERED INDEX IX_ProcessingJobsArchive_TherapistEmail_CreatedAt
+        ON ProcessingJobsArchive (TherapistEmail, CreatedAt);
+END
+GO
+
+-- Compactor: finished jobs by age, oldest first
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_ProcessingJobs_Status_UpdatedAt'
+)
+BEGIN
+    CREATE INDEX IX_ProcessingJobs_Status_UpdatedAt
+        ON ProcessingJobs (Status, UpdatedAt)
+        INCLUDE (LeaseOwner, LeaseExpiresAt);
+END
+
+PRINT 'ProcessingJobsArchive table created successfully';
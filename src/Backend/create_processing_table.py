@@ -35,18 +35,23 @@ def create_processing_job_table():
             PatientEmail NVARCHAR(255) NOT NULL,
             TherapistEmail NVARCHAR(255) NOT NULL,
             SessionDate NVARCHAR(10) NOT NULL,
-            SessionNotes NTEXT NULL,
+            SessionNotes NVARCHAR(MAX) NULL,
             AudioURL NVARCHAR(2083) NOT NULL,
             TranscriptURL NVARCHAR(2083) NULL,
             Status NVARCHAR(20) DEFAULT 'pending',
             TranscriptionStatus NVARCHAR(20) DEFAULT 'pending',
             Progress INT DEFAULT 0,
-            TranscriptionError NTEXT NULL,
+            TranscriptionError NVARCHAR(MAX) NULL,
             CreatedAt DATETIME DEFAULT GETDATE(),
             UpdatedAt DATETIME DEFAULT GETDATE(),
             CompletedAt DATETIME NULL,
             RetryCount INT DEFAULT 0,
-            MaxRetries INT DEFAULT 3
+            MaxRetries INT DEFAULT 3,
+            SessionID INT NULL,
+            LeaseOwner NVARCHAR(100) NULL,
+            LeaseExpiresAt DATETIME NULL,
+            HeartbeatAt DATETIME NULL,
+            LastCompletedStage NVARCHAR(20) NULL
         )
         """
         
@@ -0,0 +1,35 @@
+-- Revoked JWTs (by jti), see services/token_revocation.py
+-- Loaded into memory at startup and synced incrementally by RevokedAt;
+-- rows are deleted a day after the token itself would have expired.
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='RevokedTokens' AND xtype='U')
+BEGIN
+    CREATE TABLE RevokedTokens (
+        Jti NVARCHAR(64) NOT NULL PRIMARY KEY,
+        ExpiresAt DATETIME NOT NULL,
+        RevokedAt DATETIME NOT NULL DEFAULT GETUTCDATE(),
+        Reason NVARCHAR(50) NULL
+    );
+END
+GO
+
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_RevokedTokens_RevokedAt'
+)
+BEGIN
+    CREATE INDEX IX_RevokedTokens_RevokedAt
+        ON RevokedTokens (RevokedAt)
+        INCLUDE (ExpiresAt);
+END
+
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes 
+    WHERE name = 'IX_RevokedTokens_ExpiresAt'
+)
+BEGIN
+    CREATE INDEX IX_RevokedTokens_ExpiresAt
+        ON RevokedTokens (ExpiresAt);
+END
+
+PRINT 'RevokedTokens table created successfully';
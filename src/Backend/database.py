@@ -1,30 +1,24 @@
 # database.py
 
-import urllib
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DB_SERVER, DB_USER, DB_PASSWORD, DB_DATABASE
+from sqlalchemy.pool import NullPool
+from services.db_pool import get_connection
+from config import DB_ECHO
 
-# 1. Build the raw ODBC connection string
-raw_conn_str = (
-    f"Driver={{ODBC Driver 18 for SQL Server}};"
-    f"Server={DB_SERVER};"
-    f"Database={DB_DATABASE};"
-    f"Uid={DB_USER};"
-    f"Pwd={DB_PASSWORD};"
-    f"Encrypt=yes;"
-    f"TrustServerCertificate=yes;"
-    f"Connection Timeout=30;"
+# 1. Create the SQLAlchemy engine on top of the shared connection pool.
+#    services/db_pool.py owns pooling (size limits, health checks, recycling),
+#    so SQLAlchemy must not keep a second pool of its own: with NullPool every
+#    "close" goes straight back to the shared pool.
+engine = create_engine(
+    "mssql+pymssql://",
+    creator=get_connection,
+    poolclass=NullPool,
+    echo=DB_ECHO,  # DB_ECHO=1 to log every statement
 )
 
-# 2. Encode the string for SQLAlchemy
-params = urllib.parse.quote_plus(raw_conn_str)
-
-# 3. Create the SQLAlchemy engine
-engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}", echo=True)  # echo=True for debug
-
-# 4. Create session and base
+# 2. Create session and base
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -33,4 +27,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
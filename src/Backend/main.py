@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import APIRouter, Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import audio_upload
 from routes import audio_upload_async
@@ -7,6 +7,20 @@ from routes import patient_routes
 from routes import patients
 from routes import transcription
 from routes import sentiment_analysis
+from services.processing_service import processing_service
+from services.db_pool import pool as db_pool
+from services import query_budget
+from services.patient_search import patient_search
+from services.token_revocation import revocation_list
+from services.login_limiter import login_limiter
+from services.email_queue import email_queue
+from services.http_client import close_sync_client
+from services.blocking import db_calls, io_calls
+from services.loop_monitor import loop_monitor
+from services.job_events import job_events
+from services.job_state import job_state
+from services.job_retention import job_retention
+from services.token_service import get_current_admin
 import uvicorn
 
 
@@ -26,18 +40,112 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],    # long-poll status: client echoes it as If-None-Match
 )
 @app.get("/ping")
 async def ping():
     return {"message": "pong"}
+
+# Internal counters (pool sizes, queue depths, lockouts...) - admins only
+metrics_router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+@metrics_router.get("/db-pool")
+def db_pool_metrics():
+    return db_pool.metrics()
+
+@metrics_router.get("/query-budget")
+def query_budget_metrics():
+    return query_budget.report()
+
+@metrics_router.get("/event-loop")
+def event_loop_metrics():
+    return {
+        **loop_monitor.snapshot(),
+        "pools": {"db": db_calls.stats(), "io": io_calls.stats()},
+    }
+
+@metrics_router.get("/job-events")
+def job_events_metrics():
+    return job_events.stats()
+
+@metrics_router.get("/job-state")
+def job_state_metrics():
+    return job_state.snapshot()
+
+@metrics_router.get("/job-retention")
+def job_retention_metrics():
+    return job_retention.snapshot()
+
+@metrics_router.get("/email-queue")
+def email_queue_metrics():
+    return email_queue.snapshot()
+
+@metrics_router.get("/login-limiter")
+def login_limiter_metrics():
+    return login_limiter.snapshot()
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    # Must run on the serving loop: it measures this loop's lag
+    loop_monitor.start()
+
+@app.on_event("startup")
+def warm_db_pool():
+    try:
+        db_pool.warm()
+    except Exception as e:
+        print(f"⚠️ Could not pre-open DB connections: {e}")
+
+@app.on_event("startup")
+def recover_processing_jobs():
+    # Re-queue jobs orphaned by a restart, then keep sweeping for dead replicas
+    processing_service.start_recovery()
+
+@app.on_event("startup")
+def start_patient_search_index():
+    # Loads the autocomplete index now and reloads it periodically
+    patient_search.start()
+
+@app.on_event("startup")
+def load_revoked_tokens():
+    # Revoked jtis live in memory; synced from dbo.RevokedTokens in the background
+    revocation_list.start()
+
+@app.on_event("startup")
+def start_login_limiter():
+    # Restores active lockouts, then flushes attempt changes in batches
+    login_limiter.start()
+
+@app.on_event("startup")
+def start_job_retention():
+    # Moves finished jobs older than JOB_RETENTION_DAYS to ProcessingJobsArchive
+    job_retention.start()
+
+@app.on_event("shutdown")
+def drain_processing_queue():
+    # Let queued transcription jobs finish before the process exits
+    processing_service.shutdown()
+    revocation_list.stop()
+    patient_search.stop()
+    login_limiter.stop()
+    email_queue.stop()
+    close_sync_client()
+    loop_monitor.stop()
+    job_retention.stop()
+    db_calls.shutdown()
+    io_calls.shutdown()
+    db_pool.close_all()
+
 # Register your API routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(auth.admin_router, prefix="/admin", tags=["Admin Panel"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
 app.include_router(audio_upload.router, prefix="/audio", tags=["Audio Upload"])
 app.include_router(audio_upload_async.router, prefix="/audio-async", tags=["Audio Upload Async"])
 app.include_router(patients.router, prefix="/patientsdb", tags=["Patients"])
 app.include_router(patient_routes.router, prefix="/patients", tags=["Patients"])
 app.include_router(transcription.router, prefix="/transcription", tags=["Transcription"])
+app.include_router(transcription.callback_router, prefix="/transcription", tags=["Transcription"])
 app.include_router(sentiment_analysis.router, prefix="/sentiment", tags=["Sentiment"])
 
 
@@ -35,3 +35,12 @@ class ProcessingJob(Base):
     # Retry logic
     RetryCount = Column(Integer, default=0)
     MaxRetries = Column(Integer, default=3)
+    
+    # Result
+    SessionID = Column(Integer, nullable=True)
+    
+    # Durable queue: the worker holding the lease owns the job until LeaseExpiresAt
+    LeaseOwner = Column(String(100), nullable=True)
+    LeaseExpiresAt = Column(DateTime, nullable=True)
+    HeartbeatAt = Column(DateTime, nullable=True)
+    LastCompletedStage = Column(String(20), nullable=True)  # transcribed, saved
@@ -15,6 +15,8 @@ class Session(Base):
     Transcript = Column(Text)
     Timestamp = Column(DateTime)
     analysis = Column(String(2083))
+    PositiveCount = Column(Integer)   # filled together with `analysis`
+    NegativeCount = Column(Integer)
     
     # Relationships
     patient = relationship("Patient", back_populates="sessions")
@@ -0,0 +1,61 @@
+-- OPTIONAL: partition ProcessingJobsArchive by month of ArchivedAt
+-- Run after create_processing_jobs_archive.sql. With monthly partitions a
+-- whole month of archive can be dropped at once instead of row by row:
+--
+--     TRUNCATE TABLE ProcessingJobsArchive WITH (PARTITIONS (2));
+--     ALTER PARTITION FUNCTION PF_ProcessingJobsArchive_Month() MERGE RANGE ('<oldest boundary>');
+--
+-- services/job_retention.py keeps adding next months' boundaries; its
+-- batched purge (JOB_ARCHIVE_RETENTION_DAYS) works with or without this.
+
+-- Boundaries: 24 months back to 12 months ahead
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name = 'PF_ProcessingJobsArchive_Month')
+BEGIN
+    DECLARE @first_of_month DATE = DATEFROMPARTS(YEAR(GETUTCDATE()), MONTH(GETUTCDATE()), 1);
+    DECLARE @month DATE = DATEADD(month, -24, @first_of_month);
+    DECLARE @boundaries NVARCHAR(MAX) = N'';
+
+    WHILE @month <= DATEADD(month, 12, @first_of_month)
+    BEGIN
+        SET @boundaries = @boundaries
+            + CASE WHEN @boundaries = N'' THEN N'' ELSE N', ' END
+            + N'''' + CONVERT(NVARCHAR(10), @month, 120) + N'''';
+        SET @month = DATEADD(month, 1, @month);
+    END
+
+    EXEC (N'CREATE PARTITION FUNCTION PF_ProcessingJobsArchive_Month (DATETIME) '
+        + N'AS RANGE RIGHT FOR VALUES (' + @boundaries + N')');
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.partition_schemes WHERE name = 'PS_ProcessingJobsArchive_Month')
+BEGIN
+    CREATE PARTITION SCHEME PS_ProcessingJobsArchive_Month
+        AS PARTITION PF_ProcessingJobsArchive_Month ALL TO ([PRIMARY]);
+END
+GO
+
+-- Rebuild the archive's indexes on the scheme (all aligned on ArchivedAt)
+IF NOT EXISTS (
+    SELECT * FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.object_id = OBJECT_ID('ProcessingJobsArchive') AND i.index_id = 1
+)
+BEGIN
+    CREATE CLUSTERED INDEX CIX_ProcessingJobsArchive_ArchivedAt
+        ON ProcessingJobsArchive (ArchivedAt)
+        WITH (DROP_EXISTING = ON)
+        ON PS_ProcessingJobsArchive_Month (ArchivedAt);
+
+    CREATE UNIQUE NONCLUSTERED INDEX UX_ProcessingJobsArchive_JobID
+        ON ProcessingJobsArchive (JobID, ArchivedAt)
+        WITH (DROP_EXISTING = ON)
+        ON PS_ProcessingJobsArchive_Month (ArchivedAt);
+
+    CREATE NONCLUSTERED INDEX IX_ProcessingJobsArchive_TherapistEmail_CreatedAt
+        ON ProcessingJobsArchive (TherapistEmail, CreatedAt)
+        WITH (DROP_EXISTING = ON)
+        ON PS_ProcessingJobsArchive_Month (ArchivedAt);
+END
+
+PRINT 'ProcessingJobsArchive partitioned by month';
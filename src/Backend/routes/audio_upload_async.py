@@ -1,88 +1,117 @@
 # routes/audio_upload_async.py
 from __future__ import annotations
 from services.token_service import get_current_user
+import asyncio
+import json
 import os
-import aiofiles
 from fastapi import (
     APIRouter,
     Depends,
-    File,
-    Form,
-    UploadFile,
+    Query,
+    Request,
     HTTPException,
+    Response,
     status,
 )
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
 # ─── project helpers ─────────────────────────────────────────────────────────
-from services.blob_service import upload_to_azure
 from services.processing_service import processing_service
+from services.blocking import db_calls, io_calls
+from services.job_events import job_events, is_terminal
+from services.job_scheduler import SchedulerFull, SchedulerClosed
+from services.streaming_upload import receive_upload, UploadTooLarge, UploadFormError
+from services.resumable_upload import (
+    resumable_uploads,
+    UploadSessionError,
+    UploadSessionNotFound,
+)
+from config import (
+    JOB_EVENTS_RESYNC_SECONDS,
+    JOB_EVENTS_LONG_POLL_SECONDS,
+    JOB_STATUS_BATCH_MAX,
+    ACTIVE_JOBS_LIMIT,
+)
 
 # ─── router setup ───────────────────────────────────────────────────────────
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-UPLOAD_DIR = "recordings"         # local temp folder
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+QUEUE_FULL_RETRY_AFTER = "30"     # seconds, sent with 503 when the job queue is full
+
+
+def _queue_full_error(exc: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Processing queue is busy, please try again shortly: {exc}",
+        headers={"Retry-After": QUEUE_FULL_RETRY_AFTER},
+    )
+
+
+def _wav_filename(filename: str) -> str:
+    return filename if filename.lower().endswith(".wav") else filename + ".wav"
+
+
+async def receive_recording(request: Request):
+    """
+    Stream the multipart body (file + patient_email, therapist_email,
+    session_date, notes) into staged Azure blocks and validate the fields.
+    Shared by both upload routes. The blob is NOT committed yet.
+    """
+    try:
+        upload = await receive_upload(request, folder="recordings", filename_for=_wav_filename)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except UploadFormError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload audio file to Azure Blob Storage: {str(exc)}"
+        ) from exc
+
+    fields = upload.fields
+    if not fields.get("patient_email") or not fields.get("therapist_email") or not fields.get("session_date"):
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required fields: patient_email, therapist_email, or session_date"
+        )
+    return upload
 
 
 @router.post("/upload-audio/", status_code=status.HTTP_201_CREATED)
-async def upload_audio(
-    file: UploadFile = File(...),
-    patient_email: str = Form(...),
-    therapist_email: str = Form(...),
-    session_date: str = Form(...),   # YYYY-MM-DD from the form
-    notes: str = Form(""),           # optional
-):
+async def upload_audio(request: Request):
     """
     NEW ASYNCHRONOUS APPROACH:
-    1. Validate input and save file locally
-    2. Upload WAV to Azure Blob (fast - 2-3 seconds)
+    1. Stream the WAV straight into Azure Blob blocks while validating input
+       (multipart form: file, patient_email, therapist_email, session_date, notes)
+    2. Commit the blob
     3. Create processing job for background transcription/sentiment
     4. Return immediately with job ID for status tracking
     """
-    
+
+    # Backpressure: don't accept (and upload) a file we can't schedule
+    try:
+        processing_service.scheduler.check_capacity()
+    except (SchedulerFull, SchedulerClosed) as exc:
+        raise _queue_full_error(exc) from exc
+
     # ---------------------------------------------------------------------- #
-    # 0.  Input validation
+    # 0.  Stream + validate (size limit enforced on the bytes received)
     # ---------------------------------------------------------------------- #
-    if not file:
-        raise HTTPException(status_code=400, detail="No file provided")
-    
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="File has no filename")
-    
-    if file.size == 0:
-        raise HTTPException(status_code=400, detail="File is empty")
-    
-    # Check if file is too large (e.g., 100MB limit)
-    MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
-    if file.size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"File too large. Maximum size allowed: {MAX_FILE_SIZE // (1024*1024)}MB"
-        )
-    
-    if not patient_email or not therapist_email or not session_date:
-        raise HTTPException(
-            status_code=400, 
-            detail="Missing required fields: patient_email, therapist_email, or session_date"
-        )
-    
-    # ------------------------------------------------------------------ #
-    # 1.  Save file locally temporarily
-    # ------------------------------------------------------------------ #
-    if not file.filename.lower().endswith(".wav"):
-        file.filename = file.filename + ".wav"
-    local_path = os.path.join(UPLOAD_DIR, file.filename)
-    
-    async with aiofiles.open(local_path, "wb") as out_fh:
-        await out_fh.write(await file.read())
+    upload = await receive_recording(request)
+    patient_email = upload.fields["patient_email"]
+    therapist_email = upload.fields["therapist_email"]
+    session_date = upload.fields["session_date"]     # YYYY-MM-DD from the form
+    notes = upload.fields.get("notes", "")           # optional
 
     try:
         # ------------------------------------------------------------------
-        # 2.  Upload to Azure Blob (fast step - 2-3 seconds)
+        # 1-2.  Commit the staged blocks -> blob becomes visible
         # ------------------------------------------------------------------
         try:
-            audio_url = upload_to_azure(local_path, file.filename, folder="recordings")
-            print(f"✅ Audio uploaded successfully: {audio_url}")
+            audio_url = await upload.commit()
+            print(f"✅ Audio uploaded successfully: {audio_url} ({upload.size} bytes)")
         except Exception as exc:
             raise HTTPException(
                 status_code=500,
@@ -93,7 +122,8 @@ async def upload_audio(
         # 3.  Create background processing job
         # ------------------------------------------------------------------
         try:
-            job_id = processing_service.create_job(
+            job_id = await db_calls.run(
+                processing_service.create_job,
                 patient_email=patient_email,
                 therapist_email=therapist_email,
                 session_date=session_date,
@@ -101,6 +131,8 @@ async def upload_audio(
                 audio_url=audio_url
             )
             print(f"✅ Processing job created: {job_id}")
+        except (SchedulerFull, SchedulerClosed) as exc:
+            raise _queue_full_error(exc) from exc
         except Exception as exc:
             raise HTTPException(
                 status_code=500,
@@ -115,10 +147,6 @@ async def upload_audio(
             status_code=500,
             detail=f"Unexpected error during upload: {str(exc)}"
         ) from exc
-    finally:
-        # Always remove the temp file
-        if os.path.exists(local_path):
-            os.remove(local_path)
 
     # ---------------------------------------------------------------------- #
     # 4.  Return immediate success with job tracking info
@@ -138,7 +166,7 @@ async def get_upload_status(job_id: str):
     Get the current status of a background processing job
     """
     try:
-        status_info = processing_service.get_job_status(job_id)
+        status_info = await db_calls.run(processing_service.get_job_status, job_id)
         if not status_info:
             raise HTTPException(
                 status_code=404,
@@ -146,6 +174,9 @@ async def get_upload_status(job_id: str):
             )
         
         return status_info
+    except HTTPException:
+        # Re-raise HTTP exceptions as-is
+        raise
     except Exception as exc:
         raise HTTPException(
             status_code=500,
@@ -153,13 +184,158 @@ async def get_upload_status(job_id: str):
         ) from exc
 
 
+class JobStatusBatchIn(BaseModel):
+    job_ids: list[str]
+
+
+@router.post("/upload-status:batch", status_code=status.HTTP_200_OK)
+async def get_upload_status_batch(body: JobStatusBatchIn):
+    """
+    Status of up to JOB_STATUS_BATCH_MAX jobs in one call (one query for
+    the ones not running on this server). Unknown ids are listed in `missing`.
+    """
+    if len(body.job_ids) > JOB_STATUS_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {JOB_STATUS_BATCH_MAX} job ids per request"
+        )
+    try:
+        statuses = await db_calls.run(processing_service.get_job_statuses, body.job_ids)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get job status: {str(exc)}"
+        ) from exc
+    return {
+        "jobs": statuses,
+        "missing": [job_id for job_id in dict.fromkeys(body.job_ids) if job_id not in statuses],
+    }
+
+
+@router.get("/my-active-jobs", status_code=status.HTTP_200_OK)
+async def my_active_jobs(
+    therapist_email: str | None = Query(None, description="Admins only: whose jobs to list"),
+    limit: int = Query(ACTIVE_JOBS_LIMIT, ge=1, le=ACTIVE_JOBS_LIMIT),
+    user: dict = Depends(get_current_user),
+):
+    """
+    The caller's pending and processing jobs, newest first
+    """
+    if user["role"] == "admin":
+        if not therapist_email:
+            raise HTTPException(status_code=400, detail="therapist_email is required for admins")
+        email = therapist_email
+    else:
+        email = user["email"]
+    try:
+        jobs = await db_calls.run(processing_service.list_active_jobs, email, limit)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to list active jobs: {str(exc)}"
+        ) from exc
+    return {"therapist_email": email, "jobs": jobs}
+
+
+# ─── pushed status updates ──────────────────────────────────────────────────
+async def _job_snapshot(job_id: str) -> tuple[int, dict]:
+    """Latest (version, state) for a job, refreshed from the DB."""
+    row = await db_calls.run(processing_service.get_job_status, job_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job_events.merge(job_id, row)
+    return job_events.current(job_id)
+
+
+async def _next_change(job_id: str, version: int, timeout: float) -> tuple[int, dict | None]:
+    """
+    Wait up to `timeout` for the job to move past `version`. Events come
+    from this process; in between, the row is re-read every
+    JOB_EVENTS_RESYNC_SECONDS in case another replica is running the job.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return version, None
+        if await job_events.wait(job_id, version, min(remaining, JOB_EVENTS_RESYNC_SECONDS)):
+            new_version, state = job_events.current(job_id)
+        else:
+            new_version, state = await _job_snapshot(job_id)
+        if new_version != version:
+            return new_version, state
+
+
+def _etag(job_id: str, version: int) -> str:
+    return f'"{job_id}-{version}"'
+
+
+@router.get("/upload-status/{job_id}/events")
+async def stream_upload_status(job_id: str, request: Request):
+    """
+    Server-Sent Events: one `status` event with the full job state now and
+    after every change, until the job completes or fails. Comment lines
+    keep idle proxies from closing the stream. The response has already
+    started, so a job that disappears (archived) ends the stream with a
+    `gone` event, and a failed re-read with an `error` event.
+    """
+    version, state = await _job_snapshot(job_id)
+
+    async def events():
+        nonlocal version, state
+        last_sent = request.headers.get("last-event-id")
+        while True:
+            if str(version) != last_sent:
+                yield f"id: {version}\nevent: status\ndata: {json.dumps(state, default=str)}\n\n"
+                last_sent = str(version)
+            if is_terminal(state) or await request.is_disconnected():
+                return
+            try:
+                new_version, new_state = await _next_change(job_id, version, JOB_EVENTS_RESYNC_SECONDS)
+            except HTTPException as exc:
+                yield f"event: gone\ndata: {json.dumps({'detail': exc.detail})}\n\n"
+                return
+            except Exception as exc:
+                yield f"event: error\ndata: {json.dumps({'detail': f'Failed to get job status: {exc}'})}\n\n"
+                return
+            if new_state is None:
+                yield ": keep-alive\n\n"
+                continue
+            version, state = new_version, new_state
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/upload-status/{job_id}/poll")
+async def long_poll_upload_status(job_id: str, request: Request, response: Response):
+    """
+    Long-poll fallback for clients that can't keep a stream open. Send the
+    last ETag as If-None-Match: the call returns as soon as the job changes,
+    or 304 after JOB_EVENTS_LONG_POLL_SECONDS if it didn't.
+    """
+    version, state = await _job_snapshot(job_id)
+    if request.headers.get("if-none-match") == _etag(job_id, version) and not is_terminal(state):
+        version, changed = await _next_change(job_id, version, JOB_EVENTS_LONG_POLL_SECONDS)
+        if changed is None:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": _etag(job_id, version)})
+        state = changed
+    response.headers["ETag"] = _etag(job_id, version)
+    response.headers["Cache-Control"] = "no-cache"
+    return state
+
+
 @router.post("/retry-processing/{job_id}", status_code=status.HTTP_200_OK)
 async def retry_processing(job_id: str):
     """
     Retry a failed processing job
     """
     try:
-        success = processing_service.retry_job(job_id)
+        success = await db_calls.run(processing_service.retry_job, job_id)
         if not success:
             raise HTTPException(
                 status_code=400,
@@ -171,8 +347,152 @@ async def retry_processing(job_id: str):
             "message": "Processing job has been restarted",
             "job_id": job_id
         }
+    except HTTPException:
+        raise
+    except SchedulerFull as exc:
+        raise _queue_full_error(exc) from exc
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retry job: {str(exc)}"
         ) from exc
+
+
+# ─── resumable (chunked) uploads ────────────────────────────────────────────
+class UploadSessionIn(BaseModel):
+    filename: str
+    size: int                        # total bytes of the WAV
+    patient_email: str
+    therapist_email: str
+    session_date: str                # YYYY-MM-DD
+    notes: str = ""
+
+
+def _upload_session_error(exc: UploadSessionError) -> HTTPException:
+    if isinstance(exc, UploadSessionNotFound):
+        return HTTPException(status_code=404, detail=str(exc))
+    return HTTPException(status_code=400, detail=str(exc))
+
+
+async def _get_upload_session(upload_id: str, user: dict):
+    try:
+        # May read the manifest + block list from Blob Storage
+        return await io_calls.run(resumable_uploads.get, upload_id, str(user["id"]))
+    except UploadSessionError as exc:
+        raise _upload_session_error(exc) from exc
+
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(body: UploadSessionIn, user: dict = Depends(get_current_user)):
+    """
+    Start a resumable upload. Then PUT each chunk to
+    /uploads/{upload_id}?offset=N (N = k * chunk_size, last chunk may be
+    shorter), GET /uploads/{upload_id} to see what is missing after a
+    dropped connection, and POST /uploads/{upload_id}/commit at the end.
+    """
+    if not body.filename:
+        raise HTTPException(status_code=400, detail="File has no filename")
+    if not body.patient_email or not body.therapist_email or not body.session_date:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required fields: patient_email, therapist_email, or session_date"
+        )
+    try:
+        session = await io_calls.run(
+            resumable_uploads.create,
+            str(user["id"]),
+            _wav_filename(os.path.basename(body.filename)),
+            body.size,
+            body.patient_email,
+            body.therapist_email,
+            body.session_date,
+            body.notes,
+        )
+    except UploadSessionError as exc:
+        raise _upload_session_error(exc) from exc
+    return session.progress()
+
+
+@router.put("/uploads/{upload_id}", status_code=status.HTTP_200_OK)
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    user: dict = Depends(get_current_user),
+):
+    """Store one chunk (raw request body) at `offset`. Re-sending a chunk is safe."""
+    session = await _get_upload_session(upload_id, user)
+    try:
+        expected = resumable_uploads.check_chunk(session, offset)
+    except UploadSessionError as exc:
+        raise _upload_session_error(exc) from exc
+
+    # Never buffer more than one chunk, whatever the client claims to send
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > expected:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Chunk at offset {offset} must be exactly {expected} bytes"
+            )
+
+    try:
+        return await io_calls.run(resumable_uploads.put_chunk, session, offset, bytes(data))
+    except UploadSessionError as exc:
+        raise _upload_session_error(exc) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to store chunk in Azure Blob Storage: {str(exc)}"
+        ) from exc
+
+
+@router.get("/uploads/{upload_id}", status_code=status.HTTP_200_OK)
+async def get_upload_progress(upload_id: str, user: dict = Depends(get_current_user)):
+    """Which chunks are stored; resume from `next_offset`."""
+    session = await _get_upload_session(upload_id, user)
+    return session.progress()
+
+
+@router.post("/uploads/{upload_id}/commit", status_code=status.HTTP_201_CREATED)
+async def commit_upload(upload_id: str, user: dict = Depends(get_current_user)):
+    """Assemble the chunks into the recording blob and enqueue its ProcessingJob."""
+    session = await _get_upload_session(upload_id, user)
+
+    if session.job_id is None:
+        try:
+            processing_service.scheduler.check_capacity()
+        except (SchedulerFull, SchedulerClosed) as exc:
+            raise _queue_full_error(exc) from exc
+
+    def create_job(s, audio_url: str) -> str:
+        job_id = processing_service.create_job(
+            patient_email=s.patient_email,
+            therapist_email=s.therapist_email,
+            session_date=s.session_date,
+            session_notes=s.notes,
+            audio_url=audio_url,
+        )
+        print(f"✅ Processing job created: {job_id}")
+        return job_id
+
+    try:
+        session = await io_calls.run(resumable_uploads.commit, session, create_job)
+    except UploadSessionError as exc:
+        raise _upload_session_error(exc) from exc
+    except (SchedulerFull, SchedulerClosed) as exc:
+        raise _queue_full_error(exc) from exc
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to commit upload: {str(exc)}"
+        ) from exc
+
+    return {
+        "status": "uploaded",
+        "message": "Audio uploaded successfully! Processing in background...",
+        "job_id": session.job_id,
+        "audio_url": session.audio_url,
+        "processing_status": "started"
+    }
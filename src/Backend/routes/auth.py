@@ -1,23 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from models.TherapistLogin import TherapistLogin, FailedLoginAttempt
+from models.TherapistLogin import TherapistLogin
 from models.Therapist import Therapist
 from models.Admin import Admin  # ✅ ייבוא מודל אדמין
-from schemas.TherapistLogin import TherapistLoginRequest, TherapistLoginResponse, ForgotPasswordRequest, VerifyResetCodeRequest
+from schemas.TherapistLogin import TherapistLoginRequest, TherapistLoginResponse, ForgotPasswordRequest, VerifyResetCodeRequest, RefreshTokenRequest, TokenPairResponse
 from schemas.TherapistRegister import TherapistRegisterRequest
 from database import get_db, SessionLocal
 import hashlib
 import jwt
-from services.token_service import create_access_token, get_current_admin, decode_access_token
+from services.token_service import (
+    issue_token_pair,
+    get_current_admin,
+    get_current_user,
+    decode_access_token,
+    decode_refresh_token,
+    principal_cache,
+    bearer_scheme,
+    resolve_therapist_principal,
+)
+from services.token_revocation import revocation_list
+from services.login_limiter import login_limiter
 import re
 import secrets
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from services.email_queue import email_queue, EmailQueueFull
 
 
-from config import SECRET_KEY, SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_FROM_EMAIL, SMTP_USE_TLS
-from fastapi.security import OAuth2PasswordBearer
+from config import SECRET_KEY, REFRESH_TOKEN_TTL
+from fastapi.security import OAuth2PasswordBearer, HTTPAuthorizationCredentials
+from fastapi import Security
 from datetime import datetime, timedelta
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -32,78 +42,7 @@ def get_db():
     finally:
         db.close()
 
-def check_lockout(db: Session, email: str) -> tuple[bool, str]:
-    failed_attempt = db.query(FailedLoginAttempt).filter(FailedLoginAttempt.email == email).first()
-    now = datetime.utcnow()
-    if not failed_attempt:
-        return False, ""
-    if failed_attempt.lockout_until and failed_attempt.lockout_until > now:
-        # Determine the stage by attempt_count
-        if failed_attempt.attempt_count == 3:
-            return True, "Please wait 2 minutes before trying again"
-        elif failed_attempt.attempt_count == 4:
-            return True, "Please wait 1 hour before trying again"
-        elif failed_attempt.attempt_count == 5 or failed_attempt.attempt_count == 0:
-            return True, "Please wait 1 day before trying again"
-        else:
-            # fallback: show generic message with time left
-            time_left = failed_attempt.lockout_until - now
-            return True, f"Please wait {str(time_left)} before trying again"
-    return False, ""
-
-def update_failed_attempt(db: Session, email: str):
-    failed_attempt = db.query(FailedLoginAttempt).filter(FailedLoginAttempt.email == email).first()
-    now = datetime.utcnow()
-
-    if not failed_attempt:
-        failed_attempt = FailedLoginAttempt(email=email)
-        db.add(failed_attempt)
-
-    if failed_attempt.attempt_count is None:
-        failed_attempt.attempt_count = 0
-
-    # If lockout expired, move to next stage
-    if failed_attempt.lockout_until and failed_attempt.lockout_until < now:
-        # Move to next lockout stage
-        if failed_attempt.attempt_count == 3:
-            failed_attempt.attempt_count = 4
-            failed_attempt.lockout_until = now + timedelta(hours=1)
-        elif failed_attempt.attempt_count == 4:
-            failed_attempt.attempt_count = 5
-            failed_attempt.lockout_until = now + timedelta(days=1)
-        elif failed_attempt.attempt_count >= 5:
-            # After 1 day, reset everything
-            failed_attempt.attempt_count = 1
-            failed_attempt.lockout_until = None
-        else:
-            failed_attempt.attempt_count += 1
-            failed_attempt.lockout_until = None
-    else:
-        failed_attempt.attempt_count += 1
-        if failed_attempt.attempt_count == 3:
-            failed_attempt.lockout_until = now + timedelta(minutes=2)
-        elif failed_attempt.attempt_count == 4:
-            failed_attempt.lockout_until = now + timedelta(hours=1)
-        elif failed_attempt.attempt_count >= 5:
-            failed_attempt.lockout_until = now + timedelta(days=1)
-            failed_attempt.attempt_count = 0
-
-    failed_attempt.last_attempt = now
-    db.commit()
-
-def reset_failed_attempt(db: Session, email: str):
-    failed_attempt = db.query(FailedLoginAttempt).filter(FailedLoginAttempt.email == email).first()
-    if failed_attempt:
-        failed_attempt.attempt_count = 0
-        failed_attempt.lockout_until = None
-        db.commit()
-
 def send_reset_email(email: str, reset_token: str):
-    msg = MIMEMultipart()
-    msg['From'] = SMTP_FROM_EMAIL
-    msg['To'] = email
-    msg['Subject'] = "Password Reset Request"
-    
     body = f"""
     You have requested to reset your password.
     Please use the following code to reset your password: {reset_token}
@@ -111,38 +50,21 @@ def send_reset_email(email: str, reset_token: str):
     This code will expire in 15 minutes.
     If you did not request this reset, please ignore this email.
     """
-    
-    msg.attach(MIMEText(body, 'plain'))
-    
+    # Sent by the background sender (reused connection, retries)
     try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        if SMTP_USE_TLS:
-            server.starttls()
-        
-        # Only attempt login if credentials are provided
-        if SMTP_USERNAME and SMTP_PASSWORD:
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        
-        server.send_message(msg)
-        server.quit()
-    except smtplib.SMTPAuthenticationError:
-        print("SMTP Authentication failed. Please check your SMTP credentials.")
-        raise HTTPException(status_code=500, detail="Email service configuration error")
-    except smtplib.SMTPException as e:
-        print(f"SMTP error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send reset email")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send reset email")
+        email_queue.enqueue(email, "Password Reset Request", body)
+    except EmailQueueFull:
+        print("⚠️ Email queue full, reset email not queued")
+        raise HTTPException(status_code=503, detail="Email service busy, please try again shortly")
 
 # 📥 התחברות
 @router.post("/login", response_model=TherapistLoginResponse)
-def login(credentials: TherapistLoginRequest, db: Session = Depends(get_db)):
-    print(db)
+def login(credentials: TherapistLoginRequest, request: Request, db: Session = Depends(get_db)):
     print("🔐 login called with:", credentials.email)
+    client_ip = request.client.host if request.client else None
 
-    # Check for lockout
-    is_locked, message = check_lockout(db, credentials.email)
+    # Lockout / rate limit check is in memory - no DB round-trip
+    is_locked, message = login_limiter.check(credentials.email, client_ip)
     if is_locked:
         raise HTTPException(status_code=429, detail=message)
 
@@ -154,39 +76,39 @@ def login(credentials: TherapistLoginRequest, db: Session = Depends(get_db)):
         if hashed_input == admin.AdminPassword:
             print("👑 Admin login successful")
             # Reset failed attempts on successful login
-            reset_failed_attempt(db, credentials.email)
-            access_token = create_access_token(user_id="admin", role="admin")
+            login_limiter.record_success(credentials.email)
+            tokens = issue_token_pair(user_id="admin", role="admin")
             return TherapistLoginResponse(
                 therapist_id=-1,
-                access_token=access_token,
                 full_name="Admin",
-                token_type="bearer"
+                token_type="bearer",
+                **tokens
             )
         else:
             print("❌ Invalid admin password")
-            update_failed_attempt(db, credentials.email)
+            login_limiter.record_failure(credentials.email, client_ip)
             raise HTTPException(status_code=401, detail="Invalid admin password")
 
     # 🔄 אם לא אדמין, בדיקה רגילה של מטפל
     therapist = db.query(TherapistLogin).filter(TherapistLogin.email == credentials.email).first()
 
     if not therapist:
-        update_failed_attempt(db, credentials.email)
+        login_limiter.record_failure(credentials.email, client_ip)
         raise HTTPException(status_code=401, detail="Invalid email")
 
     hashed_input = hashlib.sha256(credentials.password.encode()).hexdigest()
     if hashed_input != therapist.hashed_password:
-        update_failed_attempt(db, credentials.email)
+        login_limiter.record_failure(credentials.email, client_ip)
         raise HTTPException(status_code=401, detail="Invalid password")
 
     if not therapist.is_approved:
         raise HTTPException(status_code=403, detail="Account pending admin approval")
 
     # Reset failed attempts on successful login
-    reset_failed_attempt(db, credentials.email)
+    login_limiter.record_success(credentials.email)
 
     # Generate JWT token using the token service
-    access_token = create_access_token(user_id=therapist.id, role="therapist")
+    tokens = issue_token_pair(user_id=therapist.id, role="therapist")
 
     therapist_details = db.query(Therapist).filter(Therapist.TherapistID == therapist.id).first()
     if not therapist_details:
@@ -194,12 +116,52 @@ def login(credentials: TherapistLoginRequest, db: Session = Depends(get_db)):
 
     return TherapistLoginResponse(
         therapist_id=therapist.id,
-        access_token=access_token,
         full_name=therapist_details.FullName,
-        token_type="bearer"
+        token_type="bearer",
+        **tokens
     )
 
 
+# 🔄 Refresh: rotate the refresh token, issue a new short-lived access token
+@router.post("/refresh", response_model=TokenPairResponse)
+def refresh_tokens(request: RefreshTokenRequest):
+    payload = decode_refresh_token(request.refresh_token)
+    if revocation_list.is_revoked(payload["jti"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    user_id = str(payload["sub"])
+    role = payload.get("role")
+    if role != "admin":
+        # An unapproved / deleted therapist can't extend the session
+        if resolve_therapist_principal(user_id) is None:
+            raise HTTPException(status_code=401, detail="User not found or not approved")
+
+    # Rotation: the presented refresh token can't be used again. The revoke
+    # is the check - of two concurrent refreshes with it only one gets through
+    if not revocation_list.revoke(payload["jti"], payload["exp"], reason="rotated"):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return TokenPairResponse(**issue_token_pair(user_id=user_id, role=role))
+
+
+# 🚪 Logout: revoke the access token and the refresh token it came with
+@router.post("/logout")
+def logout(
+    credentials: HTTPAuthorizationCredentials = Security(bearer_scheme),
+    user = Depends(get_current_user),
+):
+    payload = decode_access_token(credentials.credentials)
+    revocation_list.revoke(payload["jti"], payload["exp"], reason="logout")
+    refresh_jti = payload.get("rjti")
+    if refresh_jti:
+        revocation_list.revoke(refresh_jti, payload["iat"] + REFRESH_TOKEN_TTL, reason="logout")
+    return {"message": "Logged out"}
+
+
+@router.post("/validate")
+def validate_token(user = Depends(get_current_user)):
+    return {"valid": True, "user": user}
+
+
 
 def is_password_strong(password: str) -> bool:
     if len(password) < 7:
@@ -213,7 +175,9 @@ def is_password_strong(password: str) -> bool:
 @router.get("/verify")
 def verify_token_route(token: str = Depends(oauth2_scheme)):
     print("Received token:", token)
-    decode_access_token(token)
+    payload = decode_access_token(token)
+    if revocation_list.is_revoked(payload["jti"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
     return {"valid": True}
 # admin_router = APIRouter(dependencies=[Depends(get_current_admin)])
 
@@ -322,6 +286,7 @@ def approve_therapist(therapist_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Therapist not found")
     therapist.is_approved = True
     db.commit()
+    principal_cache.invalidate(therapist_id)
     return {"message": "Therapist approved successfully"}
 
 @admin_router.delete("/reject/{therapist_id}")
@@ -341,6 +306,8 @@ def reject_therapist(therapist_id: int, db: Session = Depends(get_db)):
             db.delete(login)
 
         db.commit()
+        # Existing tokens of this therapist must stop working right away
+        principal_cache.invalidate(therapist_id)
         return {"message": "Therapist rejected and deleted"}
 
     except Exception as e:
@@ -359,7 +326,7 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
     therapist.reset_token = reset_token
     therapist.reset_token_expiry = datetime.utcnow() + timedelta(minutes=15)
     db.commit()
-    # Send reset email
+    # Queue the reset email; the response doesn't wait for SMTP
     send_reset_email(email, reset_token)
     return {"message": "Reset code sent to your email"}
 
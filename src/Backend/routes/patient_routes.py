@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Patient  # מוודאים שיש מודל Patient בקובץ models.py
 from schemas.patient import PatientCreateRequest
+from services.patient_search import patient_search
 
 router = APIRouter()
 
@@ -23,5 +24,8 @@ def add_patient(data: PatientCreateRequest, db: Session = Depends(get_db)):
     db.add(new_patient)
     db.commit()
     db.refresh(new_patient)
+
+    # Searchable right away, without waiting for the periodic index refresh
+    patient_search.add_patient(new_patient.PatientID, new_patient.FullName, new_patient.PatientEmail)
     
     return {"message": "Patient added successfully", "id": new_patient.PatientID}
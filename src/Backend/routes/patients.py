@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from services.blocking import db_calls
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, contains_eager
 from database import get_db
 from models import Patient, Session as SessionModel, Therapist,TherapistLogin
 from schemas.patient_data import PatientDataResponse
@@ -7,12 +9,21 @@ from fastapi import Query
 from typing import List
 from schemas.patient_data import PatientBasicInfo  # Make sure this is imported
 from schemas.patient_data import PatientSessionInfo  # Make sure this is imported
+from schemas.patient_data import PatientSessionPage, PatientTypeaheadItem
 from services.token_service import get_current_user
+from services.query_budget import query_budget
+from services.patient_search import patient_search
+from services.typeahead import typeahead
+from config import PATIENT_SEARCH_DEFAULT_LIMIT
+import base64
+import binascii
 import json
+from datetime import datetime
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 @router.get("/dashboard-data", response_model=PatientDataResponse)
+@query_budget(1)
 def get_patient_dashboard_data(
     db: Session = Depends(get_db),
     patient_email: str = Query(...),
@@ -28,32 +39,50 @@ def get_patient_dashboard_data(
     session_date = ""
     session_notes = ""
 
-    patient = db.query(Patient).filter(Patient.PatientEmail == patient_email).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found please check the email or add patient to the system")
-
-    # Fetch the desired session
-    if session_id is not None:
-        session_query = db.query(SessionModel).filter(
-            SessionModel.PatientID == patient.PatientID,
-            SessionModel.SessionID == session_id
+    # One round-trip: patient + chosen session + its therapist (and login
+    # email) + the patient's session count via a window function.
+    # The window runs over all of the patient's sessions *before* one is
+    # picked, so the count is right even when a specific session_id is asked for.
+    patient_id = (
+        select(Patient.PatientID)
+        .where(Patient.PatientEmail == patient_email)
+        .limit(1)
+        .scalar_subquery()
+    )
+    ranked = (
+        select(
+            SessionModel.SessionID,
+            SessionModel.PatientID,
+            func.count().over(partition_by=SessionModel.PatientID).label("total_sessions"),
+            func.row_number().over(
+                partition_by=SessionModel.PatientID,
+                order_by=SessionModel.Timestamp.desc(),
+            ).label("recency"),
         )
-        session_obj = session_query.first()
-        if not session_obj:
-            raise HTTPException(status_code=404, detail="Session not found for this patient")
+        .where(SessionModel.PatientID == patient_id)
+        .subquery()
+    )
+    if session_id is not None:
+        pick = ranked.c.SessionID == session_id
     else:
-        session_obj = (
-            db.query(SessionModel)
-            .filter(SessionModel.PatientID == patient.PatientID)
-            .order_by(SessionModel.Timestamp.desc())
-            .first()
-        )
+        pick = ranked.c.recency == 1
 
-    total_sessions = (
-        db.query(SessionModel)
-        .filter(SessionModel.PatientID == patient.PatientID)
-        .count()
+    row = (
+        db.query(Patient, SessionModel, Therapist, TherapistLogin.email, ranked.c.total_sessions)
+        .outerjoin(ranked, and_(ranked.c.PatientID == Patient.PatientID, pick))
+        .outerjoin(SessionModel, SessionModel.SessionID == ranked.c.SessionID)
+        .outerjoin(Therapist, SessionModel.therapist)
+        .outerjoin(TherapistLogin, TherapistLogin.id == Therapist.TherapistID)
+        .filter(Patient.PatientID == patient_id)
+        .first()
     )
+    if not row:
+        raise HTTPException(status_code=404, detail="Patient not found please check the email or add patient to the system")
+    patient, session_obj, therapist, login_email, total_sessions = row
+
+    if session_id is not None and not session_obj:
+        raise HTTPException(status_code=404, detail="Session not found for this patient")
+    total_sessions = total_sessions or 0
 
     if session_obj:
         try:
@@ -65,12 +94,10 @@ def get_patient_dashboard_data(
 
         session_date = session_obj.SessionDate.strftime("%Y-%m-%d") if session_obj.SessionDate else ""
         session_notes = session_obj.SessionNotes or ""
-        therapist = db.query(Therapist).filter(Therapist.TherapistID == session_obj.TherapistID).first()
         if therapist:
             therapist_name = therapist.FullName
             therapist_contact = therapist.ContactInfo
-            therapist_login = db.query(TherapistLogin).filter(TherapistLogin.id == therapist.TherapistID).first()
-            therapist_email = therapist_login.email if therapist_login else "unknown"
+            therapist_email = login_email or "unknown"
 
     print(f"goodTHema: {good} , badThema: {bad}")
     return {
@@ -88,12 +115,23 @@ def get_patient_dashboard_data(
         "totalSessionsDone": total_sessions
     }
 
+def _patients_in_rank_order(db: Session, ids: List[int]) -> List[Patient]:
+    # Ids come ranked from the search index; one primary-key lookup for the rows
+    if not ids:
+        return []
+    by_id = {p.PatientID: p for p in db.query(Patient).filter(Patient.PatientID.in_(ids)).all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
 @router.get("/search-patients", response_model=List[PatientBasicInfo])
+@query_budget(1)
 def search_patients_by_name(
     name: str = Query(..., description="Partial or full patient name"),
+    limit: int = Query(PATIENT_SEARCH_DEFAULT_LIMIT, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    patients = db.query(Patient).filter(Patient.FullName.ilike(f"%{name}%")).all()
+    # Word-prefix match, case / niqqud / final-letter insensitive, best first
+    patients = _patients_in_rank_order(db, patient_search.search_names(name, limit))
     return [
         PatientBasicInfo(
             FullName=patient.FullName,
@@ -105,11 +143,13 @@ def search_patients_by_name(
     ]
 
 @router.get("/mail-search", response_model=List[PatientBasicInfo])
+@query_budget(1)
 def search_patients_by_mail(
     name: str = Query(..., description="Partial or full email"),
+    limit: int = Query(PATIENT_SEARCH_DEFAULT_LIMIT, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    patients = db.query(Patient).filter(Patient.PatientEmail.ilike(f"%{name}%")).all()
+    patients = _patients_in_rank_order(db, patient_search.search_emails(name, limit))
     return [
         PatientBasicInfo(
             FullName=patient.FullName,
@@ -120,27 +160,68 @@ def search_patients_by_mail(
         for patient in patients
     ]
 
+@router.get("/typeahead", response_model=List[PatientTypeaheadItem])
+async def patient_typeahead(
+    request: Request,
+    response: Response,
+    q: str = Query(..., description="What the user has typed so far"),
+    field: str = Query("name", pattern="^(name|email)$"),
+    limit: int = Query(10, ge=1, le=50),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Autocomplete: compact (id, name, email) rows straight from the search
+    index - no DB round-trip. Narrowing queries are answered from the
+    therapist's cached result for the shorter prefix.
+    Send If-None-Match to get 304 when nothing changed. Clients should
+    debounce and abort superseded requests; a request whose client already
+    went away is dropped before any work is done.
+    """
+    if patient_search.index.loaded_at is None:
+        await db_calls.run(patient_search.ensure_loaded)
+
+    etag = typeahead.etag(field, q, limit)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if await request.is_disconnected():
+        return Response(status_code=204)
+
+    rows = typeahead.search(str(user["id"]), field, q, limit)
+    response.headers.update(headers)
+    return [
+        PatientTypeaheadItem(PatientID=pid, FullName=name, PatientEmail=email)
+        for pid, name, email in rows
+    ]
+
+
 @router.get("/all-sessions", response_model=List[PatientSessionInfo])
+@query_budget(1)
 def get_all_sessions_for_patient(
     patient_email: str = Query(..., description="Patient email"),
     db: Session = Depends(get_db)
 ):
-    patient = db.query(Patient).filter(Patient.PatientEmail == patient_email).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
-
-    sessions = (
-        db.query(SessionModel)
-        .filter(SessionModel.PatientID == patient.PatientID)
-        .order_by(SessionModel.SessionDate.desc())
+    # Patient, its sessions and each session's therapist in one joined query
+    patients = (
+        db.query(Patient)
+        .outerjoin(Patient.sessions)
+        .outerjoin(SessionModel.therapist)
+        .options(contains_eager(Patient.sessions).contains_eager(SessionModel.therapist))
+        .filter(Patient.PatientEmail == patient_email)
+        .order_by(Patient.PatientID, SessionModel.SessionDate.desc())
+        .populate_existing()
         .all()
     )
+    if not patients:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    patient = patients[0]
+    sessions = patient.sessions
 
 
     # You can append an 'IsAnalyzed' field to each session in your result:
     result = []
     for s in sessions:
-        therapist = db.query(Therapist).filter(Therapist.TherapistID == s.TherapistID).first()
+        therapist = s.therapist
         therapist_name = therapist.FullName if therapist else None
         is_analyzed = bool(s.analysis and isinstance(s.analysis, str) and s.analysis.startswith("http"))
         result.append(
@@ -153,4 +234,125 @@ def get_all_sessions_for_patient(
                 IsAnalyzed=is_analyzed  # <-- Add this field to your schema
             )
         )
-    return result
\ No newline at end of file
+    return result
+
+# ─── paginated session history ──────────────────────────────────────────────
+# Column(s) to read for each field a client may ask for
+SESSION_FIELD_COLUMNS = {
+    "SessionID": [],                       # always returned
+    "SessionDate": [],                     # always read (cursor key)
+    "SessionNotes": [SessionModel.SessionNotes],
+    "SessionAnalysis": [SessionModel.analysis],
+    "IsAnalyzed": [SessionModel.analysis],
+    "TherapistName": [Therapist.FullName],
+    "Transcript": [SessionModel.Transcript],
+    "BlobURL": [SessionModel.BlobURL],
+    "PositiveCount": [SessionModel.PositiveCount],
+    "NegativeCount": [SessionModel.NegativeCount],
+}
+DEFAULT_SESSION_FIELDS = "SessionID,SessionDate,TherapistName,IsAnalyzed,SessionAnalysis"
+MAX_PAGE_SIZE = 100
+
+
+def _encode_cursor(session_date, session_id: int) -> str:
+    key = [session_date.isoformat() if session_date else None, session_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        date_str, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(date_str) if date_str else None), int(session_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _session_field_value(field: str, row):
+    if field == "SessionDate":
+        return row.SessionDate.strftime("%Y-%m-%d") if row.SessionDate else None
+    if field == "SessionAnalysis":
+        return row.analysis
+    if field == "IsAnalyzed":
+        return bool(row.analysis and isinstance(row.analysis, str) and row.analysis.startswith("http"))
+    if field == "TherapistName":
+        return row.FullName
+    return getattr(row, field)
+
+
+@router.get("/sessions", response_model=PatientSessionPage)
+@query_budget(1)
+def get_sessions_page(
+    patient_email: str = Query(..., description="Patient email"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    fields: str = Query(DEFAULT_SESSION_FIELDS, description="Comma-separated fields to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Newest-first session history, one page at a time.
+    Keyset pagination on (SessionDate, SessionID): every page is an index seek
+    (IX_Sessions_PatientID_SessionDate), so page 50 costs the same as page 1.
+    Only the columns behind the requested `fields` are read - list views
+    don't pull notes / transcript text they never show.
+    """
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in SESSION_FIELD_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(SESSION_FIELD_COLUMNS)}"
+        )
+    if "SessionID" not in wanted:
+        wanted.insert(0, "SessionID")
+
+    columns = [Patient.PatientID, SessionModel.SessionID, SessionModel.SessionDate]
+    for f in wanted:
+        for col in SESSION_FIELD_COLUMNS[f]:
+            if not any(col is c for c in columns):
+                columns.append(col)
+
+    # Seek past the cursor; SQL Server sorts NULL dates last in DESC order
+    join_on = SessionModel.PatientID == Patient.PatientID
+    if cursor:
+        after_date, after_id = _decode_cursor(cursor)
+        if after_date is None:
+            join_on = and_(join_on, SessionModel.SessionDate.is_(None), SessionModel.SessionID < after_id)
+        else:
+            join_on = and_(join_on, or_(
+                SessionModel.SessionDate < after_date,
+                and_(SessionModel.SessionDate == after_date, SessionModel.SessionID < after_id),
+                SessionModel.SessionDate.is_(None),
+            ))
+
+    patient_id = (
+        select(Patient.PatientID)
+        .where(Patient.PatientEmail == patient_email)
+        .limit(1)
+        .scalar_subquery()
+    )
+    # Patient LEFT JOIN its sessions: an existing patient always yields a row,
+    # so "not found" and "no (more) sessions" need no second query
+    query = db.query(*columns).select_from(Patient).outerjoin(SessionModel, join_on)
+    if "TherapistName" in wanted:
+        query = query.outerjoin(Therapist, SessionModel.therapist)
+    rows = (
+        query
+        .filter(Patient.PatientID == patient_id)
+        .order_by(SessionModel.SessionDate.desc(), SessionModel.SessionID.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    rows = [r for r in rows if r.SessionID is not None]
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(last.SessionDate, last.SessionID)
+
+    return PatientSessionPage(
+        items=[{f: _session_field_value(f, r) for f in wanted} for r in page],
+        next_cursor=next_cursor,
+    )
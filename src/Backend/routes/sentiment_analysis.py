@@ -1,21 +1,58 @@
 # routes/sentiment_analysis.py
 
 from fastapi import APIRouter, HTTPException, status, Depends
-from schemas.patient_data import SentimentAnalysisResponse, SentimentDetails  # <-- import your schemas
-from services.blob_service import upload_to_azure
+from services.blocking import io_calls
+from schemas.patient_data import (  # <-- import your schemas
+    SentimentAnalysisResponse,
+    SentimentDetails,
+    SentimentTrendPoint,
+    SentimentTrendResponse,
+)
+from services.blob_service import upload_json_to_azure
 from services.azure_sentiment import analyze_sentiment_from_blob, get_analysis_from_blob
-from services.sql_service import update_session_analysis, get_transcript_url_by_SID
+from services.analysis_cache import SingleFlight
+from services.sql_service import (
+    update_session_analysis,
+    get_transcript_url_by_SID,
+    get_analysis_url_by_SID,
+    get_sentiment_trend,
+)
 from services.token_service import get_current_user
 from pydantic import BaseModel
 
-import tempfile
-import os
-import json
-
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
+# Concurrent clicks on the same session share one analysis run
+_session_flight = SingleFlight()
+
 class AnalyzeRequest(BaseModel):
     session_id: int
+    force: bool = False  # re-run even if the session already has an analysis
+
+
+def _analyze_session(session_id: int, force: bool) -> tuple[dict, str]:
+    if not force:
+        existing_url = get_analysis_url_by_SID(session_id)
+        if existing_url:
+            return get_analysis_from_blob(existing_url), existing_url
+
+    transcript_url = get_transcript_url_by_SID(session_id)
+    if not transcript_url:
+        raise ValueError("No transcript URL found for that session.")
+
+    sentiment_data = analyze_sentiment_from_blob(transcript_url)
+
+    analysis_blob_url = upload_json_to_azure(
+        sentiment_data, f"{session_id}_analysis.json", folder="analysis"
+    )
+    update_session_analysis(
+        session_id=session_id,
+        analysis_blob_url=analysis_blob_url,
+        positive_count=sentiment_data.get("total_positive"),
+        negative_count=sentiment_data.get("total_negative"),
+    )
+    return sentiment_data, analysis_blob_url
+
 
 @router.post(
     "/analyze-sentiment/",
@@ -25,30 +62,15 @@ class AnalyzeRequest(BaseModel):
 async def analyze_sentiment(request: AnalyzeRequest):
     session_id = request.session_id
 
-    tmp_path = None
-
     try:
-        transcript_url = get_transcript_url_by_SID(session_id)
-        if not transcript_url:
-            raise ValueError("No transcript URL found for that session.")
-
-        sentiment_data = analyze_sentiment_from_blob(transcript_url)
-
-        tmp_filename = f"{session_id}_analysis.json"
-        with tempfile.NamedTemporaryFile("w+", delete=False, suffix=".json", encoding="utf-8") as tmp:
-            json.dump(sentiment_data, tmp, indent=2, ensure_ascii=False)
-            tmp_path = tmp.name
-
-        analysis_blob_url = upload_to_azure(tmp_path, tmp_filename, folder="analysis")
-        update_session_analysis(session_id=session_id, analysis_blob_url=analysis_blob_url)
-
+        sentiment_data, analysis_blob_url = await io_calls.run(
+            _session_flight.do,
+            ("session", session_id, request.force),
+            lambda: _analyze_session(session_id, request.force),
+        )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {exc}") from exc
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-
     sentiment_details = SentimentDetails(**sentiment_data)
 
     return SentimentAnalysisResponse(
@@ -87,3 +109,51 @@ def get_analysis_from_url(url: str):
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Failed to fetch analysis: {exc}") from exc
     
+
+
+def _ratio(positive: int | None, negative: int | None) -> float | None:
+    if positive is None or not negative:
+        return None
+    return round(positive / negative, 2)
+
+
+@router.get("/trend/", response_model=SentimentTrendResponse)
+def get_sentiment_trend_for_patient(patient_email: str):
+    """
+    Per-session positive/negative counts and ratios for a patient, oldest first,
+    plus totals - one DB query, no analysis blobs are downloaded.
+    """
+    try:
+        rows = get_sentiment_trend(patient_email)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to load sentiment trend: {exc}") from exc
+
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    points = []
+    total_positive = total_negative = missing = 0
+    for r in rows:
+        positive, negative = r["PositiveCount"], r["NegativeCount"]
+        if positive is None or negative is None:
+            missing += 1
+        else:
+            total_positive += positive
+            total_negative += negative
+        points.append(SentimentTrendPoint(
+            session_id=r["SessionID"],
+            session_date=r["SessionDate"].strftime("%Y-%m-%d") if r["SessionDate"] else None,
+            total_positive=positive,
+            total_negative=negative,
+            ratio=_ratio(positive, negative),
+        ))
+
+    return SentimentTrendResponse(
+        patient_email=patient_email,
+        sessions=points,
+        total_positive=total_positive,
+        total_negative=total_negative,
+        ratio=_ratio(total_positive, total_negative),
+        analyzed_sessions=len(points),
+        missing_counts=missing,
+    )
@@ -1,13 +1,20 @@
 # routes/transcription.py
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import PlainTextResponse
 from services.token_service import get_current_user
 from pydantic import BaseModel, HttpUrl
 
-from services.azure_transcription import transcribe_dialog
+from services.azure_transcription import (
+    transcribe_dialog_async,
+    verify_webhook_signature,
+    notify_transcription_event,
+)
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
+# Azure Speech calls this one directly, so it is authenticated by signature, not JWT
+callback_router = APIRouter()
 
 
 class TranscriptionIn(BaseModel):
@@ -27,8 +34,8 @@ async def transcribe_audio(body: TranscriptionIn):
     return both the dialog lines and the blob URL.
     """
     try:
-        # transcribe_dialog now gives (lines, txt_url)
-        lines, txt_url = transcribe_dialog(str(body.sas_url), body.locale)
+        # transcribe_dialog_async gives (lines, txt_url) without blocking the event loop
+        lines, txt_url = await transcribe_dialog_async(str(body.sas_url), body.locale)
 
         # optional debug print
         for l in lines:
@@ -39,3 +46,22 @@ async def transcribe_audio(body: TranscriptionIn):
     except Exception as exc:
         # always convert to str so the detail is JSON-serialisable
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@callback_router.post("/callback")
+async def speech_webhook(request: Request):
+    """
+    Azure Speech web hook.
+    * Registration handshake: echo `validationToken`.
+    * TranscriptionCompletion: wake up the task waiting for that job.
+    """
+    validation_token = request.query_params.get("validationToken")
+    if validation_token:
+        return PlainTextResponse(validation_token)
+
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("X-MicrosoftSpeechServices-Signature")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    notify_transcription_event(await request.json())
+    return {"status": "ok"}
@@ -11,6 +11,17 @@ class TherapistLoginResponse(BaseModel):
     access_token: str
     full_name :str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+    expires_in: int | None = None    # access token lifetime, seconds
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class TokenPairResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    token_type: str = "bearer"
 
 class ForgotPasswordRequest(BaseModel):
     email: str
@@ -40,4 +40,28 @@ class SentimentDetails(BaseModel):
 class SentimentAnalysisResponse(BaseModel):
     status: str
     sentiment: SentimentDetails
-    analysis_url: str
\ No newline at end of file
+    analysis_url: str
+class SentimentTrendPoint(BaseModel):
+    session_id: int
+    session_date: str | None
+    total_positive: int | None
+    total_negative: int | None
+    ratio: float | None        # positive / negative, None when not computable
+
+class SentimentTrendResponse(BaseModel):
+    patient_email: str
+    sessions: List[SentimentTrendPoint]
+    total_positive: int
+    total_negative: int
+    ratio: float | None
+    analyzed_sessions: int
+    missing_counts: int        # analyzed before counters existed (needs backfill)
+
+class PatientSessionPage(BaseModel):
+    items: List[dict]              # only the requested `fields`
+    next_cursor: str | None        # pass back as `cursor` for the next page
+
+class PatientTypeaheadItem(BaseModel):
+    PatientID: int
+    FullName: str | None
+    PatientEmail: str | None
@@ -0,0 +1,118 @@
+# services/analysis_cache.py
+"""
+Content-addressed cache for sentiment analysis results
+------------------------------------------------------
+
+* Key = sha256(pipeline version + cleaned transcript text), so the same
+  conversation is never analyzed twice and a pipeline change (new prompt,
+  new model) invalidates everything by bumping the version.
+* Tier 1: in-process LRU.   Tier 2: blob `analysis/cache/<key>.json`,
+  shared by every replica and surviving restarts.
+* Single-flight: concurrent requests for the same key wait for the one
+  computation already in progress instead of starting their own.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from services.blob_service import read_json_blob, upload_json_to_azure
+
+CACHE_FOLDER = "analysis/cache"
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AnalysisCache:
+    def __init__(self, max_entries: int, pipeline_version: str):
+        self.max_entries = max_entries
+        self.pipeline_version = pipeline_version
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.stats = {"memory_hits": 0, "blob_hits": 0, "misses": 0}
+
+    def key_for(self, cleaned_text: str) -> str:
+        h = hashlib.sha256()
+        h.update(self.pipeline_version.encode("utf-8"))
+        h.update(b"\n")
+        h.update(cleaned_text.encode("utf-8"))
+        return h.hexdigest()
+
+    def _get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def _put_local(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get_or_compute(self, cleaned_text: str, compute: Callable[[], dict]) -> dict:
+        key = self.key_for(cleaned_text)
+
+        value = self._get_local(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        return self._flight.do(key, lambda: self._load_or_compute(key, compute))
+
+    def _load_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        blob_name = f"{CACHE_FOLDER}/{key}.json"
+        try:
+            value = read_json_blob(blob_name)
+        except Exception as e:
+            print(f"⚠️ Analysis cache read failed for {key}: {e}")
+            value = None
+
+        if value is not None:
+            self.stats["blob_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            value = compute()
+            try:
+                upload_json_to_azure(value, f"{key}.json", folder=CACHE_FOLDER)
+            except Exception as e:
+                # A cache write failure must never fail the analysis itself
+                print(f"⚠️ Analysis cache write failed for {key}: {e}")
+
+        self._put_local(key, value)
+        return value
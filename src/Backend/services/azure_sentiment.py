@@ -1,10 +1,12 @@
 import os
 import re
 import json
-import requests
 import tempfile
 from dotenv import load_dotenv
 from services.blob_service import download_blob_to_tempfile
+from services.http_client import request
+from services.analysis_cache import AnalysisCache
+from config import ANALYSIS_CACHE_SIZE
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 load_dotenv()
@@ -17,22 +19,42 @@ AZURE_ENDPOINT = os.getenv("AZURE_LANGUAGE_ENDPOINT")
 if not all([GEMINI_API_KEY, AZURE_API_KEY, AZURE_ENDPOINT]):
     raise RuntimeError("Missing one or more required environment variables for sentiment analysis.")
 
+# Bump whenever prompts / models / result shape change: invalidates cached analyses
+ANALYSIS_PIPELINE_VERSION = "sentiment-v2"
+
+analysis_cache = AnalysisCache(ANALYSIS_CACHE_SIZE, ANALYSIS_PIPELINE_VERSION)
+
+# Azure Language (synchronous sentiment) service limits
+AZURE_MAX_DOCS_PER_REQUEST = 10
+AZURE_MAX_CHARS_PER_DOC = 5120
+AZURE_MAX_CHARS_PER_REQUEST = 50_000
+# Bounded fan-out + throttling policy
+AZURE_MAX_CONCURRENT_REQUESTS = 4
+AZURE_MAX_RETRIES = 4
+
 
 # === Public entry point ===
 def analyze_sentiment_from_blob(blob_url: str) -> dict:
     tmp_path = download_blob_to_tempfile(blob_url)
 
     try:
-        result_json_str = analyze_conversation(tmp_path)
-        return json.loads(result_json_str)
+        cleaned_text = load_and_clean_text(tmp_path)
     finally:
         if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+    # Identical transcripts (and concurrent requests for one) are analyzed once
+    return analysis_cache.get_or_compute(
+        cleaned_text, lambda: json.loads(analyze_cleaned_text(cleaned_text))
+    )
+
 
 # === Core pipeline ===
 def analyze_conversation(file_path: str) -> str:
-    cleaned_text = load_and_clean_text(file_path)
+    return analyze_cleaned_text(load_and_clean_text(file_path))
+
+
+def analyze_cleaned_text(cleaned_text: str) -> str:
     short_text = cleaned_text[:4000]
 
     # Concurrent: Gemini Language, Speaker, Summary
@@ -77,11 +99,14 @@ def split_speaker_turns(text: str):
 
 # === Gemini prompts ===
 def gemini_prompt(prompt: str) -> str:
-    response = requests.post(
+    # Pure generation call: safe to retry on 5xx / dropped responses
+    response = request(
+        "POST",
         "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
         headers={"Content-Type": "application/json"},
         params={"key": GEMINI_API_KEY},
-        json={"contents": [{"parts": [{"text": prompt}]}]}
+        json={"contents": [{"parts": [{"text": prompt}]}]},
+        idempotent=True,
     )
     response.raise_for_status()
     return response.json()['candidates'][0]['content']['parts'][0]['text']
@@ -120,7 +145,35 @@ def summarize_conversation(full_text: str) -> str:
 
 
 # === Azure NLP ===
-def analyze_sentence_azure(text: str, lang: str):
+def pack_documents(texts: list) -> list:
+    """
+    Pack texts into multi-document batches that respect the per-request
+    document count and character limits. Each document id is the index of
+    its text in `texts`, so results can be mapped back.
+    """
+    batches, current, current_chars = [], [], 0
+    for i, text in enumerate(texts):
+        text = text[:AZURE_MAX_CHARS_PER_DOC]
+        if current and (
+            len(current) >= AZURE_MAX_DOCS_PER_REQUEST
+            or current_chars + len(text) > AZURE_MAX_CHARS_PER_REQUEST
+        ):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append((str(i), text))
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def analyze_batch_azure(documents: list, lang: str) -> dict:
+    """
+    Analyze up to AZURE_MAX_DOCS_PER_REQUEST (id, text) pairs in one request.
+    Returns {id: (label, score)} for the documents that succeeded; documents
+    the service rejected individually are logged and left out.
+    Retries 429 / 5xx, honouring Retry-After (services/http_client.py).
+    """
     headers = {
         "Ocp-Apim-Subscription-Key": AZURE_API_KEY,
         "Content-Type": "application/json"
@@ -129,23 +182,57 @@ def analyze_sentence_azure(text: str, lang: str):
         "kind": "SentimentAnalysis",
         "parameters": {"loggingOptOut": False},
         "analysisInput": {
-            "documents": [{
-                "id": "1",
-                "language": lang,
-                "text": text
-            }]
+            "documents": [
+                {"id": doc_id, "language": lang, "text": text}
+                for doc_id, text in documents
+            ]
         }
     }
-    response = requests.post(AZURE_ENDPOINT, headers=headers, json=payload)
-    if response.status_code == 200:
-        result = response.json()
-        scores = result["results"]["documents"][0]["confidenceScores"]
+
+    response = request(
+        "POST", AZURE_ENDPOINT, headers=headers, json=payload,
+        retries=AZURE_MAX_RETRIES, idempotent=True,
+    )
+    response.raise_for_status()
+
+    results = response.json()["results"]
+    for err in results.get("errors", []):
+        print(f"[ERROR] Azure rejected document {err.get('id')}: {err.get('error', {}).get('message')}")
+
+    labels = {}
+    for doc in results.get("documents", []):
+        scores = doc["confidenceScores"]
         max_label = max(scores, key=scores.get)
-        return max_label, scores[max_label]
-    return None, 0.0
+        labels[doc["id"]] = (max_label, scores[max_label])
+    return labels
+
+
+def analyze_sentences_azure(texts: list, lang: str) -> dict:
+    """
+    Sentiment for many texts using multi-document requests with bounded
+    concurrency. Returns {index in texts: (label, score)}.
+    """
+    labels = {}
+    batches = pack_documents(texts)
+    with ThreadPoolExecutor(max_workers=AZURE_MAX_CONCURRENT_REQUESTS) as executor:
+        future_to_batch = {
+            executor.submit(analyze_batch_azure, batch, lang): batch for batch in batches
+        }
+        for future in as_completed(future_to_batch):
+            batch = future_to_batch[future]
+            try:
+                for doc_id, result in future.result().items():
+                    labels[int(doc_id)] = result
+            except Exception as e:
+                print(f"[ERROR] Failed to analyze batch of {len(batch)} sentences | {e}")
+    return labels
 
 
-# === Sentiment statistics (multi-threaded) ===
+def analyze_sentence_azure(text: str, lang: str):
+    return analyze_sentences_azure([text], lang).get(0, (None, 0.0))
+
+
+# === Sentiment statistics (batched) ===
 def get_sentiment_statistics(text: str, lang: str, speaker: str) -> dict:
     sentences = split_speaker_turns(text)
 
@@ -162,23 +249,15 @@ def get_sentiment_statistics(text: str, lang: str, speaker: str) -> dict:
     positive_scores = {}
     negative_scores = {}
 
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        future_to_sentence = {
-            executor.submit(analyze_sentence_azure, s, lang): s for s in filtered
-        }
-
-        for future in as_completed(future_to_sentence):
-            sentence = future_to_sentence[future]
-            try:
-                label, score = future.result()
-                if label == "positive":
-                    total_positive += 1
-                    positive_scores[sentence] = score
-                elif label == "negative":
-                    total_negative += 1
-                    negative_scores[sentence] = score
-            except Exception as e:
-                print(f"[ERROR] Failed to analyze: {sentence[:50]}... | {e}")
+    labels = analyze_sentences_azure(filtered, lang)
+    for i, sentence in enumerate(filtered):
+        label, score = labels.get(i, (None, 0.0))
+        if label == "positive":
+            total_positive += 1
+            positive_scores[sentence] = score
+        elif label == "negative":
+            total_negative += 1
+            negative_scores[sentence] = score
 
     return {
         'total_positive': total_positive,
@@ -1,14 +1,38 @@
 # services/azure_transcription.py
 from __future__ import annotations
 
+import asyncio
+import base64
+import hashlib
+import hmac
 import os
-import time
+import re
+import threading
 import uuid
+from concurrent.futures import Future
 from datetime import timedelta
-from typing import List, Tuple
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
 
-import requests
-# 
+from config import (
+    SPEECH_POLL_MIN_INTERVAL,
+    SPEECH_POLL_MAX_INTERVAL,
+    SPEECH_JOB_DEADLINE,
+    AZURE_SPEECH_WEBHOOK_URL,
+    AZURE_SPEECH_WEBHOOK_SECRET,
+    SPEECH_WEBHOOK_FALLBACK_POLL,
+)
+import httpx
+
+from services.http_client import arequest, retry_after_seconds, RETRY_IDEMPOTENT
+
+API_PATH = "/speechtotext/v3.0"
+
+# 16 kHz / 16-bit / mono PCM - what the recording page produces
+WAV_BYTES_PER_SECOND = 32_000
+# Batch transcription typically finishes in a fraction of the audio length
+EXPECTED_REALTIME_FACTOR = 0.1
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers
 # ──────────────────────────────────────────────────────────────────────────────
@@ -45,121 +69,410 @@ def _td_to_str(td: timedelta) -> str:
     return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
 
 
-# ──────────────────────────────────────────────────────────────────────────────
-# Public API
-# ──────────────────────────────────────────────────────────────────────────────
-def transcribe_dialog(
-    sas_url: str,
-    locale: str = "he-IL",
-    poll_interval: int = 10,
-) -> Tuple[List[str], str]:
-    print("🔹 Starting transcription process...")
-
+def _speech_settings() -> Tuple[str, str]:
     key = os.getenv("AZURE_SPEECH_KEY")
     endpoint = os.getenv("AZURE_SPEECH_ENDPOINT")
     if not (key and endpoint):
         print("❌ Missing AZURE_SPEECH_KEY or AZURE_SPEECH_ENDPOINT environment variables.")
         raise RuntimeError("AZURE_SPEECH_KEY / AZURE_SPEECH_ENDPOINT env-vars missing")
+    return key, endpoint.rstrip("/")
+
+
+def _job_id(job_url: str) -> str:
+    """Last path segment of a transcription URL - what webhooks refer to."""
+    return job_url.split("?")[0].rstrip("/").rsplit("/", 1)[-1].lower()
+
+
+def _format_dialog(result_json: dict) -> List[str]:
+    """Build nice “HH:MM:SS — Speaker n: text” lines."""
+    dialog = []
+    for ph in result_json["recognizedPhrases"]:
+        ts = _td_to_str(_parse_iso_dur(ph["offset"]))
+        spk = ph.get("speaker", "Unknown")
+        txt = ph["nBest"][0]["display"].strip()
+        dialog.append((ts, spk, txt))
+    dialog.sort(key=lambda t: t[0])
+    return [f"{ts}  Speaker {spk}:  {txt}" for ts, spk, txt in dialog]
+
+
+def _next_poll_delay(
+    previous: Optional[float],
+    status: str,
+    audio_duration: Optional[float],
+    retry_after: Optional[float] = None,
+) -> float:
+    """
+    Adaptive polling: first wait ≈ the expected processing time of the
+    recording, then back off exponentially up to SPEECH_POLL_MAX_INTERVAL.
+    Jobs still queued ("NotStarted") are polled at half the rate.
+    """
+    if retry_after:
+        delay = retry_after
+    elif previous is None:
+        expected = (audio_duration or 0) * EXPECTED_REALTIME_FACTOR
+        delay = expected or SPEECH_POLL_MIN_INTERVAL
+    else:
+        delay = previous * 1.5
+    if status == "NotStarted":
+        delay *= 2
+    return max(SPEECH_POLL_MIN_INTERVAL, min(delay, SPEECH_POLL_MAX_INTERVAL))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Background event loop - every speech call runs here so that worker threads
+# and async routes share one HTTP connection pool and one webhook registry.
+# ──────────────────────────────────────────────────────────────────────────────
+class _SpeechLoop:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self.loop.run_forever, name="speech-loop", daemon=True
+                ).start()
+            return self.loop
+
+    def run(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure())
+
+    def call_soon(self, fn, *args) -> None:
+        self._ensure().call_soon_threadsafe(fn, *args)
+
+
+_speech_loop = _SpeechLoop()
+
+
+class _WebhookRegistry:
+    """Futures waiting for Azure's `TranscriptionCompletion` callbacks (speech loop only)."""
+
+    def __init__(self):
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._registered: Optional[bool] = None
+        self._register_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(AZURE_SPEECH_WEBHOOK_URL) and self._registered is not False
+
+    async def ensure_registered(self, endpoint: str, headers: dict) -> bool:
+        if not AZURE_SPEECH_WEBHOOK_URL:
+            return False
+        if self._register_lock is None:
+            self._register_lock = asyncio.Lock()
+        async with self._register_lock:
+            if self._registered is not None:
+                return self._registered
+            try:
+                resp = await arequest("GET", f"{endpoint}{API_PATH}/webhooks", headers=headers)
+                resp.raise_for_status()
+                hooks = resp.json().get("values", [])
+                if not any(h.get("webUrl") == AZURE_SPEECH_WEBHOOK_URL for h in hooks):
+                    body = {
+                        "displayName": "therapyai-transcriptions",
+                        "webUrl": AZURE_SPEECH_WEBHOOK_URL,
+                        "events": {"transcriptionCompletion": True},
+                        "properties": {"secret": AZURE_SPEECH_WEBHOOK_SECRET},
+                    }
+                    resp = await arequest("POST", f"{endpoint}{API_PATH}/webhooks", headers=headers, json=body)
+                    resp.raise_for_status()
+                print(f"🔔 Speech webhook active: {AZURE_SPEECH_WEBHOOK_URL}")
+                self._registered = True
+            except Exception as e:
+                print(f"⚠️ Could not register speech webhook, falling back to polling: {e}")
+                self._registered = False
+            return self._registered
+
+    def expect(self, job_url: str) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[_job_id(job_url)] = fut
+        return fut
+
+    def forget(self, job_url: str) -> None:
+        self._waiters.pop(_job_id(job_url), None)
+
+    def resolve(self, job_url: str) -> None:
+        fut = self._waiters.pop(_job_id(job_url), None)
+        if fut is not None and not fut.done():
+            fut.set_result(True)
+
+
+_webhooks = _WebhookRegistry()
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Azure signs callbacks with base64(HMAC-SHA256(secret, body))."""
+    if not AZURE_SPEECH_WEBHOOK_SECRET:
+        return True
+    if not signature:
+        return False
+    digest = hmac.new(AZURE_SPEECH_WEBHOOK_SECRET.encode(), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), signature)
+
+
+def notify_transcription_event(payload: dict) -> None:
+    """Called by the webhook route; wakes up whoever waits for that job."""
+    job_url = payload.get("self")
+    if job_url:
+        _speech_loop.call_soon(_webhooks.resolve, job_url)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Core coroutine (runs on the speech loop)
+# ──────────────────────────────────────────────────────────────────────────────
+async def _estimate_audio_duration(sas_url: str) -> Optional[float]:
+    """Recording length in seconds, from the blob's reported size."""
+    try:
+        resp = await arequest("HEAD", sas_url, retries=0)
+        size = int(resp.headers.get("Content-Length", 0))
+        return size / WAV_BYTES_PER_SECOND if size else None
+    except Exception:
+        return None
+
+
+async def _get_job(job_url: str, headers: dict) -> Tuple[dict, Optional[float]]:
+    """
+    One status poll. Throttling, 5xx answers and dropped connections come
+    back as an "Unavailable" status instead of raising, so _wait_for_job
+    backs off and polls again until its deadline rather than abandoning
+    (and deleting) a job that is still running on Azure.
+    """
+    try:
+        resp = await arequest("GET", job_url, headers=headers, retries=0)
+    except httpx.TransportError as e:
+        print(f"⚠️ Speech job poll failed ({e!r}), will retry")
+        return {"status": "Unavailable"}, None
+    if resp.status_code in RETRY_IDEMPOTENT:
+        print(f"⚠️ Speech job poll returned {resp.status_code}, will retry")
+        return {"status": "Unavailable"}, retry_after_seconds(resp)
+    resp.raise_for_status()
+    return resp.json(), retry_after_seconds(resp)
+
+
+async def _wait_for_job(
+    job_url: str,
+    headers: dict,
+    deadline: float,
+    audio_duration: Optional[float],
+) -> dict:
+    loop = asyncio.get_running_loop()
+    waiter = _webhooks.expect(job_url) if _webhooks.enabled else None
+    delay = None
+    try:
+        while True:
+            job, retry_after = await _get_job(job_url, headers)
+            status = job.get("status")
+            print(f"⏳ Current status: {status}")
+            if status in {"Succeeded", "Failed"}:
+                return job
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Azure Speech job did not finish in time: {job_url}")
 
+            if status == "Unavailable":
+                # Transient poll failure: back off, whichever mode we're in
+                delay = _next_poll_delay(delay, status, audio_duration, retry_after)
+                await asyncio.sleep(min(delay, remaining))
+            elif waiter is not None:
+                # Webhook mode: sleep until Azure calls us; poll only as a safety net
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(waiter),
+                        timeout=min(SPEECH_WEBHOOK_FALLBACK_POLL, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                if waiter.done():
+                    waiter = _webhooks.expect(job_url)
+            else:
+                delay = _next_poll_delay(delay, status, audio_duration, retry_after)
+                await asyncio.sleep(min(delay, remaining))
+    finally:
+        _webhooks.forget(job_url)
+
+
+async def _delete_job(job_url: str, headers: dict) -> None:
+    try:
+        await arequest("DELETE", job_url, headers=headers)
+    except Exception as e:
+        print(f"⚠️ Could not delete speech job {job_url}: {e}")
+
+
+def source_key(url: str) -> str:
+    """Blob path of a content URL, without SAS query - stable across SAS tokens."""
+    return urlparse(url).path.rstrip("/").lower()
+
+
+def _match_result_files(sas_urls: List[str], files: List[dict], results: List[dict]) -> Dict[str, dict]:
+    """
+    Map every Transcription result back to the recording it came from:
+    by its `source` URL, falling back to the `contenturl_<n>.json` index.
+    """
+    by_source = {source_key(u): u for u in sas_urls}
+    matched: Dict[str, dict] = {}
+    for file_info, result in zip(files, results):
+        url = by_source.get(source_key(result.get("source", "")))
+        if url is None:
+            m = re.search(r"contenturl_(\d+)\.json$", file_info.get("name", ""))
+            if m and int(m.group(1)) < len(sas_urls):
+                url = sas_urls[int(m.group(1))]
+        if url is not None:
+            matched[url] = result
+    return matched
+
+
+async def transcribe_many(
+    sas_urls: List[str],
+    locale: str,
+    deadline_seconds: Optional[float] = None,
+) -> Dict[str, Union[Tuple[List[str], str], Exception]]:
+    """
+    Transcribe several recordings with ONE Azure Speech job (one submit,
+    one polling loop, one /files listing). Returns {sas_url: (lines, url)}
+    or {sas_url: Exception} for recordings that failed individually.
+    Must run on the speech loop - schedule it with run_on_speech_loop().
+    """
+    print(f"🔹 Starting transcription process for {len(sas_urls)} recording(s)...")
+    key, endpoint = _speech_settings()
     print(f"✅ Environment variables loaded. Endpoint: {endpoint}")
 
-    # 1.  Kick off the job ------------------------------------------------------
-    print("📤 Submitting transcription job to Azure Speech service...")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (deadline_seconds or SPEECH_JOB_DEADLINE)
     headers = {
         "Ocp-Apim-Subscription-Key": key,
         "Content-Type": "application/json",
     }
+
+    # Azure processes the files in parallel, so the longest one sets the pace
+    durations = await asyncio.gather(*(_estimate_audio_duration(u) for u in sas_urls))
+    audio_duration = max((d for d in durations if d), default=None)
+    await _webhooks.ensure_registered(endpoint, headers)
+
+    # 1.  Kick off the job ------------------------------------------------------
+    print("📤 Submitting transcription job to Azure Speech service...")
     body = {
         "displayName": f"chat-{uuid.uuid4()}",
         "description": "API transcription with diarization",
         "locale": locale,
-        "contentUrls": [sas_url],
+        "contentUrls": list(sas_urls),
         "properties": {
             "diarizationEnabled": True,
             "punctuationMode": "DictatedAndAutomatic",
         },
     }
     try:
-        resp = requests.post(f"{endpoint}/speechtotext/v3.0/transcriptions",
-                             headers=headers, json=body)
+        # Only 429 / 503 ("not processed") are retried: repeating the submit
+        # after a 500 / 502 / 504 could start the same (billed) job twice
+        resp = await arequest(
+            "POST", f"{endpoint}{API_PATH}/transcriptions", headers=headers, json=body
+        )
         print(f"✅ Transcription job submitted. Status code: {resp.status_code}")
         resp.raise_for_status()
     except Exception as e:
         print(f"❌ Error submitting transcription job: {e}")
         raise
 
-    with open("transcription_post_response.json", "w", encoding="utf-8") as f:
-        f.write(str(resp.headers))
-
     job_url = resp.headers.get("Location")
     if not job_url:
         print("❌ No 'Location' header found in response.")
         raise RuntimeError("No job URL returned from Azure.")
-
     print(f"🔗 Job URL: {job_url}")
 
-    # 2.  Poll until done -------------------------------------------------------
-    print("🕒 Polling for transcription job status...")
-    while True:
+    try:
+        # 2.  Wait until done (webhook or adaptive polling) ---------------------
+        print("🕒 Waiting for transcription job to finish...")
+        job = await _wait_for_job(job_url, headers, deadline, audio_duration)
+        if job.get("status") != "Succeeded":
+            print(f"❌ Transcription job failed with status: {job.get('status')}")
+            raise RuntimeError(f"Azure Speech job failed: {job}")
+
+        # 3.  Grab the JSON result files (one per recording) -------------------
+        print("📥 Retrieving transcription result files...")
+        files_resp = await arequest("GET", job_url + "/files", headers=headers)
+        files_resp.raise_for_status()
+        files = [f for f in files_resp.json()["values"] if f["kind"] == "Transcription"]
+
+        async def fetch(f):
+            r = await arequest("GET", f["links"]["contentUrl"])
+            r.raise_for_status()
+            return r.json()
+
+        results = await asyncio.gather(*(fetch(f) for f in files))
+        print(f"✅ {len(results)} transcription result JSON(s) retrieved.")
+    except BaseException:
+        # Timeout, cancellation or failure: don't leave the job running on Azure
+        await asyncio.shield(_delete_job(job_url, headers))
+        raise
+
+    await _delete_job(job_url, headers)
+    matched = _match_result_files(sas_urls, files, results)
+
+    # 4 + 5.  Format lines and save each transcript to Blob as <wav>.txt -------
+    from services.blob_service import upload_transcript_to_azure
+
+    async def finish(sas_url: str):
+        wav_name = PurePosixPath(sas_url.split("?")[0]).name     # strip SAS query
+        result_json = matched.get(sas_url)
+        if result_json is None:
+            return RuntimeError(f"Azure Speech returned no transcription for {wav_name}")
         try:
-            job = requests.get(job_url, headers=headers).json()
-            status = job.get("status")
-            print(f"⏳ Current status: {status}")
-            if status in {"Succeeded", "Failed"}:
-                break
-            time.sleep(poll_interval)
+            lines = _format_dialog(result_json)
+            transcript_url = await asyncio.to_thread(upload_transcript_to_azure, lines, wav_name)
+            print(f"✅ Transcript uploaded. URL: {transcript_url}")
+            return lines, transcript_url
         except Exception as e:
-            print(f"❌ Error while polling job status: {e}")
-            raise
+            print(f"❌ Error finishing transcript for {wav_name}: {e}")
+            return e
 
-    print("✅ Done polling.")
-    if status != "Succeeded":
-        print(f"❌ Transcription job failed with status: {status}")
-        raise RuntimeError(f"Azure Speech job failed: {job}")
+    outcomes = await asyncio.gather(*(finish(u) for u in sas_urls))
+    return dict(zip(sas_urls, outcomes))
 
-    # 3.  Grab the JSON result file --------------------------------------------
-    print("📥 Retrieving transcription result file...")
-    try:
-        files_url = job_url + "/files"
-        files = requests.get(files_url, headers=headers).json()["values"]
-        tr_json_url = next(f["links"]["contentUrl"]
-                           for f in files if f["kind"] == "Transcription")
-        result_json = requests.get(tr_json_url).json()
-    except Exception as e:
-        print(f"❌ Error retrieving result JSON: {e}")
-        raise
 
-    print("✅ Transcription result JSON retrieved.")
+async def _transcribe(
+    sas_url: str,
+    locale: str,
+    deadline_seconds: Optional[float],
+) -> Tuple[List[str], str]:
+    outcome = (await transcribe_many([sas_url], locale, deadline_seconds))[sas_url]
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
 
-    # 4.  Build nice “HH:MM:SS — Speaker n: text” lines -------------------------
-    print("📝 Formatting dialog lines...")
-    dialog = []
-    try:
-        for ph in result_json["recognizedPhrases"]:
-            ts = _td_to_str(_parse_iso_dur(ph["offset"]))
-            spk = ph.get("speaker", "Unknown")
-            txt = ph["nBest"][0]["display"].strip()
-            dialog.append((ts, spk, txt))
-    except Exception as e:
-        print(f"❌ Error processing recognized phrases: {e}")
-        raise
 
-    dialog.sort(key=lambda t: t[0])
-    lines = [f"{ts}  Speaker {spk}:  {txt}" for ts, spk, txt in dialog]
-    print("✅ Dialog lines formatted.")
+def run_on_speech_loop(coro) -> Future:
+    """Schedule a coroutine on the shared speech loop (thread-safe)."""
+    return _speech_loop.run(coro)
 
-    # 5.  Save to Blob as <wav>.txt --------------------------------------------
-    print("📤 Uploading transcript to Azure Blob Storage...")
-    try:
-        from pathlib import PurePosixPath
-        from services.blob_service import upload_transcript_to_azure
 
-        wav_name = PurePosixPath(sas_url.split("?")[0]).name     # strip SAS query
-        transcript_url = upload_transcript_to_azure(lines, wav_name)
-    except Exception as e:
-        print(f"❌ Error uploading transcript to blob: {e}")
-        raise
+# ──────────────────────────────────────────────────────────────────────────────
+# Public API
+# ──────────────────────────────────────────────────────────────────────────────
+async def transcribe_dialog_async(
+    sas_url: str,
+    locale: str = "he-IL",
+    deadline: Optional[float] = None,
+) -> Tuple[List[str], str]:
+    """
+    Non-blocking transcription for async routes. Cancelling the awaiting
+    task cancels the Azure job as well.
+    """
+    fut = _speech_loop.run(_transcribe(sas_url, locale, deadline))
+    return await asyncio.wrap_future(fut)
 
-    print(f"✅ Transcript uploaded. URL: {transcript_url}")
 
-    return lines, transcript_url
+def transcribe_dialog(
+    sas_url: str,
+    locale: str = "he-IL",
+    deadline: Optional[float] = None,
+) -> Tuple[List[str], str]:
+    """Blocking variant for worker threads (never call it from an event loop)."""
+    fut = _speech_loop.run(_transcribe(sas_url, locale, deadline))
+    try:
+        return fut.result()
+    except BaseException:
+        fut.cancel()
+        raise
@@ -13,14 +13,16 @@ Blob helpers  +  short-lived SAS  +  dbo.Sessions insert
 """
 
 from __future__ import annotations
+import json
 import os
 import tempfile
 from datetime import datetime, timedelta
 from typing import List
-import requests
 import pymssql
 from azure.storage.blob import (
     BlobServiceClient,
+    BlobBlock,
+    ContentSettings,
     generate_blob_sas,
     BlobSasPermissions,
 )
@@ -81,6 +83,61 @@ def upload_to_azure(local_path: str, blob_name: str, folder: str | None = None)
     print(f"✅ Upload successful: {blob_url}")
     return blob_url
 
+# ---------------------------------------------------------------------------
+# ❸  Block-blob staging: upload in pieces, nothing is visible until commit
+# ---------------------------------------------------------------------------
+def blob_url_for(blob_name: str) -> str:
+    return f"{_container.url}/{blob_name}"
+
+def unique_blob_name(folder: str, filename: str, token: str) -> str:
+    """<folder>/<stem>-<token><ext>: one blob per upload, even for the same filename."""
+    stem, ext = os.path.splitext(filename)
+    return f"{folder.rstrip('/')}/{stem}-{token}{ext}"
+
+def stage_block(blob_name: str, block_id: str, data: bytes) -> None:
+    """Upload one uncommitted block. Ids must have equal length per blob (the SDK base64-encodes them)."""
+    _container.get_blob_client(blob_name).stage_block(block_id=block_id, data=data, length=len(data))
+
+def commit_blocks(blob_name: str, block_ids: List[str], content_type: str) -> str:
+    """Assemble staged blocks (in order) into the final blob. Returns the HTTPS URL."""
+    _container.get_blob_client(blob_name).commit_block_list(
+        [BlobBlock(block_id=b) for b in block_ids],
+        content_settings=ContentSettings(content_type=content_type),
+    )
+    return blob_url_for(blob_name)
+
+def list_uncommitted_blocks(blob_name: str) -> List[tuple[str, int]]:
+    """(block_id, size) of blocks staged but not yet committed."""
+    from azure.core.exceptions import ResourceNotFoundError
+
+    try:
+        _, uncommitted = _container.get_blob_client(blob_name).get_block_list("uncommitted")
+    except ResourceNotFoundError:
+        return []
+    return [(b.id, b.size) for b in uncommitted]
+
+def upload_json_to_azure(data, blob_name: str, folder: str | None = None) -> str:
+    """Serialize `data` and upload it directly (no temp file). Returns the HTTPS URL."""
+    if folder:
+        blob_name = f"{folder.rstrip('/')}/{blob_name}"
+    _container.upload_blob(
+        name=blob_name,
+        data=json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+        overwrite=True,
+        content_type="application/json",
+    )
+    return f"{_container.url}/{blob_name}"
+
+def read_json_blob(blob_name: str):
+    """Parsed JSON of `blob_name` in the current container, or None if it doesn't exist."""
+    from azure.core.exceptions import ResourceNotFoundError
+
+    try:
+        raw = _container.get_blob_client(blob_name).download_blob().readall()
+    except ResourceNotFoundError:
+        return None
+    return json.loads(raw.decode("utf-8"))
+
 def create_sas_url(blob_name: str, minutes: int = 120) -> str:
     print(f"🔐 Generating SAS URL for blob '{blob_name}' (expires in {minutes} minutes)...")
     sas = generate_blob_sas(
@@ -109,6 +166,17 @@ def upload_transcript_to_azure(lines: List[str], wav_filename: str) -> str:
     print(f"🧹 Temporary file deleted: {tmp_path}")
     return url
 
+def find_transcript_url(wav_filename: str) -> str | None:
+    """
+    Return the URL of the transcript previously saved for `wav_filename`
+    by `upload_transcript_to_azure`, or None if it does not exist.
+    """
+    txt_name = f"transcriptions/{os.path.splitext(wav_filename)[0]}.txt"
+    blob_client = _container.get_blob_client(txt_name)
+    if not blob_client.exists():
+        return None
+    return f"{_container.url}/{txt_name}"
+
 def download_blob_to_tempfile(blob_url: str) -> str:
     """
     Downloads a blob from Azure Blob Storage using a full HTTPS blob URL.
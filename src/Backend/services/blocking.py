@@ -0,0 +1,82 @@
+# services/blocking.py
+"""
+Bounded thread pools for blocking work called from async handlers
+-----------------------------------------------------------------
+
+An `async def` route that calls pymssql or the sync blob SDK directly
+stalls the event loop - and with it every other request. Such calls go
+through one of these pools instead:
+
+    status = await db_calls.run(processing_service.get_job_status, job_id)
+
+* `db_calls`  - short SQL round-trips; sized like the connection pool
+  (more threads would only wait for a connection).
+* `io_calls`  - blob uploads / downloads and sync outbound API work
+  (sentiment analysis), which can take seconds to minutes.
+
+Separate pools keep a burst of slow uploads from starving the quick DB
+lookups behind them. Context variables (e.g. the query budget counter)
+are carried into the worker thread. /metrics/event-loop shows queue
+depth and wait time per pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import BLOCKING_DB_WORKERS, BLOCKING_IO_WORKERS
+
+
+class BlockingPool:
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"blocking-{name}")
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "running": 0, "completed": 0, "max_wait_ms": 0.0}
+
+    async def run(self, fn, *args, **kwargs):
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        submitted = time.perf_counter()
+
+        def tracked():
+            wait_ms = (time.perf_counter() - submitted) * 1000
+            with self._lock:
+                self._stats["queued"] -= 1
+                self._stats["running"] += 1
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            try:
+                return call()
+            finally:
+                with self._lock:
+                    self._stats["running"] -= 1
+                    self._stats["completed"] += 1
+
+        with self._lock:
+            self._stats["queued"] += 1
+        future = self._executor.submit(tracked)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Client went away: drop the call if it hasn't started yet
+            if future.cancel() or future.cancelled():
+                with self._lock:
+                    self._stats["queued"] -= 1
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "max_workers": self.max_workers}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instances
+db_calls = BlockingPool("db", BLOCKING_DB_WORKERS)
+io_calls = BlockingPool("io", BLOCKING_IO_WORKERS)
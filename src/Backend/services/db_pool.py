@@ -0,0 +1,349 @@
+# services/db_pool.py
+"""
+Shared pymssql connection pool
+------------------------------
+
+* One pool per process, used by the raw pymssql helpers (sql_service,
+  ProcessingJobService) *and* by the SQLAlchemy engine in database.py
+  (through `creator=`), so every DB call reuses a warm TDS/TLS session.
+* Bounded: at most DB_POOL_MAX_SIZE connections; callers wait (up to
+  DB_POOL_ACQUIRE_TIMEOUT seconds) when all are checked out.
+* Connections idle for longer than DB_POOL_HEALTH_CHECK_AFTER are pinged
+  with `SELECT 1` before reuse; connections older than DB_POOL_MAX_LIFETIME
+  are closed and replaced.
+* `conn.close()` on a pooled connection returns it to the pool, so code
+  written against plain pymssql keeps working unchanged.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import pymssql
+
+from config import (
+    DB_SERVER, DB_USER, DB_PASSWORD, DB_DATABASE,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_MAX_LIFETIME,
+    DB_POOL_HEALTH_CHECK_AFTER, DB_POOL_ACQUIRE_TIMEOUT,
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the acquire timeout."""
+
+
+class _RawConnection:
+    """A physical connection plus the bookkeeping the pool needs."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class _PooledCursor:
+    def __init__(self, cursor, owner: "PooledConnection"):
+        self._cursor = cursor
+        self._owner = owner
+
+    def execute(self, *args, **kwargs):
+        self._owner._dirty = True
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._owner._dirty = True
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """
+    DB-API connection proxy. `close()` hands the connection back to the pool,
+    rolling back first if a transaction was left open.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: _RawConnection):
+        self._pool = pool
+        self._raw = raw
+        self._dirty = False
+        self._broken = False
+
+    def cursor(self, *args, **kwargs):
+        return _PooledCursor(self._raw.conn.cursor(*args, **kwargs), self)
+
+    def commit(self):
+        self._raw.conn.commit()
+        self._dirty = False
+
+    def rollback(self):
+        self._raw.conn.rollback()
+        self._dirty = False
+
+    def invalidate(self):
+        """Mark the connection unusable; it is closed instead of reused."""
+        self._broken = True
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        if self._dirty and not self._broken:
+            try:
+                raw.conn.rollback()
+            except Exception:
+                self._broken = True
+        self._pool._release(raw, discard=self._broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._raw is None:
+            raise pymssql.InterfaceError("Connection already returned to the pool")
+        return getattr(self._raw.conn, name)
+
+    def __del__(self):
+        # Safety net for callers that forget to close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 1800,
+        health_check_after: float = 30,
+        acquire_timeout: float = 30,
+    ):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: deque[_RawConnection] = deque()
+        self._size = 0  # idle + checked out + being opened
+        # Re-entrant: PooledConnection.__del__ may release from inside a locked section
+        self._lock = threading.RLock()
+        self._available = threading.Condition(self._lock)
+
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "acquired": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Acquire / release
+    # ------------------------------------------------------------------ #
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_from = None
+
+        while True:
+            raw = None
+            open_new = False
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    if waited_from is None:
+                        waited_from = time.monotonic()
+                        self._stats["waits"] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        self._record_wait(waited_from)
+                        raise PoolTimeout(
+                            f"No DB connection available within {timeout}s "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    self._available.wait(remaining)
+
+                if self._idle:
+                    raw = self._idle.pop()  # LIFO keeps the warmest connections busy
+                else:
+                    self._size += 1
+                    open_new = True
+
+            if open_new:
+                raw = self._open()
+            elif not self._usable(raw):
+                self._discard(raw)
+                continue
+
+            with self._lock:
+                self._stats["acquired"] += 1
+                if waited_from is not None:
+                    self._record_wait(waited_from)
+            return PooledConnection(self, raw)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            if conn._dirty:
+                try:
+                    conn.rollback()
+                except Exception:
+                    conn.invalidate()
+            raise
+        finally:
+            conn.close()
+
+    def _release(self, raw: _RawConnection, discard: bool = False) -> None:
+        raw.last_used = time.monotonic()
+        if discard or self._expired(raw):
+            self._discard(raw, recycled=not discard)
+            return
+        with self._lock:
+            self._idle.append(raw)
+            self._available.notify()
+
+    # ------------------------------------------------------------------ #
+    # Connection lifecycle
+    # ------------------------------------------------------------------ #
+    def _open(self) -> _RawConnection:
+        try:
+            raw = _RawConnection(self._connect())
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        return raw
+
+    def _discard(self, raw: _RawConnection, recycled: bool = False) -> None:
+        try:
+            raw.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats["closed"] += 1
+            if recycled:
+                self._stats["recycled"] += 1
+            self._available.notify()
+
+    def _expired(self, raw: _RawConnection) -> bool:
+        return time.monotonic() - raw.created_at > self.max_lifetime
+
+    def _usable(self, raw: _RawConnection) -> bool:
+        if self._expired(raw):
+            with self._lock:
+                self._stats["recycled"] += 1
+            return False
+        if time.monotonic() - raw.last_used < self.health_check_after:
+            return True
+        try:
+            cur = raw.conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def _record_wait(self, waited_from: float) -> None:
+        waited = time.monotonic() - waited_from
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+    def warm(self) -> None:
+        """Open connections up to min_size so the first requests don't pay for them."""
+        conns = []
+        try:
+            with self._lock:
+                missing = max(0, self.min_size - self._size)
+            for _ in range(missing):
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for raw in idle:
+            self._discard(raw)
+
+    # ------------------------------------------------------------------ #
+    # Metrics
+    # ------------------------------------------------------------------ #
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            size = self._size
+        stats.update(
+            size=size,
+            idle=idle,
+            checked_out=size - idle,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            wait_time_avg=(stats["wait_time_total"] / stats["waits"]) if stats["waits"] else 0.0,
+        )
+        return stats
+
+
+def _connect():
+    return pymssql.connect(
+        server=DB_SERVER,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_DATABASE,
+    )
+
+
+# Global instance
+pool = ConnectionPool(
+    _connect,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
+    acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+)
+
+
+def get_connection() -> PooledConnection:
+    """Borrow a connection; `close()` returns it to the pool."""
+    return pool.acquire()
+
+
+def pooled_connection():
+    """`with pooled_connection() as conn:` - borrow and always give back."""
+    return pool.connection()
@@ -0,0 +1,236 @@
+# services/email_queue.py
+"""
+Outbound email queue with a background SMTP sender
+--------------------------------------------------
+
+Request handlers call `email_queue.enqueue(...)` and return right away;
+one sender thread does the SMTP work:
+
+* keeps the SMTP connection (incl. STARTTLS + login) open and reuses it
+  for every message that arrives within SMTP_IDLE_TIMEOUT seconds;
+* sends whatever is queued in batches of up to EMAIL_BATCH_SIZE over that
+  one connection;
+* retries transient failures (connection drops, 4xx replies) with
+  exponential backoff up to EMAIL_MAX_RETRIES times, reconnecting first;
+  permanent ones (refused recipient, 5xx replies) are logged and dropped.
+
+Local testing against a stub server instead of a real mailbox:
+
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_SERVER=localhost SMTP_PORT=8025 SMTP_USE_TLS=false python test_email_queue.py
+"""
+
+from __future__ import annotations
+
+import queue
+import random
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+from config import (
+    SMTP_SERVER,
+    SMTP_PORT,
+    SMTP_USERNAME,
+    SMTP_PASSWORD,
+    SMTP_FROM_EMAIL,
+    SMTP_USE_TLS,
+    EMAIL_QUEUE_SIZE,
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_RETRIES,
+    SMTP_IDLE_TIMEOUT,
+    SMTP_TIMEOUT,
+)
+
+
+class EmailQueueFull(Exception):
+    """Raised by enqueue() when the outbound queue is at capacity."""
+
+
+class _Outgoing:
+    __slots__ = ("to", "subject", "body", "attempts", "not_before")
+
+    def __init__(self, to: str, subject: str, body: str):
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempts = 0
+        self.not_before = 0.0
+
+    def as_mime(self, sender: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = sender
+        msg['To'] = self.to
+        msg['Subject'] = self.subject
+        msg.attach(MIMEText(self.body, 'plain'))
+        return msg
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Problems a retry won't fix: refused recipients, 5xx replies, auth setup."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+class EmailQueue:
+    def __init__(self, max_size: int, batch_size: int, max_retries: int,
+                 idle_timeout: float, base_backoff: float = 2.0, max_backoff: float = 300.0):
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.idle_timeout = idle_timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._queue: "queue.Queue[_Outgoing]" = queue.Queue(maxsize=max_size)
+        self._retry: List[_Outgoing] = []       # sender thread only
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "failed": 0, "connections": 0}
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+    # ------------------------------------------------------------------ #
+    def enqueue(self, to: str, subject: str, body: str) -> None:
+        self.start()
+        try:
+            self._queue.put_nowait(_Outgoing(to, subject, body))
+        except queue.Full:
+            raise EmailQueueFull("Email queue is full")
+        self.stats["queued"] += 1
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retry)
+
+    # ------------------------------------------------------------------ #
+    # Sender thread
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Send what's queued (bounded by `timeout`), then close the connection."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+            elif self._stop_event.is_set() and self._queue.empty() and not self._retry:
+                break
+            elif self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                self._disconnect()
+        self._disconnect()
+
+    def _next_batch(self) -> List[_Outgoing]:
+        now = time.monotonic()
+        batch = [m for m in self._retry if m.not_before <= now][: self.batch_size]
+        for m in batch:
+            self._retry.remove(m)
+
+        # Wait for new mail only when there's nothing to do right now
+        wait = 0 if batch else 0.5
+        if self._retry and not batch:
+            wait = max(0.0, min(wait, min(m.not_before for m in self._retry) - now))
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=wait) if wait else self._queue.get_nowait())
+            except queue.Empty:
+                break
+            wait = 0
+        return batch
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            # Only probe a connection that sat idle; servers drop those
+            if time.monotonic() - self._last_used < 10:
+                return self._smtp
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_USE_TLS:
+            server.starttls()
+        # Only attempt login if credentials are provided
+        if SMTP_USERNAME and SMTP_PASSWORD:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self._smtp = server
+        self.stats["connections"] += 1
+        return server
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+        self._smtp = None
+
+    def _send_batch(self, batch: List[_Outgoing]) -> None:
+        for i, message in enumerate(batch):
+            try:
+                server = self._connect()
+            except (smtplib.SMTPException, OSError) as e:
+                # Server unreachable: back off the whole rest of the batch
+                # instead of timing out once per message
+                self._disconnect()
+                for pending in batch[i:]:
+                    self._schedule_retry(pending, e)
+                return
+            try:
+                server.send_message(message.as_mime(SMTP_FROM_EMAIL))
+                self._last_used = time.monotonic()
+                self.stats["sent"] += 1
+            except (smtplib.SMTPException, OSError) as e:
+                if _is_permanent(e):
+                    self.stats["failed"] += 1
+                    print(f"❌ Email to {message.to} not sent: {e}")
+                    continue
+                # Connection is suspect now; the next message reconnects
+                self._disconnect()
+                self._schedule_retry(message, e)
+
+    def _schedule_retry(self, message: _Outgoing, error: Exception) -> None:
+        message.attempts += 1
+        if message.attempts > self.max_retries:
+            self.stats["failed"] += 1
+            print(f"❌ Email to {message.to} dropped after {message.attempts} attempts: {error}")
+            return
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (message.attempts - 1)))
+        message.not_before = time.monotonic() + delay * random.uniform(0.8, 1.2)
+        self._retry.append(message)
+        self.stats["retried"] += 1
+        print(f"⚠️ Email to {message.to} failed ({error}), retry {message.attempts} in {delay:.0f}s")
+
+    def snapshot(self) -> dict:
+        return {"pending": self.pending(), "connected": self._smtp is not None, **self.stats}
+
+
+# Global instance
+email_queue = EmailQueue(
+    max_size=EMAIL_QUEUE_SIZE,
+    batch_size=EMAIL_BATCH_SIZE,
+    max_retries=EMAIL_MAX_RETRIES,
+    idle_timeout=SMTP_IDLE_TIMEOUT,
+)
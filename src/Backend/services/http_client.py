@@ -0,0 +1,255 @@
+# services/http_client.py
+"""
+Shared outbound HTTP clients
+----------------------------
+
+* One `httpx.AsyncClient` per event loop and one thread-safe `httpx.Client`
+  for sync code, so calls to the same host reuse keep-alive connections
+  instead of paying a TCP + TLS handshake each time.
+* Every request gets connect / read timeouts - nothing may hang forever.
+* `request()` / `arequest()` add what every outbound API needs:
+    - at most HTTP_MAX_PER_HOST requests in flight per host (per process
+      for sync callers, per event loop for async ones), so one slow or
+      throttling API can't take every worker / connection;
+    - retries on 429 / 503 for any call, and also on 500 / 502 / 504 for
+      idempotent ones, with exponential backoff + jitter, honouring
+      Retry-After;
+    - retries on connection failures always (nothing was sent) and on
+      read timeouts / dropped responses only for idempotent calls.
+  The last response is returned either way - callers still
+  `raise_for_status()`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Collection, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_PER_HOST,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_BASE_DELAY,
+    HTTP_RETRY_MAX_DELAY,
+)
+
+DEFAULT_TIMEOUT = httpx.Timeout(
+    connect=HTTP_CONNECT_TIMEOUT,
+    read=HTTP_READ_TIMEOUT,
+    write=HTTP_READ_TIMEOUT,
+    pool=HTTP_CONNECT_TIMEOUT,
+)
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+    keepalive_expiry=60,
+)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Safe to repeat for any method: the server refused the request before
+# processing it. 502 / 504 are not in here - the upstream may well have
+# handled the request before the gateway gave up, and re-sending a POST
+# could e.g. start a second (billed) transcription job.
+RETRY_ALWAYS = frozenset({429, 503})
+RETRY_IDEMPOTENT = RETRY_ALWAYS | {500, 502, 504}
+
+# httpx connections are bound to the loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_host_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+_sync_client: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+_sync_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS)
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the running loop's client (call on shutdown)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_sync_client() -> httpx.Client:
+    """The process-wide Client for code running in worker threads."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS)
+        return _sync_client
+
+
+def close_sync_client() -> None:
+    global _sync_client
+    with _sync_lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Retry policy
+# ──────────────────────────────────────────────────────────────────────────────
+def retry_after_seconds(response: Optional[httpx.Response]) -> Optional[float]:
+    """Retry-After as seconds - either form (delta-seconds or HTTP-date)."""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Retry-After if the server sent one, else exponential backoff with jitter."""
+    retry_after = retry_after_seconds(response)
+    if retry_after is not None:
+        return min(retry_after, HTTP_RETRY_MAX_DELAY)
+    ceiling = min(HTTP_RETRY_BASE_DELAY * (2 ** attempt), HTTP_RETRY_MAX_DELAY)
+    # Half fixed, half random: spreads out clients that failed together
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def _policy(method: str, idempotent: Optional[bool], retry_on: Optional[Collection[int]]):
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    if retry_on is None:
+        retry_on = RETRY_IDEMPOTENT if idempotent else RETRY_ALWAYS
+    return idempotent, retry_on
+
+
+def _retryable_error(error: httpx.HTTPError, idempotent: bool) -> bool:
+    # Connect failures never reached the server
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    return idempotent and isinstance(error, httpx.TransportError)
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Per-host concurrency
+# ──────────────────────────────────────────────────────────────────────────────
+def _sync_limit(host: str) -> threading.BoundedSemaphore:
+    with _sync_lock:
+        sem = _sync_host_limits.get(host)
+        if sem is None:
+            sem = _sync_host_limits[host] = threading.BoundedSemaphore(HTTP_MAX_PER_HOST)
+        return sem
+
+
+def _async_limit(host: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limits = _async_host_limits.get(loop)
+    if limits is None:
+        limits = _async_host_limits[loop] = {}
+    sem = limits.get(host)
+    if sem is None:
+        sem = limits[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return sem
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Requests
+# ──────────────────────────────────────────────────────────────────────────────
+def request(
+    method: str,
+    url: str,
+    *,
+    retries: int = HTTP_MAX_RETRIES,
+    idempotent: Optional[bool] = None,
+    retry_on: Optional[Collection[int]] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Sync request through the shared client. `idempotent` defaults from the
+    method; pass True for POSTs that are safe to repeat (pure analysis
+    calls). The host slot is released while sleeping between attempts.
+    """
+    idempotent, retry_on = _policy(method, idempotent, retry_on)
+    client = get_sync_client()
+    limit = _sync_limit(_host(url))
+
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            with limit:
+                response = client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            if attempt == retries or not _retryable_error(e, idempotent):
+                raise
+            print(f"[WARN] {method} {_host(url)} failed ({e!r}), retry {attempt + 1}/{retries}")
+        else:
+            if response.status_code not in retry_on or attempt == retries:
+                return response
+            print(f"[WARN] {method} {_host(url)} returned {response.status_code}, retry {attempt + 1}/{retries}")
+        time.sleep(backoff_delay(attempt, response))
+    raise AssertionError("unreachable")
+
+
+async def arequest(
+    method: str,
+    url: str,
+    *,
+    retries: int = HTTP_MAX_RETRIES,
+    idempotent: Optional[bool] = None,
+    retry_on: Optional[Collection[int]] = None,
+    **kwargs,
+) -> httpx.Response:
+    """Async twin of request(), on the running loop's AsyncClient."""
+    idempotent, retry_on = _policy(method, idempotent, retry_on)
+    client = get_async_client()
+    limit = _async_limit(_host(url))
+
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            async with limit:
+                response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            if attempt == retries or not _retryable_error(e, idempotent):
+                raise
+            print(f"[WARN] {method} {_host(url)} failed ({e!r}), retry {attempt + 1}/{retries}")
+        else:
+            if response.status_code not in retry_on or attempt == retries:
+                return response
+            print(f"[WARN] {method} {_host(url)} returned {response.status_code}, retry {attempt + 1}/{retries}")
+        await asyncio.sleep(backoff_delay(attempt, response))
+    raise AssertionError("unreachable")
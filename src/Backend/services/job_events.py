@@ -0,0 +1,143 @@
+# services/job_events.py
+"""
+In-process pub/sub for processing-job progress
+----------------------------------------------
+
+ProcessingJobService publishes every stage transition (claimed,
+transcribing, transcribed, saved, failed, retried) here. The status
+stream / long-poll endpoints wait on it instead of polling the DB:
+
+* each job has a state dict (same keys as get_job_status) and a version
+  number bumped on every change;
+* `wait(job_id, version, timeout)` returns as soon as the job moves past
+  `version`; waiters live on the event loop and are woken thread-safely
+  from the worker threads that publish.
+
+A job may be processed by another replica, whose events never reach this
+process, so the endpoints re-read the row every JOB_EVENTS_RESYNC_SECONDS
+while nothing arrives and feed it back through `merge()`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import JOB_EVENTS_MAX_JOBS
+
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+# Changes on every write, including ones nobody is watching for
+_IGNORED_ON_MERGE = frozenset({"updated_at"})
+
+
+class _JobChannel:
+    __slots__ = ("version", "state", "waiters", "touched")
+
+    def __init__(self):
+        self.version = 0
+        self.state: Dict[str, Any] = {}
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.touched = time.monotonic()
+
+
+class JobEventBus:
+    def __init__(self, max_jobs: int):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._channels: "OrderedDict[str, _JobChannel]" = OrderedDict()
+        self.published = 0
+
+    def _channel_locked(self, job_id: str) -> _JobChannel:
+        channel = self._channels.get(job_id)
+        if channel is None:
+            channel = self._channels[job_id] = _JobChannel()
+            self._evict_locked()
+        self._channels.move_to_end(job_id)
+        channel.touched = time.monotonic()
+        return channel
+
+    def _evict_locked(self) -> None:
+        # Oldest first; never a channel someone is waiting on
+        while len(self._channels) > self.max_jobs:
+            for job_id, channel in self._channels.items():
+                if not channel.waiters:
+                    del self._channels[job_id]
+                    break
+            else:
+                return
+
+    # ------------------------------------------------------------------ #
+    # Publishing (any thread)
+    # ------------------------------------------------------------------ #
+    def publish(self, job_id: str, /, **fields: Any) -> None:
+        """A transition made by this process; always bumps the version."""
+        with self._lock:
+            channel = self._channel_locked(job_id)
+            channel.state.update(fields)
+            self._bump_locked(channel)
+        self.published += 1
+
+    def merge(self, job_id: str, state: Dict[str, Any]) -> int:
+        """A full row read from the DB; bumps the version only if it differs."""
+        with self._lock:
+            channel = self._channel_locked(job_id)
+            if any(channel.state.get(k) != v for k, v in state.items() if k not in _IGNORED_ON_MERGE):
+                channel.state.update(state)
+                self._bump_locked(channel)
+            return channel.version
+
+    def _bump_locked(self, channel: _JobChannel) -> None:
+        channel.version += 1
+        for loop, event in channel.waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass    # loop already closed
+
+    # ------------------------------------------------------------------ #
+    # Reading (event loop)
+    # ------------------------------------------------------------------ #
+    def current(self, job_id: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        with self._lock:
+            channel = self._channels.get(job_id)
+            if channel is None or not channel.state:
+                return 0, None
+            return channel.version, dict(channel.state)
+
+    async def wait(self, job_id: str, after_version: int, timeout: float) -> bool:
+        """True once the job's version differs from `after_version`, False on timeout."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            channel = self._channel_locked(job_id)
+            if channel.version != after_version:
+                return True
+            channel.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in channel.waiters:
+                    channel.waiters.remove(waiter)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "jobs": len(self._channels),
+                "waiters": sum(len(c.waiters) for c in self._channels.values()),
+                "published": self.published,
+            }
+
+
+def is_terminal(state: Optional[Dict[str, Any]]) -> bool:
+    return bool(state) and state.get("status") in TERMINAL_STATUSES
+
+
+# Global instance
+job_events = JobEventBus(max_jobs=JOB_EVENTS_MAX_JOBS)
@@ -0,0 +1,106 @@
+# services/job_record.py
+"""
+Typed rows for ProcessingJobs
+-----------------------------
+
+Every read of the table names its columns here instead of `SELECT *`
+plus positional indexes, so adding or reordering columns can't shift a
+value into the wrong field.
+
+* `JobRecord` / `JOB_SELECT` - the full job, for the worker that runs it.
+* `STATUS_COLUMNS` / `STATUS_SELECT` - what a status poll needs: no notes,
+  emails or blob URLs. This is the dict served by get_job_status and kept
+  in job_state.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+# (field, column) in SELECT order
+JOB_COLUMNS = (
+    ("job_id", "JobID"),
+    ("patient_email", "PatientEmail"),
+    ("therapist_email", "TherapistEmail"),
+    ("session_date", "SessionDate"),
+    ("session_notes", "SessionNotes"),
+    ("audio_url", "AudioURL"),
+    ("transcript_url", "TranscriptURL"),
+    ("status", "Status"),
+    ("transcription_status", "TranscriptionStatus"),
+    ("progress", "Progress"),
+    ("transcription_error", "TranscriptionError"),
+    ("created_at", "CreatedAt"),
+    ("updated_at", "UpdatedAt"),
+    ("completed_at", "CompletedAt"),
+    ("retry_count", "RetryCount"),
+    ("max_retries", "MaxRetries"),
+    ("session_id", "SessionID"),
+    ("last_completed_stage", "LastCompletedStage"),
+)
+JOB_SELECT = ", ".join(column for _, column in JOB_COLUMNS)
+
+STATUS_COLUMNS = (
+    ("job_id", "JobID"),
+    ("status", "Status"),
+    ("transcription_status", "TranscriptionStatus"),
+    ("progress", "Progress"),
+    ("transcription_error", "TranscriptionError"),
+    ("transcript_url", "TranscriptURL"),
+    ("created_at", "CreatedAt"),
+    ("updated_at", "UpdatedAt"),
+    ("completed_at", "CompletedAt"),
+    ("retry_count", "RetryCount"),
+    ("max_retries", "MaxRetries"),
+)
+STATUS_SELECT = ", ".join(column for _, column in STATUS_COLUMNS)
+
+_TIMESTAMPS = ("created_at", "updated_at", "completed_at")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+@dataclass(slots=True)
+class JobRecord:
+    job_id: str
+    patient_email: str
+    therapist_email: str
+    session_date: str
+    session_notes: Optional[str]
+    audio_url: str
+    transcript_url: Optional[str]
+    status: str
+    transcription_status: Optional[str]
+    progress: int
+    transcription_error: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    completed_at: Optional[datetime]
+    retry_count: int
+    max_retries: int
+    session_id: Optional[int]
+    last_completed_stage: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "JobRecord":
+        """Build from a row selected with JOB_SELECT."""
+        return cls(*row)
+
+    def status_dict(self) -> Dict[str, Any]:
+        """The STATUS_COLUMNS projection of this job."""
+        status = {key: getattr(self, key) for key, _ in STATUS_COLUMNS}
+        for key in _TIMESTAMPS:
+            status[key] = _iso(status[key])
+        return status
+
+
+def status_from_row(row: Sequence[Any]) -> Dict[str, Any]:
+    """Status dict from a row selected with STATUS_SELECT."""
+    status = dict(zip((key for key, _ in STATUS_COLUMNS), row))
+    for key in _TIMESTAMPS:
+        status[key] = _iso(status[key])
+    return status
@@ -0,0 +1,201 @@
+# services/job_retention.py
+"""
+ProcessingJobs retention: move finished jobs to ProcessingJobsArchive
+--------------------------------------------------------------------
+
+A background thread runs every JOB_RETENTION_INTERVAL seconds and moves
+completed / failed jobs whose last update is older than
+JOB_RETENTION_DAYS into ProcessingJobsArchive, so the live table only
+holds recent work.
+
+* Each batch is one statement in its own short transaction:
+  `DELETE TOP (n) ... OUTPUT deleted.* INTO ProcessingJobsArchive`, so a
+  row is never in both tables (or in neither).
+* READPAST skips rows another transaction has locked and ROWLOCK with
+  batches of JOB_RETENTION_BATCH_SIZE (well under SQL Server's 5000-lock
+  escalation threshold) keeps the compactor from ever taking a table
+  lock - live inserts and status updates don't wait on it.
+* At most JOB_RETENTION_MAX_BATCHES per run, with a short pause between
+  batches; whatever is left goes in the next run.
+* Archived rows older than JOB_ARCHIVE_RETENTION_DAYS are deleted the same
+  way (0 keeps them forever).
+* If the archive was partitioned by ArchivedAt month
+  (partition_processing_jobs_archive.sql), each run makes sure partitions
+  exist PARTITION_MONTHS_AHEAD months ahead.
+
+Requires create_processing_jobs_archive.sql and, on older databases,
+alter_processing_text_columns.sql (NTEXT can't be moved with OUTPUT INTO).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from config import (
+    JOB_RETENTION_DAYS,
+    JOB_ARCHIVE_RETENTION_DAYS,
+    JOB_RETENTION_INTERVAL,
+    JOB_RETENTION_BATCH_SIZE,
+    JOB_RETENTION_MAX_BATCHES,
+    JOB_RETENTION_BATCH_PAUSE,
+)
+from services.db_pool import pooled_connection
+from services.job_record import JOB_COLUMNS
+
+ARCHIVE_PARTITION_FUNCTION = "PF_ProcessingJobsArchive_Month"
+ARCHIVE_PARTITION_SCHEME = "PS_ProcessingJobsArchive_Month"
+PARTITION_MONTHS_AHEAD = 3
+
+_ARCHIVE_COLUMNS = ", ".join(column for _, column in JOB_COLUMNS)
+_DELETED_COLUMNS = ", ".join(f"deleted.{column}" for _, column in JOB_COLUMNS)
+
+_ARCHIVE_BATCH_SQL = f"""
+    DELETE TOP (%s) FROM ProcessingJobs WITH (ROWLOCK, READPAST)
+    OUTPUT {_DELETED_COLUMNS}
+    INTO ProcessingJobsArchive ({_ARCHIVE_COLUMNS})
+    WHERE Status IN ('completed', 'failed')
+      AND UpdatedAt < DATEADD(day, -%s, GETUTCDATE())
+      AND (LeaseOwner IS NULL OR LeaseExpiresAt < GETUTCDATE())
+"""
+
+_PURGE_BATCH_SQL = """
+    DELETE TOP (%s) FROM ProcessingJobsArchive WITH (ROWLOCK, READPAST)
+    WHERE ArchivedAt < DATEADD(day, -%s, GETUTCDATE())
+"""
+
+
+def _add_months(day: datetime, months: int) -> datetime:
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+class JobRetention:
+    def __init__(self, retention_days: int, archive_retention_days: int, interval: float,
+                 batch_size: int, max_batches: int, batch_pause: float):
+        self.retention_days = retention_days
+        self.archive_retention_days = archive_retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.batch_pause = batch_pause
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"runs": 0, "archived": 0, "purged": 0, "partitions_added": 0, "last_run": None}
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        if self.retention_days <= 0:
+            print("ℹ️ ProcessingJobs retention disabled (JOB_RETENTION_DAYS=0)")
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-retention", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        # First run shortly after startup, not in the middle of it
+        delay = min(60.0, self.interval)
+        while not self._stop_event.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ ProcessingJobs retention run failed: {e}")
+            delay = self.interval
+
+    # ------------------------------------------------------------------ #
+    # One pass
+    # ------------------------------------------------------------------ #
+    def run_once(self) -> dict:
+        started = time.monotonic()
+        result = {
+            "partitions_added": self._extend_partitions(),
+            "archived": self._in_batches(_ARCHIVE_BATCH_SQL, self.retention_days),
+            "purged": (
+                self._in_batches(_PURGE_BATCH_SQL, self.archive_retention_days)
+                if self.archive_retention_days > 0 else 0
+            ),
+        }
+        for key, count in result.items():
+            self.stats[key] += count
+        self.stats["runs"] += 1
+        self.stats["last_run"] = datetime.utcnow().isoformat()
+        if result["archived"] or result["purged"]:
+            print(
+                f"🗄️ Archived {result['archived']} finished job(s), purged {result['purged']} "
+                f"archived job(s) in {time.monotonic() - started:.1f}s"
+            )
+        return result
+
+    def _in_batches(self, sql: str, days: int) -> int:
+        """Run a DELETE TOP batch until it comes back short; each batch commits on its own."""
+        total = 0
+        for _ in range(self.max_batches):
+            if self._stop_event.is_set():
+                break
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(sql, (self.batch_size, days))
+                affected = cur.rowcount
+                conn.commit()
+            total += max(affected, 0)
+            if affected < self.batch_size:
+                break
+            self._stop_event.wait(self.batch_pause)
+        return total
+
+    def _extend_partitions(self) -> int:
+        """Keep PARTITION_MONTHS_AHEAD empty monthly partitions ahead (no-op if unpartitioned)."""
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT MAX(CAST(rv.value AS DATETIME))
+                FROM sys.partition_functions pf
+                LEFT JOIN sys.partition_range_values rv ON rv.function_id = pf.function_id
+                WHERE pf.name = %s
+                GROUP BY pf.function_id
+                """,
+                (ARCHIVE_PARTITION_FUNCTION,),
+            )
+            row = cur.fetchone()
+            if row is None or row[0] is None:
+                return 0
+            last_boundary = row[0]
+            this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            horizon = _add_months(this_month, PARTITION_MONTHS_AHEAD)
+            added = 0
+            boundary = _add_months(last_boundary, 1)
+            while boundary <= horizon:
+                # ArchivedAt never lies in the future, so the range being
+                # split is still empty and the split is metadata-only
+                cur.execute(f"ALTER PARTITION SCHEME {ARCHIVE_PARTITION_SCHEME} NEXT USED [PRIMARY]")
+                cur.execute(f"ALTER PARTITION FUNCTION {ARCHIVE_PARTITION_FUNCTION}() SPLIT RANGE (%s)", (boundary,))
+                conn.commit()
+                added += 1
+                boundary = _add_months(boundary, 1)
+            return added
+
+    def snapshot(self) -> dict:
+        return {
+            "retention_days": self.retention_days,
+            "archive_retention_days": self.archive_retention_days,
+            **self.stats,
+        }
+
+
+# Global instance
+job_retention = JobRetention(
+    retention_days=JOB_RETENTION_DAYS,
+    archive_retention_days=JOB_ARCHIVE_RETENTION_DAYS,
+    interval=JOB_RETENTION_INTERVAL,
+    batch_size=JOB_RETENTION_BATCH_SIZE,
+    max_batches=JOB_RETENTION_MAX_BATCHES,
+    batch_pause=JOB_RETENTION_BATCH_PAUSE,
+)
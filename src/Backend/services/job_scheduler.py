@@ -0,0 +1,191 @@
+# services/job_scheduler.py
+"""
+Bounded worker pool for background processing jobs
+--------------------------------------------------
+
+* A fixed number of worker threads pull work from a priority queue, so a
+  burst of uploads never turns into a burst of threads / DB connections.
+* Each pipeline stage (e.g. blob, db) has its own concurrency
+  limit, independent of the worker count.
+* When the queue is full `submit()` raises `SchedulerFull`; routes turn that
+  into a 503 so clients back off instead of piling up work.
+* `shutdown()` stops accepting work and lets queued jobs drain.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Lower number = picked up first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+_STOP = object()
+
+
+class SchedulerFull(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class SchedulerClosed(Exception):
+    """Raised when work is submitted after shutdown() was called."""
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        stage_limits: Optional[Dict[str, int]] = None,
+        name: str = "job-worker",
+    ):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._workers: list[threading.Thread] = []
+        self._pending: Dict[str, int] = {}     # job_id -> priority (queued, not started)
+        self._running: set[str] = set()
+        self._closed = False
+
+        self._stages = {
+            stage: threading.BoundedSemaphore(limit)
+            for stage, limit in (stage_limits or {}).items()
+        }
+
+    # ------------------------------------------------------------------ #
+    # Submission
+    # ------------------------------------------------------------------ #
+    def has_capacity(self) -> bool:
+        with self._lock:
+            return not self._closed and len(self._pending) < self.max_queue_size
+
+    def check_capacity(self) -> None:
+        """Raise early (before doing any expensive work) if submit() would fail."""
+        with self._lock:
+            self._check_capacity_locked()
+
+    def _check_capacity_locked(self) -> None:
+        if self._closed:
+            raise SchedulerClosed("Scheduler is shutting down")
+        if len(self._pending) >= self.max_queue_size:
+            raise SchedulerFull(
+                f"Processing queue is full ({self.max_queue_size} jobs waiting)"
+            )
+
+    def submit(
+        self,
+        job_id: str,
+        fn: Callable[[str], None],
+        priority: int = PRIORITY_NORMAL,
+        force: bool = False,
+    ) -> bool:
+        """
+        Queue `fn(job_id)` for a worker.
+        Returns False if the job is already queued or running.
+        `force=True` skips the queue-size check - for continuations of jobs
+        that were already admitted (they must not be dropped by backpressure).
+        """
+        with self._lock:
+            if job_id in self._pending or job_id in self._running:
+                return False
+            if force:
+                if self._closed:
+                    raise SchedulerClosed("Scheduler is shutting down")
+            else:
+                self._check_capacity_locked()
+            self._pending[job_id] = priority
+            self._ensure_workers_locked()
+        self._queue.put((priority, next(self._seq), job_id, fn))
+        return True
+
+    def _ensure_workers_locked(self) -> None:
+        # Workers start lazily so importing the module never spawns threads
+        while len(self._workers) < self.max_workers:
+            t = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-{len(self._workers) + 1}",
+                daemon=True,
+            )
+            self._workers.append(t)
+            t.start()
+
+    # ------------------------------------------------------------------ #
+    # Workers
+    # ------------------------------------------------------------------ #
+    def _worker_loop(self) -> None:
+        while True:
+            _, _, job_id, fn = self._queue.get()
+            if fn is _STOP:
+                self._queue.task_done()
+                return
+
+            with self._lock:
+                self._pending.pop(job_id, None)
+                self._running.add(job_id)
+            try:
+                fn(job_id)
+            except Exception as e:
+                print(f"❌ Unhandled error in job {job_id}: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+                    self._idle.notify_all()
+                self._queue.task_done()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Limit how many workers may be inside stage `name` at once."""
+        sem = self._stages.get(name)
+        if sem is None:
+            yield
+            return
+        with sem:
+            yield
+
+    # ------------------------------------------------------------------ #
+    # Introspection / shutdown
+    # ------------------------------------------------------------------ #
+    def is_active(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._pending or job_id in self._running
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "max_workers": self.max_workers,
+                "queued": len(self._pending),
+                "running": len(self._running),
+                "max_queue_size": self.max_queue_size,
+                "closed": self._closed,
+            }
+
+    def shutdown(self, drain: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting jobs. With drain=True wait (up to `timeout` seconds)
+        for queued and running jobs to finish. Returns True if fully drained.
+        """
+        with self._lock:
+            self._closed = True
+            if drain:
+                self._idle.wait_for(
+                    lambda: not self._pending and not self._running,
+                    timeout=timeout,
+                )
+            drained = not self._pending and not self._running
+            workers = list(self._workers)
+
+        # Sentinels sort after every real job
+        for _ in workers:
+            self._queue.put((float("inf"), next(self._seq), "", _STOP))
+        return drained
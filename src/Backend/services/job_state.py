@@ -0,0 +1,113 @@
+# services/job_state.py
+"""
+In-memory state of the processing jobs this process is running
+---------------------------------------------------------------
+
+ProcessingJobService keeps the live status of every job it created or
+claimed here and serves `get_job_status` from it - no SELECT per poll.
+
+* Only durable transitions are written through to ProcessingJobs
+  (created, claimed/started, transcript ready, session saved, failed,
+  retried); the service does that UPDATE and then calls `update()`.
+* Intermediate progress (transcription started, 90 %) is `update()`d
+  here only. The next durable write carries the newer Progress value, and
+  a job resumed after a crash simply restarts from its last durable stage.
+* Every change is forwarded to job_events, so status streams see it.
+
+A job leaves the store when this process lets go of it: right away if it
+was handed off (lease lost, shutdown, queue full), or JOB_STATE_LINGER_SECONDS
+after it finished so the final status polls are still answered from memory.
+Jobs that are not held here are read from the DB by the caller.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import JOB_STATE_MAX_JOBS, JOB_STATE_LINGER_SECONDS
+from services.job_events import job_events
+
+
+class _Entry:
+    __slots__ = ("state", "expires_at")
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        self.expires_at: Optional[float] = None     # None while the job is live here
+
+
+class JobStateStore:
+    def __init__(self, max_jobs: int, linger: float):
+        self.max_jobs = max_jobs
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "updates": 0}
+
+    def hold(self, job_id: str, state: Dict[str, Any]) -> None:
+        """Start serving a job from memory (full status dict, as read/written)."""
+        with self._lock:
+            self._jobs[job_id] = _Entry(dict(state))
+            self._jobs.move_to_end(job_id)
+            self._evict_locked()
+        job_events.publish(job_id, **state)
+
+    def update(self, job_id: str, /, **fields: Any) -> None:
+        """Apply a change made by this process and announce it."""
+        fields.setdefault("updated_at", datetime.utcnow().isoformat())
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                entry.state.update(fields)
+                if entry.expires_at is not None:
+                    # Touched again (e.g. retried) - it's live once more
+                    entry.expires_at = None
+            self.stats["updates"] += 1
+        job_events.publish(job_id, **fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None and entry.expires_at is not None and entry.expires_at < time.monotonic():
+                del self._jobs[job_id]
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return dict(entry.state)
+
+    def release(self, job_id: str, linger: bool = True) -> None:
+        """This process is done with the job: keep answering for a while, or drop it now."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return
+            if linger:
+                entry.expires_at = time.monotonic() + self.linger
+            else:
+                del self._jobs[job_id]
+
+    def _evict_locked(self) -> None:
+        # Finished jobs go first; live ones only if the store is full of them
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in [j for j, e in self._jobs.items() if e.expires_at is not None]:
+            del self._jobs[job_id]
+            if len(self._jobs) <= self.max_jobs:
+                return
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            live = sum(1 for e in self._jobs.values() if e.expires_at is None)
+            return {"live": live, "lingering": len(self._jobs) - live, **self.stats}
+
+
+# Global instance
+job_state = JobStateStore(max_jobs=JOB_STATE_MAX_JOBS, linger=JOB_STATE_LINGER_SECONDS)
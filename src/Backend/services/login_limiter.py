@@ -0,0 +1,274 @@
+# services/login_limiter.py
+"""
+In-memory login limiter with write-behind to FailedLoginAttempts
+----------------------------------------------------------------
+
+* Per email: the staged lockout /auth/login always had - 3rd failure
+  locks for 2 minutes, the next one for 1 hour, then 1 day - now kept in
+  a dict instead of a SELECT + COMMIT around every attempt.
+* Per client IP: a sliding window of recent failures across all emails
+  (LOGIN_IP_MAX_FAILURES per LOGIN_IP_WINDOW_SECONDS), so one address
+  cycling through a credential list is stopped without touching the DB.
+* Changed email states are flushed to dbo.FailedLoginAttempts in one
+  batch every LOGIN_FLUSH_SECONDS (and on shutdown). Active lockouts are
+  loaded at startup, so a restart doesn't unlock anyone.
+
+State is per process: with several replicas an email's lockout stages
+advance independently on each until the next startup load.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from config import (
+    LOGIN_IP_MAX_FAILURES,
+    LOGIN_IP_WINDOW_SECONDS,
+    LOGIN_FLUSH_SECONDS,
+    LOGIN_LIMITER_MAX_ENTRIES,
+)
+from services.db_pool import pooled_connection
+
+
+class _LockoutState:
+    __slots__ = ("attempt_count", "lockout_until", "last_attempt")
+
+    def __init__(self, attempt_count: int = 0, lockout_until: Optional[datetime] = None,
+                 last_attempt: Optional[datetime] = None):
+        self.attempt_count = attempt_count
+        self.lockout_until = lockout_until
+        self.last_attempt = last_attempt
+
+    def is_locked(self, now: datetime) -> bool:
+        return self.lockout_until is not None and self.lockout_until > now
+
+
+def _lockout_message(state: _LockoutState, now: datetime) -> str:
+    if state.attempt_count == 3:
+        return "Please wait 2 minutes before trying again"
+    if state.attempt_count == 4:
+        return "Please wait 1 hour before trying again"
+    if state.attempt_count in (5, 0):
+        return "Please wait 1 day before trying again"
+    return f"Please wait {str(state.lockout_until - now)} before trying again"
+
+
+def _advance(state: _LockoutState, now: datetime) -> None:
+    """One failed attempt - same stages as the former update_failed_attempt()."""
+    if state.lockout_until and state.lockout_until < now:
+        # Lockout expired: move to the next stage
+        if state.attempt_count == 3:
+            state.attempt_count = 4
+            state.lockout_until = now + timedelta(hours=1)
+        elif state.attempt_count == 4:
+            state.attempt_count = 5
+            state.lockout_until = now + timedelta(days=1)
+        elif state.attempt_count >= 5:
+            # After 1 day, reset everything
+            state.attempt_count = 1
+            state.lockout_until = None
+        else:
+            state.attempt_count += 1
+            state.lockout_until = None
+    else:
+        state.attempt_count += 1
+        if state.attempt_count == 3:
+            state.lockout_until = now + timedelta(minutes=2)
+        elif state.attempt_count == 4:
+            state.lockout_until = now + timedelta(hours=1)
+        elif state.attempt_count >= 5:
+            state.lockout_until = now + timedelta(days=1)
+            state.attempt_count = 0
+    state.last_attempt = now
+
+
+class LoginLimiter:
+    def __init__(self, ip_max_failures: int, ip_window: float, flush_seconds: float, max_entries: int):
+        self.ip_max_failures = ip_max_failures
+        self.ip_window = ip_window
+        self.flush_seconds = flush_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._emails: "OrderedDict[str, _LockoutState]" = OrderedDict()
+        self._ip_failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"blocked_email": 0, "blocked_ip": 0, "flushed_rows": 0}
+
+    # ------------------------------------------------------------------ #
+    # Hot path
+    # ------------------------------------------------------------------ #
+    def check(self, email: str, ip: Optional[str]) -> Tuple[bool, str]:
+        """(blocked, message) before the credentials are even looked at."""
+        now = datetime.utcnow()
+        with self._lock:
+            if ip and self._ip_blocked_locked(ip, time.monotonic()):
+                self.stats["blocked_ip"] += 1
+                return True, "Too many failed login attempts from this address, please try again later"
+            state = self._emails.get(email)
+            if state and state.is_locked(now):
+                self.stats["blocked_email"] += 1
+                return True, _lockout_message(state, now)
+        return False, ""
+
+    def record_failure(self, email: str, ip: Optional[str]) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            state = self._emails.get(email)
+            if state is None:
+                state = self._emails[email] = _LockoutState()
+            self._emails.move_to_end(email)
+            _advance(state, now)
+            self._dirty.add(email)
+
+            if ip:
+                window = self._ip_failures.get(ip)
+                if window is None:
+                    window = self._ip_failures[ip] = deque(maxlen=self.ip_max_failures)
+                self._ip_failures.move_to_end(ip)
+                window.append(time.monotonic())
+            self._trim_locked(now)
+
+    def record_success(self, email: str) -> None:
+        with self._lock:
+            state = self._emails.get(email)
+            # Nothing tracked -> nothing to reset (and nothing to write)
+            if state is None or (state.attempt_count == 0 and state.lockout_until is None):
+                return
+            state.attempt_count = 0
+            state.lockout_until = None
+            self._dirty.add(email)
+
+    def _ip_blocked_locked(self, ip: str, now: float) -> bool:
+        window = self._ip_failures.get(ip)
+        if not window:
+            return False
+        cutoff = now - self.ip_window
+        while window and window[0] < cutoff:
+            window.popleft()
+        if not window:
+            del self._ip_failures[ip]
+            return False
+        return len(window) >= self.ip_max_failures
+
+    def _trim_locked(self, now: datetime) -> None:
+        # Least recently failed first, down to 90% so this doesn't run on
+        # every failure. Locked-out or unwritten entries are always kept; an
+        # evicted email restarts its stages at the first lockout.
+        if len(self._emails) > self.max_entries:
+            target = int(self.max_entries * 0.9)
+            for email, state in list(self._emails.items()):
+                if len(self._emails) <= target:
+                    break
+                if email not in self._dirty and not state.is_locked(now):
+                    del self._emails[email]
+        while len(self._ip_failures) > self.max_entries:
+            self._ip_failures.popitem(last=False)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def load(self) -> None:
+        """Bring back lockouts / partial counts recorded before a restart."""
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT email, attempt_count, lockout_until, last_attempt
+                FROM dbo.FailedLoginAttempts
+                WHERE attempt_count > 0 OR lockout_until > GETUTCDATE()
+                """
+            )
+            rows = cur.fetchall()
+        with self._lock:
+            for email, count, lockout_until, last_attempt in rows:
+                if email not in self._emails:
+                    self._emails[email] = _LockoutState(count or 0, lockout_until, last_attempt)
+        print(f"🔐 Login limiter loaded {len(rows)} tracked email(s)")
+
+    def flush(self) -> int:
+        """Write every changed email state in one batch."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            batch = []
+            for email in self._dirty:
+                s = self._emails.get(email)
+                if s is not None:
+                    batch.append((email, s.attempt_count, s.lockout_until, s.last_attempt or datetime.utcnow()))
+            self._dirty.clear()
+
+        try:
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                cur.executemany(
+                    """
+                    MERGE dbo.FailedLoginAttempts AS t
+                    USING (SELECT %s AS email, %s AS attempt_count, %s AS lockout_until, %s AS last_attempt) AS s
+                    ON t.email = s.email
+                    WHEN MATCHED THEN UPDATE SET
+                        attempt_count = s.attempt_count,
+                        lockout_until = s.lockout_until,
+                        last_attempt = s.last_attempt
+                    WHEN NOT MATCHED THEN
+                        INSERT (email, attempt_count, lockout_until, last_attempt)
+                        VALUES (s.email, s.attempt_count, s.lockout_until, s.last_attempt);
+                    """,
+                    batch,
+                )
+                conn.commit()
+        except Exception:
+            # Retry on the next flush, unless the email changed again meanwhile
+            with self._lock:
+                self._dirty.update(email for email, *_ in batch)
+            raise
+        self.stats["flushed_rows"] += len(batch)
+        return len(batch)
+
+    def start(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"⚠️ Could not load failed login attempts: {e}")
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="login-limiter-flush", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Final login attempt flush failed: {e}")
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Login attempt flush failed: {e}")
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tracked_emails": len(self._emails),
+                "tracked_ips": len(self._ip_failures),
+                "pending_writes": len(self._dirty),
+                **self.stats,
+            }
+
+
+# Global instance
+login_limiter = LoginLimiter(
+    ip_max_failures=LOGIN_IP_MAX_FAILURES,
+    ip_window=LOGIN_IP_WINDOW_SECONDS,
+    flush_seconds=LOGIN_FLUSH_SECONDS,
+    max_entries=LOGIN_LIMITER_MAX_ENTRIES,
+)
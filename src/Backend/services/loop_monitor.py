@@ -0,0 +1,148 @@
+# services/loop_monitor.py
+"""
+Event-loop lag monitor
+----------------------
+
+* A heartbeat task on the API's event loop sleeps LOOP_LAG_INTERVAL and
+  records how late it woke up - that delay is what every request on the
+  loop waited, too (p50 / p99 / max over the recent samples).
+* A watchdog thread watches the heartbeat. When the loop has been stuck
+  longer than LOOP_BLOCK_THRESHOLD_MS it grabs the loop thread's stack
+  and charges the stall to the innermost frame from our own code (the
+  route handler or service function that is blocking), once per stall.
+* Offenders are logged and exported at /metrics/event-loop together with
+  the blocking pools' queue depth (services/blocking.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from config import LOOP_LAG_INTERVAL, LOOP_BLOCK_THRESHOLD_MS
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_OWN_FILE = os.path.abspath(__file__)
+
+
+def _blame(frame) -> tuple[str, str]:
+    """(innermost app frame 'file:function:line', short stack) for a frame."""
+    stack = traceback.extract_stack(frame)
+    culprit = None
+    for entry in reversed(stack):
+        path = os.path.abspath(entry.filename)
+        if path.startswith(_APP_ROOT) and path != _OWN_FILE and "site-packages" not in path:
+            culprit = f"{os.path.relpath(path, _APP_ROOT)}:{entry.name}:{entry.lineno}"
+            break
+    if culprit is None and stack:
+        culprit = f"{os.path.basename(stack[-1].filename)}:{stack[-1].name}"
+    summary = " <- ".join(f"{os.path.basename(e.filename)}:{e.name}" for e in reversed(stack[-8:]))
+    return culprit or "unknown", summary
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float, threshold_ms: float, samples: int = 600):
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self._lags: Deque[float] = deque(maxlen=samples)
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._stall_reported = False
+        self._last_culprit: Optional[str] = None
+        self._blockers: Dict[str, dict] = {}
+        self.stalls = 0
+        self.max_lag = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle (call start() from a startup hook on the serving loop)
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                if self._stall_reported and self._last_culprit:
+                    # The watchdog saw the stall start; now we know its length
+                    entry = self._blockers[self._last_culprit]
+                    entry["max_ms"] = max(entry["max_ms"], round(lag * 1000, 1))
+                self._beat = now
+                self._stall_reported = False
+                self._last_culprit = None
+                self._lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                print(f"🐢 Event loop lag {lag * 1000:.0f} ms")
+
+    def _watch(self) -> None:
+        period = max(self.threshold / 2, 0.01)
+        while not self._stop_event.wait(period):
+            with self._lock:
+                stalled_for = time.monotonic() - self._beat - self.interval
+                if stalled_for < self.threshold or self._stall_reported:
+                    continue
+                self._stall_reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            culprit, summary = _blame(frame)
+            self._record(culprit, summary, stalled_for)
+
+    def _record(self, culprit: str, summary: str, stalled_for: float) -> None:
+        with self._lock:
+            self.stalls += 1
+            entry = self._blockers.setdefault(culprit, {"count": 0, "max_ms": 0.0, "stack": ""})
+            entry["count"] += 1
+            entry["max_ms"] = max(entry["max_ms"], round(stalled_for * 1000, 1))
+            entry["stack"] = summary
+            self._last_culprit = culprit
+        print(f"⚠️ Event loop blocked >{stalled_for * 1000:.0f} ms by {culprit} ({summary})")
+
+    # ------------------------------------------------------------------ #
+    # Export
+    # ------------------------------------------------------------------ #
+    def snapshot(self) -> dict:
+        with self._lock:
+            lags = sorted(self._lags)
+            blockers = sorted(self._blockers.items(), key=lambda kv: kv[1]["count"], reverse=True)
+
+        def pct(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 2) if lags else 0.0
+
+        return {
+            "lag_ms": {"p50": pct(0.5), "p99": pct(0.99), "max": round(self.max_lag * 1000, 2)},
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "blockers": dict(blockers[:20]),
+        }
+
+
+# Global instance
+loop_monitor = LoopLagMonitor(interval=LOOP_LAG_INTERVAL, threshold_ms=LOOP_BLOCK_THRESHOLD_MS)
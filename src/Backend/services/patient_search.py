@@ -0,0 +1,332 @@
+# services/patient_search.py
+"""
+In-process prefix index for patient autocomplete
+------------------------------------------------
+
+* Names and emails are normalized once (casefold, Latin diacritics and
+  Hebrew niqqud stripped, Hebrew final letters folded: ך→כ ם→מ ן→נ ף→פ ץ→צ)
+  and split into tokens kept in a sorted list.
+* A keystroke is a binary search per query term plus a scan of the
+  matching range that stops at `limit` - no `LIKE '%...%'` table scan.
+* Every query term must be a prefix of some token ("dan co" finds
+  "Dana Cohen"); results are ranked and capped at `limit`.
+* The index holds only ids, names and emails. It is kept in sync by
+  `/patients/add` and fully reloaded from the DB every
+  PATIENT_SEARCH_REFRESH_SECONDS (rows added elsewhere / other replicas).
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config import PATIENT_SEARCH_REFRESH_SECONDS
+
+_HEBREW_FINALS = str.maketrans({"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"})
+# geresh / gershayim and ASCII quotes used in their place ("צ'רלי", "ד״ר")
+_DROP = str.maketrans("", "", "׳״'\"`")
+_NAME_SPLIT = re.compile(r"[\s\-]+")
+_EMAIL_SPLIT = re.compile(r"[@._+\-\s]+")
+_MAX_CHAR = "\U0010ffff"     # sorts after any character a key can contain
+
+
+def normalize(text: Optional[str]) -> str:
+    """Fold case, diacritics / niqqud and Hebrew final letters."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    folded = stripped.casefold().translate(_HEBREW_FINALS).translate(_DROP)
+    return " ".join(folded.split())
+
+
+def name_tokens(full_name: Optional[str]) -> Set[str]:
+    return {t for t in _NAME_SPLIT.split(normalize(full_name)) if t}
+
+
+def _query_terms(q: str, by_email: bool) -> List[str]:
+    """Terms of an already-normalized query."""
+    if by_email:
+        return [q] if "@" in q else [t for t in _EMAIL_SPLIT.split(q) if t]
+    return q.split(" ")
+
+
+def email_tokens(email: Optional[str]) -> Set[str]:
+    norm = normalize(email)
+    if not norm:
+        return set()
+    tokens = {norm, norm.split("@", 1)[0]}
+    tokens.update(t for t in _EMAIL_SPLIT.split(norm) if t)
+    return tokens
+
+
+class _PrefixIndex:
+    """Sorted (key, id) pairs; prefix lookups by bisect."""
+
+    def __init__(self, pairs: Iterable[Tuple[str, int]] = ()):
+        self._keys: List[Tuple[str, int]] = sorted(set(pairs))
+
+    def add(self, key: str, item_id: int) -> None:
+        pair = (key, item_id)
+        i = bisect_left(self._keys, pair)
+        if i == len(self._keys) or self._keys[i] != pair:
+            insort(self._keys, pair)
+
+    def remove(self, key: str, item_id: int) -> None:
+        pair = (key, item_id)
+        i = bisect_left(self._keys, pair)
+        if i < len(self._keys) and self._keys[i] == pair:
+            del self._keys[i]
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return (
+            bisect_left(self._keys, (prefix,)),
+            bisect_left(self._keys, (prefix + _MAX_CHAR,)),
+        )
+
+    def count_prefix(self, prefix: str) -> int:
+        lo, hi = self._range(prefix)
+        return hi - lo
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, int]]:
+        """(key, id) pairs whose key starts with `prefix`, in key order."""
+        lo, hi = self._range(prefix)
+        keys = self._keys
+        return (keys[i] for i in range(lo, hi))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _Entry:
+    __slots__ = ("full_name", "raw_email", "name", "email", "name_tokens", "email_tokens")
+
+    def __init__(self, full_name: Optional[str], email: Optional[str]):
+        self.full_name = full_name
+        self.raw_email = email
+        self.name = normalize(full_name)
+        self.email = normalize(email)
+        self.name_tokens = tuple(name_tokens(full_name))
+        self.email_tokens = tuple(email_tokens(email))
+
+
+class PatientSearchIndex:
+    """
+    Two indexes per field: whole normalized value (ranks "starts with the
+    query" first) and individual words (everything else). Both are scanned
+    in sorted order and the scan stops at `limit`, so a one-letter prefix
+    matching half the table costs the same as a rare one.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._name_full = _PrefixIndex()
+        self._name_words = _PrefixIndex()
+        self._email_full = _PrefixIndex()
+        self._email_words = _PrefixIndex()
+        self._entries: Dict[int, _Entry] = {}
+        self.loaded_at: Optional[float] = None
+        self.version = 0        # bumped on every change (cache / ETag validity)
+
+    # ------------------------------------------------------------------ #
+    # Maintenance
+    # ------------------------------------------------------------------ #
+    def rebuild(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> None:
+        """Replace the whole index from (PatientID, FullName, PatientEmail) rows."""
+        entries = {pid: _Entry(full_name, email) for pid, full_name, email in rows}
+
+        # Built outside the lock; searches keep using the old index meanwhile
+        name_full = _PrefixIndex((e.name, pid) for pid, e in entries.items() if e.name)
+        email_full = _PrefixIndex((e.email, pid) for pid, e in entries.items() if e.email)
+        name_words = _PrefixIndex((t, pid) for pid, e in entries.items() for t in e.name_tokens)
+        email_words = _PrefixIndex((t, pid) for pid, e in entries.items() for t in e.email_tokens)
+        with self._lock:
+            self._name_full, self._name_words = name_full, name_words
+            self._email_full, self._email_words = email_full, email_words
+            self._entries = entries
+            self.loaded_at = time.time()
+            self.version += 1
+
+    def upsert(self, patient_id: int, full_name: Optional[str], email: Optional[str]) -> None:
+        entry = _Entry(full_name, email)
+        with self._lock:
+            self._drop_locked(patient_id)
+            self.version += 1
+            self._entries[patient_id] = entry
+            if entry.name:
+                self._name_full.add(entry.name, patient_id)
+            if entry.email:
+                self._email_full.add(entry.email, patient_id)
+            for t in entry.name_tokens:
+                self._name_words.add(t, patient_id)
+            for t in entry.email_tokens:
+                self._email_words.add(t, patient_id)
+
+    def remove(self, patient_id: int) -> None:
+        with self._lock:
+            self._drop_locked(patient_id)
+            self.version += 1
+
+    def _drop_locked(self, patient_id: int) -> None:
+        old = self._entries.pop(patient_id, None)
+        if old is None:
+            return
+        self._name_full.remove(old.name, patient_id)
+        self._email_full.remove(old.email, patient_id)
+        for t in old.name_tokens:
+            self._name_words.remove(t, patient_id)
+        for t in old.email_tokens:
+            self._email_words.remove(t, patient_id)
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def search_names(self, query: str, limit: int) -> List[int]:
+        return self._search(query, limit, by_email=False)
+
+    def search_emails(self, query: str, limit: int) -> List[int]:
+        return self._search(query, limit, by_email=True)
+
+    def _search(self, query: str, limit: int, by_email: bool) -> List[int]:
+        """
+        Ranked: exact match, then values starting with the query (both in
+        alphabetical order), then values where every query term starts some
+        word (in order of the rarest term's matching word).
+        """
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        terms = _query_terms(q, by_email)
+
+        results: List[int] = []
+        seen: Set[int] = set()
+        with self._lock:
+            full = self._email_full if by_email else self._name_full
+            words = self._email_words if by_email else self._name_words
+
+            for _, pid in full.iter_prefix(q):
+                seen.add(pid)
+                results.append(pid)
+                if len(results) >= limit:
+                    return results
+
+            # Drive the scan with the rarest term, check the others per row
+            driver, *others = sorted(terms, key=words.count_prefix)
+            for _, pid in words.iter_prefix(driver):
+                if pid in seen:
+                    continue
+                if others:
+                    entry = self._entries[pid]
+                    tokens = entry.email_tokens if by_email else entry.name_tokens
+                    if not all(any(t.startswith(o) for t in tokens) for o in others):
+                        continue
+                seen.add(pid)
+                results.append(pid)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def match_tier(self, patient_id: int, query: str, by_email: bool) -> Optional[int]:
+        """
+        Rank tier of one patient for `query` (0 exact, 1 starts with, 2 word
+        prefixes) or None if it doesn't match - for filtering a cached set.
+        """
+        q = normalize(query)
+        entry = self._entries.get(patient_id)
+        if entry is None or not q:
+            return None
+        text = entry.email if by_email else entry.name
+        if text == q:
+            return 0
+        if text.startswith(q):
+            return 1
+        tokens = entry.email_tokens if by_email else entry.name_tokens
+        if all(any(t.startswith(term) for t in tokens) for term in _query_terms(q, by_email)):
+            return 2
+        return None
+
+    def display(self, patient_ids: Iterable[int]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """(PatientID, FullName, PatientEmail) as stored in the DB."""
+        with self._lock:
+            found = [(pid, self._entries.get(pid)) for pid in patient_ids]
+        return [(pid, e.full_name, e.raw_email) for pid, e in found if e is not None]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "patients": len(self._entries),
+                "name_tokens": len(self._name_words),
+                "email_tokens": len(self._email_words),
+                "loaded_at": self.loaded_at,
+                "version": self.version,
+            }
+
+
+class PatientSearchService:
+    """The index plus its DB loading / periodic refresh."""
+
+    def __init__(self, refresh_seconds: float):
+        self.index = PatientSearchIndex()
+        self.refresh_seconds = refresh_seconds
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, only_if_empty: bool = False) -> None:
+        from services.db_pool import pooled_connection
+
+        with self._load_lock:
+            if only_if_empty and self.index.loaded_at is not None:
+                return      # someone else loaded it while we waited
+            started = time.perf_counter()
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT PatientID, FullName, PatientEmail FROM dbo.Patients")
+                rows = cur.fetchall()
+            self.index.rebuild(rows)
+            print(f"🔎 Patient search index loaded: {len(rows)} patients "
+                  f"in {time.perf_counter() - started:.2f}s")
+
+    def ensure_loaded(self) -> None:
+        if self.index.loaded_at is None:
+            self.refresh(only_if_empty=True)
+
+    def search_names(self, query: str, limit: int) -> List[int]:
+        self.ensure_loaded()
+        return self.index.search_names(query, limit)
+
+    def search_emails(self, query: str, limit: int) -> List[int]:
+        self.ensure_loaded()
+        return self.index.search_emails(query, limit)
+
+    def add_patient(self, patient_id: int, full_name: Optional[str], email: Optional[str]) -> None:
+        # Before the first load the row will simply come with it
+        if self.index.loaded_at is not None:
+            self.index.upsert(patient_id, full_name, email)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="patient-search-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Patient search index refresh failed: {e}")
+            self._stop_event.wait(self.refresh_seconds)
+
+
+# Global instance
+patient_search = PatientSearchService(refresh_seconds=PATIENT_SEARCH_REFRESH_SECONDS)
@@ -1,53 +1,56 @@
-import uuid
+import os
+import socket
 import threading
-import time
-import pymssql
-import json
-from datetime import datetime
-from typing import Optional, Dict, Any
-from services.azure_transcription import transcribe_dialog
-from services.azure_sentiment import analyze_sentiment_from_blob
-from services.blob_service import create_sas_url
-from services.sql_service import get_patient_id_by_email, get_therapist_id_by_email
-from config import DB_SERVER, DB_USER, DB_PASSWORD, DB_DATABASE
-
-class ProcessingJobService:
-    def __init__(self):
-        self.processing_threads = {}
-        
-    def _get_db_connection(self):
-        """Get database connection"""
-        return pymssql.connect(
-            server=DB_SERVER,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_DATABASE
-        )
 import uuid
-import threading
 import time
-import pymssql
 import json
 from datetime import datetime
-from typing import Optional, Dict, Any
-from services.azure_transcription import transcribe_dialog
+from typing import Optional, Dict, Any, List
+from services.transcription_batcher import transcription_batcher
 from services.azure_sentiment import analyze_sentiment_from_blob
-from services.blob_service import create_sas_url
-from services.sql_service import get_patient_id_by_email, get_therapist_id_by_email
-from config import DB_SERVER, DB_USER, DB_PASSWORD, DB_DATABASE
+from services.blob_service import create_sas_url, find_transcript_url
+from services.db_pool import get_connection
+from services.job_state import job_state
+from services.job_record import JobRecord, JOB_SELECT, STATUS_SELECT, status_from_row
+from services.job_scheduler import (
+    JobScheduler,
+    SchedulerFull,
+    SchedulerClosed,
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL,
+    PRIORITY_LOW,
+)
+from config import (
+    PROCESSING_MAX_WORKERS, PROCESSING_QUEUE_SIZE,
+    PROCESSING_BLOB_CONCURRENCY,
+    PROCESSING_DB_CONCURRENCY, PROCESSING_SHUTDOWN_TIMEOUT,
+    PROCESSING_LEASE_SECONDS, PROCESSING_HEARTBEAT_SECONDS,
+    PROCESSING_RECOVERY_INTERVAL,
+)
 
 class ProcessingJobService:
     def __init__(self):
-        self.processing_threads = {}
+        self.scheduler = JobScheduler(
+            max_workers=PROCESSING_MAX_WORKERS,
+            max_queue_size=PROCESSING_QUEUE_SIZE,
+            # Transcription concurrency is enforced by transcription_batcher
+            # (concurrent Speech jobs), not by holding worker threads
+            stage_limits={
+                "blob": PROCESSING_BLOB_CONCURRENCY,
+                "db": PROCESSING_DB_CONCURRENCY,
+            },
+        )
+        # Identifies this process as the owner of a job's lease
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held_leases: set[str] = set()
+        self._lease_lock = threading.Lock()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._recovery_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
         
     def _get_db_connection(self):
-        """Get database connection"""
-        return pymssql.connect(
-            server=DB_SERVER,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_DATABASE
-        )
+        """Borrow a connection from the shared pool (close() returns it)"""
+        return get_connection()
         
     def create_job(self, 
                    patient_email: str, 
@@ -56,6 +59,8 @@ class ProcessingJobService:
                    session_notes: str, 
                    audio_url: str) -> str:
         """Create a new processing job and return job ID"""
+        # Refuse before inserting a row we could not schedule
+        self.scheduler.check_capacity()
         job_id = str(uuid.uuid4())
         
         conn = self._get_db_connection()
@@ -71,10 +76,17 @@ class ProcessingJobService:
                 job_id, patient_email, therapist_email, session_date, 
                 session_notes, audio_url, 'pending', 0
             ))
+            created = self._read_status(cursor, job_id)
             conn.commit()
+            job_state.hold(job_id, created)
             
             # Start background processing
-            self.start_processing(job_id)
+            try:
+                self.start_processing(job_id)
+            except (SchedulerFull, SchedulerClosed) as e:
+                # The row is durable; the recovery sweep will pick it up
+                job_state.release(job_id, linger=False)
+                print(f"⚠️ Job {job_id} left pending for the recovery sweep: {e}")
             
             return job_id
         except Exception as e:
@@ -84,125 +96,91 @@ class ProcessingJobService:
             cursor.close()
             conn.close()
     
-    def start_processing(self, job_id: str):
-        """Start background processing for a job"""
-        thread = threading.Thread(target=self._process_job, args=(job_id,))
-        thread.daemon = True
-        thread.start()
-        self.processing_threads[job_id] = thread
+    def start_processing(self, job_id: str, priority: int = PRIORITY_NORMAL):
+        """Queue a job on the bounded worker pool (raises SchedulerFull)"""
+        self.scheduler.submit(job_id, self._process_job, priority=priority)
+
+    def shutdown(self, timeout: float = PROCESSING_SHUTDOWN_TIMEOUT) -> bool:
+        """Stop accepting jobs and let queued/running ones finish"""
+        self._stop_event.set()
+        drained = self.scheduler.shutdown(drain=True, timeout=timeout)
+        if not drained:
+            print(f"⚠️ Processing queue not drained after {timeout}s: {self.scheduler.stats()}")
+        return drained
     
     def _process_job(self, job_id: str):
-        """Background processing function"""
+        """Background processing function (resumes from the last completed stage)"""
         conn = self._get_db_connection()
         cursor = conn.cursor()
+        claimed = False
+        handed_off = False  # waiting for a batched transcription; keep the lease
         
         try:
+            # Claim the job atomically so only one worker / replica runs it
+            claimed = self._claim_job(cursor, job_id)
+            conn.commit()
+            if not claimed:
+                job_state.release(job_id, linger=False)
+                print(f"Job {job_id} is leased elsewhere or no longer runnable - skipping")
+                return
+            self._track_lease(job_id)
+            
             # Get job details
-            cursor.execute("SELECT * FROM ProcessingJobs WHERE JobID = %s", (job_id,))
-            job_row = cursor.fetchone()
-            if not job_row:
+            job = self._load_job(cursor, job_id)
+            if job is None:
                 print(f"Job {job_id} not found")
                 return
+            job_state.hold(job_id, job.status_dict())
             
-            # Update status to processing
-            cursor.execute("""
-                UPDATE ProcessingJobs 
-                SET Status = %s, Progress = %s, UpdatedAt = %s 
-                WHERE JobID = %s
-            """, ('processing', 10, datetime.utcnow(), job_id))
-            conn.commit()
-            
-            # Extract job data
-            audio_url = job_row[6]  # AudioURL column
+            audio_url = job.audio_url
+            done_transcript_url, done_session_id = job.transcript_url, job.session_id
+            transcription_status = job.transcription_status
             
-            # Step 1: Transcription
-            transcript_url = None
-            try:
-                cursor.execute("""
-                    UPDATE ProcessingJobs 
-                    SET TranscriptionStatus = %s, Progress = %s, UpdatedAt = %s 
-                    WHERE JobID = %s
-                """, ('processing', 20, datetime.utcnow(), job_id))
-                conn.commit()
-                
-                # Extract filename from audio URL for SAS
-                filename = audio_url.split('/')[-1]
-                sas_url = create_sas_url(f"recordings/{filename}", minutes=120)
-                
-                print(f"Starting transcription for job {job_id}")
-                _, transcript_url = transcribe_dialog(sas_url, locale="he-IL")
-                
-                cursor.execute("""
-                    UPDATE ProcessingJobs 
-                    SET TranscriptURL = %s, TranscriptionStatus = %s, Progress = %s, UpdatedAt = %s 
-                    WHERE JobID = %s
-                """, (transcript_url, 'completed', 60, datetime.utcnow(), job_id))
-                conn.commit()
-                
-                print(f"Transcription completed for job {job_id}")
-                
-            except Exception as e:
-                cursor.execute("""
-                    UPDATE ProcessingJobs 
-                    SET TranscriptionStatus = %s, TranscriptionError = %s, Progress = %s, UpdatedAt = %s 
-                    WHERE JobID = %s
-                """, ('failed', str(e), 30, datetime.utcnow(), job_id))
-                conn.commit()
-                print(f"Transcription failed for job {job_id}: {e}")
+            # Step 1: Transcription (never redone once a transcript exists)
+            transcript_url = done_transcript_url
+            if not transcript_url and transcription_status != 'failed':
+                transcript_url = self._existing_transcript_url(audio_url)
+                if transcript_url:
+                    print(f"Transcript already exists for job {job_id} - skipping transcription")
+                    self._mark_transcribed(conn, cursor, job_id, transcript_url)
+                else:
+                    # Joins the next batched Speech job; the worker is freed and
+                    # _finish_transcription() resumes the job when results arrive
+                    self._start_transcription(job_id, audio_url)
+                    handed_off = True
+                    return
             
             # Step 2: Skip sentiment analysis during upload (will be done on-demand in patient dashboard)
-            cursor.execute("""
-                UPDATE ProcessingJobs 
-                SET Progress = %s, UpdatedAt = %s 
-                WHERE JobID = %s
-            """, (90, datetime.utcnow(), job_id))
-            conn.commit()
+            # Progress only - written through with the completion below
+            job_state.update(job_id, progress=90)
             print(f"Sentiment analysis skipped for job {job_id} - will be done on-demand")
             
             # Step 3: Save to Sessions table
             try:
-                # Get job details again for the session save
-                cursor.execute("SELECT * FROM ProcessingJobs WHERE JobID = %s", (job_id,))
-                job_row = cursor.fetchone()
-                
-                patient_email = job_row[2]
-                therapist_email = job_row[3]
-                session_date = job_row[4]
-                session_notes = job_row[5]
+                if done_session_id:
+                    session_id = done_session_id
+                    print(f"Session {session_id} already saved for job {job_id}")
+                else:
+                    with self.scheduler.stage("db"):
+                        session_id = self._save_session(
+                            conn, cursor, job.patient_email, job.therapist_email,
+                            job.session_date, job.session_notes, audio_url, transcript_url,
+                        )
                 
-                patient_id = get_patient_id_by_email(patient_email)
-                therapist_id = get_therapist_id_by_email(therapist_email)
+                # Update job with session ID and completion
+                cursor.execute("""
+                    UPDATE ProcessingJobs 
+                    SET SessionID = %s, Status = %s, Progress = %s, LastCompletedStage = %s,
+                        CompletedAt = %s, UpdatedAt = %s 
+                    WHERE JobID = %s
+                """, (session_id, 'completed', 100, 'saved', datetime.utcnow(), datetime.utcnow(), job_id))
+                conn.commit()
+                job_state.update(
+                    job_id, status='completed', progress=100,
+                    completed_at=datetime.utcnow().isoformat(),
+                )
                 
-                if patient_id and therapist_id:
-                    # Insert into Sessions table
-                    cursor.execute("""
-                        INSERT INTO Sessions 
-                        (PatientID, TherapistID, SessionDate, SessionNotes, BlobURL, Transcript, Timestamp, analysis)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    """, (
-                        patient_id, therapist_id, 
-                        datetime.strptime(session_date, "%Y-%m-%d").date(),
-                        session_notes, audio_url, transcript_url, 
-                        datetime.utcnow(), 
-                        None  # analysis will be done on-demand in patient dashboard
-                    ))
-                    conn.commit()
-                    
-                    # Get the new session ID
-                    cursor.execute("SELECT @@IDENTITY")
-                    session_id = cursor.fetchone()[0]
-                    
-                    # Update job with session ID and completion
-                    cursor.execute("""
-                        UPDATE ProcessingJobs 
-                        SET SessionID = %s, Status = %s, Progress = %s, CompletedAt = %s, UpdatedAt = %s 
-                        WHERE JobID = %s
-                    """, (session_id, 'completed', 100, datetime.utcnow(), datetime.utcnow(), job_id))
-                    conn.commit()
-                    
-                    print(f"Job {job_id} completed successfully")
-                else:
-                    raise Exception("Invalid patient or therapist email")
+                print(f"Job {job_id} completed successfully")
                     
             except Exception as e:
                 cursor.execute("""
@@ -211,6 +189,7 @@ class ProcessingJobService:
                     WHERE JobID = %s
                 """, ('failed', f"Database save failed: {str(e)}", datetime.utcnow(), job_id))
                 conn.commit()
+                job_state.update(job_id, status='failed', transcription_error=f"Database save failed: {str(e)}")
                 print(f"Database save failed for job {job_id}: {e}")
         
         except Exception as e:
@@ -220,49 +199,326 @@ class ProcessingJobService:
                 WHERE JobID = %s
             """, ('failed', f"Processing failed: {str(e)}", datetime.utcnow(), job_id))
             conn.commit()
+            job_state.update(job_id, status='failed', transcription_error=f"Processing failed: {str(e)}")
             print(f"Job {job_id} failed: {e}")
         
         finally:
+            if claimed and not handed_off:
+                self._release_lease(cursor, job_id)
+                conn.commit()
+                job_state.release(job_id)
             cursor.close()
             conn.close()
-            # Remove from active threads
-            if job_id in self.processing_threads:
-                del self.processing_threads[job_id]
+
+    def _start_transcription(self, job_id: str, audio_url: str):
+        """Hand the recording to the transcription batcher"""
+        # Not written through: a resumed job restarts transcription anyway
+        job_state.update(job_id, transcription_status='processing', progress=20)
+        
+        # Extract filename from audio URL for SAS (valid long enough to wait in a batch)
+        filename = audio_url.split('/')[-1]
+        with self.scheduler.stage("blob"):
+            sas_url = create_sas_url(f"recordings/{filename}", minutes=240)
+        
+        print(f"Queued transcription for job {job_id}")
+        future = transcription_batcher.submit(sas_url, locale="he-IL")
+        # Runs on the speech loop: only hop back onto the worker pool there
+        future.add_done_callback(lambda f: self._resume_after_transcription(job_id, f))
+
+    def _resume_after_transcription(self, job_id: str, future):
+        try:
+            submitted = self.scheduler.submit(
+                job_id,
+                lambda jid: self._finish_transcription(jid, future),
+                priority=PRIORITY_HIGH,
+                force=True,
+            )
+        except SchedulerClosed:
+            # Shutting down: let the lease expire so the recovery sweep takes over
+            with self._lease_lock:
+                self._held_leases.discard(job_id)
+            job_state.release(job_id, linger=False)
+            print(f"⚠️ Transcription for job {job_id} finished during shutdown")
+            return
+        if not submitted:
+            # The handing-off worker has not returned yet; try again shortly
+            threading.Timer(1.0, self._resume_after_transcription, (job_id, future)).start()
+
+    def _finish_transcription(self, job_id: str, future):
+        """Record a batched transcription outcome, then continue the job"""
+        conn = self._get_db_connection()
+        cursor = conn.cursor()
+        try:
+            try:
+                _, transcript_url = future.result()
+                self._mark_transcribed(conn, cursor, job_id, transcript_url)
+                print(f"Transcription completed for job {job_id}")
+            except Exception as e:
+                cursor.execute("""
+                    UPDATE ProcessingJobs 
+                    SET TranscriptionStatus = %s, TranscriptionError = %s, Progress = %s, UpdatedAt = %s 
+                    WHERE JobID = %s
+                """, ('failed', str(e), 30, datetime.utcnow(), job_id))
+                conn.commit()
+                job_state.update(job_id, transcription_status='failed', transcription_error=str(e), progress=30)
+                print(f"Transcription failed for job {job_id}: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+        # Resume: the transcript (or its failure) is recorded, so step 1 is skipped
+        self._process_job(job_id)
+
+    def _mark_transcribed(self, conn, cursor, job_id: str, transcript_url: str):
+        cursor.execute("""
+            UPDATE ProcessingJobs 
+            SET TranscriptURL = %s, TranscriptionStatus = %s, Progress = %s,
+                LastCompletedStage = %s, UpdatedAt = %s 
+            WHERE JobID = %s
+        """, (transcript_url, 'completed', 60, 'transcribed', datetime.utcnow(), job_id))
+        conn.commit()
+        job_state.update(job_id, transcript_url=transcript_url, transcription_status='completed', progress=60)
+
+    def _existing_transcript_url(self, audio_url: str) -> Optional[str]:
+        """A transcript blob left behind by a run that crashed before recording it"""
+        try:
+            return find_transcript_url(audio_url.split('/')[-1])
+        except Exception as e:
+            print(f"⚠️ Could not check for existing transcript of {audio_url}: {e}")
+            return None
+
+    def _save_session(self, conn, cursor, patient_email, therapist_email,
+                      session_date, session_notes, audio_url, transcript_url) -> int:
+        """Insert the Sessions row (idempotent: reuses a row saved by an earlier attempt)"""
+        # On the held cursor: borrowing a second pooled connection while
+        # holding this one can deadlock the pool under load
+        cursor.execute(
+            """
+            SELECT (SELECT PatientID FROM dbo.Patients WHERE PatientEmail = %s),
+                   (SELECT id FROM dbo.TherapistsLogin WHERE email = %s)
+            """,
+            (patient_email, therapist_email),
+        )
+        patient_id, therapist_id = cursor.fetchone()
+        if not (patient_id and therapist_id):
+            raise Exception("Invalid patient or therapist email")
+
+        cursor.execute(
+            "SELECT SessionID FROM Sessions WHERE PatientID = %s AND BlobURL = %s",
+            (patient_id, audio_url),
+        )
+        existing = cursor.fetchone()
+        if existing:
+            return existing[0]
+
+        # Insert into Sessions table
+        cursor.execute("""
+            INSERT INTO Sessions 
+            (PatientID, TherapistID, SessionDate, SessionNotes, BlobURL, Transcript, Timestamp, analysis)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            patient_id, therapist_id, 
+            datetime.strptime(session_date, "%Y-%m-%d").date(),
+            session_notes, audio_url, transcript_url, 
+            datetime.utcnow(), 
+            None  # analysis will be done on-demand in patient dashboard
+        ))
+        conn.commit()
+        
+        # Get the new session ID
+        cursor.execute("SELECT @@IDENTITY")
+        return cursor.fetchone()[0]
+
+    # ------------------------------------------------------------------ #
+    # Leases: a job row is owned by one worker at a time
+    # ------------------------------------------------------------------ #
+    def _claim_job(self, cursor, job_id: str) -> bool:
+        """
+        Atomically take the lease on a runnable job. Succeeds only if nobody
+        holds a live lease, so replicas sharing the table never double-process.
+        """
+        cursor.execute("""
+            UPDATE ProcessingJobs
+            SET LeaseOwner = %s,
+                LeaseExpiresAt = DATEADD(second, %s, GETUTCDATE()),
+                HeartbeatAt = GETUTCDATE(),
+                Status = 'processing',
+                Progress = CASE WHEN Progress < 10 THEN 10 ELSE Progress END,
+                UpdatedAt = %s
+            OUTPUT inserted.JobID
+            WHERE JobID = %s
+              AND Status IN ('pending', 'processing')
+              AND (LeaseOwner IS NULL OR LeaseExpiresAt < GETUTCDATE() OR LeaseOwner = %s)
+        """, (self.worker_id, PROCESSING_LEASE_SECONDS, datetime.utcnow(), job_id, self.worker_id))
+        return cursor.fetchone() is not None
+
+    def _load_job(self, cursor, job_id: str) -> Optional[JobRecord]:
+        cursor.execute(f"SELECT {JOB_SELECT} FROM ProcessingJobs WHERE JobID = %s", (job_id,))
+        row = cursor.fetchone()
+        return JobRecord.from_row(row) if row else None
+
+    def _read_status(self, cursor, job_id: str) -> Optional[Dict[str, Any]]:
+        cursor.execute(f"SELECT {STATUS_SELECT} FROM ProcessingJobs WHERE JobID = %s", (job_id,))
+        row = cursor.fetchone()
+        return status_from_row(row) if row else None
+
+    def _release_lease(self, cursor, job_id: str):
+        with self._lease_lock:
+            self._held_leases.discard(job_id)
+        try:
+            cursor.execute("""
+                UPDATE ProcessingJobs
+                SET LeaseOwner = NULL, LeaseExpiresAt = NULL
+                WHERE JobID = %s AND LeaseOwner = %s
+            """, (job_id, self.worker_id))
+        except Exception as e:
+            # The lease simply expires if we can't release it
+            print(f"⚠️ Failed to release lease on job {job_id}: {e}")
+
+    def _track_lease(self, job_id: str):
+        with self._lease_lock:
+            self._held_leases.add(job_id)
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(
+                    target=self._heartbeat_loop, name="job-heartbeat", daemon=True
+                )
+                self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        """Extend the leases of every job this worker is running, in one UPDATE"""
+        while not self._stop_event.wait(PROCESSING_HEARTBEAT_SECONDS):
+            with self._lease_lock:
+                job_ids = list(self._held_leases)
+            if not job_ids:
+                continue
+            try:
+                conn = self._get_db_connection()
+                try:
+                    cursor = conn.cursor()
+                    placeholders = ", ".join(["%s"] * len(job_ids))
+                    cursor.execute(f"""
+                        UPDATE ProcessingJobs
+                        SET LeaseExpiresAt = DATEADD(second, %s, GETUTCDATE()),
+                            HeartbeatAt = GETUTCDATE()
+                        WHERE LeaseOwner = %s AND JobID IN ({placeholders})
+                    """, (PROCESSING_LEASE_SECONDS, self.worker_id, *job_ids))
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"⚠️ Lease heartbeat failed: {e}")
+
+    # ------------------------------------------------------------------ #
+    # Recovery: pick up jobs orphaned by a restart or a dead replica
+    # ------------------------------------------------------------------ #
+    def recover_jobs(self) -> int:
+        """Queue every runnable job without a live lease. Returns how many were queued."""
+        conn = self._get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT JobID FROM ProcessingJobs
+                WHERE Status IN ('pending', 'processing')
+                  AND (LeaseOwner IS NULL OR LeaseExpiresAt < GETUTCDATE())
+                ORDER BY CreatedAt
+            """)
+            job_ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+        queued = 0
+        for job_id in job_ids:
+            try:
+                if self.scheduler.submit(job_id, self._process_job, priority=PRIORITY_LOW):
+                    queued += 1
+            except (SchedulerFull, SchedulerClosed):
+                # The next sweep will get the rest
+                break
+        if queued:
+            print(f"♻️ Recovered {queued} orphaned processing job(s)")
+        return queued
+
+    def start_recovery(self):
+        """Run a recovery sweep now and then periodically in the background"""
+        if self._recovery_thread is not None:
+            return
+        self._recovery_thread = threading.Thread(
+            target=self._recovery_loop, name="job-recovery", daemon=True
+        )
+        self._recovery_thread.start()
+
+    def _recovery_loop(self):
+        while True:
+            try:
+                self.recover_jobs()
+            except Exception as e:
+                print(f"⚠️ Job recovery sweep failed: {e}")
+            if self._stop_event.wait(PROCESSING_RECOVERY_INTERVAL):
+                return
     
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Get current status of a processing job"""
+        """Get current status of a processing job (from memory if it runs here)"""
+        held = job_state.get(job_id)
+        if held is not None:
+            return held
+
         conn = self._get_db_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT * FROM ProcessingJobs WHERE JobID = %s", (job_id,))
-            job_row = cursor.fetchone()
-            
-            if not job_row:
-                return None
-                
-            return {
-                "job_id": job_row[0],
-                "patient_email": job_row[1],
-                "therapist_email": job_row[2],
-                "session_date": job_row[3],
-                "session_notes": job_row[4],
-                "audio_url": job_row[5],
-                "transcript_url": job_row[6],
-                "status": job_row[7],
-                "transcription_status": job_row[8],
-                "progress": job_row[9],
-                "transcription_error": job_row[10],
-                "created_at": job_row[11].isoformat() if job_row[11] else None,
-                "updated_at": job_row[12].isoformat() if job_row[12] else None,
-                "completed_at": job_row[13].isoformat() if job_row[13] else None,
-                "retry_count": job_row[14],
-                "max_retries": job_row[15]
-            }
+            return self._read_status(cursor, job_id)
         finally:
             cursor.close()
             conn.close()
     
+    def get_job_statuses(self, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Status of many jobs: those running here from memory, the rest in one query"""
+        statuses: Dict[str, Dict[str, Any]] = {}
+        unknown = []
+        for job_id in dict.fromkeys(job_ids):
+            held = job_state.get(job_id)
+            if held is not None:
+                statuses[job_id] = held
+            else:
+                unknown.append(job_id)
+        if not unknown:
+            return statuses
+
+        conn = self._get_db_connection()
+        cursor = conn.cursor()
+        try:
+            placeholders = ", ".join(["%s"] * len(unknown))
+            cursor.execute(
+                f"SELECT {STATUS_SELECT} FROM ProcessingJobs WHERE JobID IN ({placeholders})",
+                tuple(unknown),
+            )
+            for row in cursor.fetchall():
+                status = status_from_row(row)
+                statuses[status["job_id"]] = status
+            return statuses
+        finally:
+            cursor.close()
+            conn.close()
+
+    def list_active_jobs(self, therapist_email: str, limit: int) -> List[Dict[str, Any]]:
+        """A therapist's pending / processing jobs, newest first"""
+        conn = self._get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # Seeks IX_ProcessingJobs_TherapistEmail_Status_CreatedAt
+            cursor.execute(f"""
+                SELECT TOP (%s) {STATUS_SELECT}
+                FROM ProcessingJobs
+                WHERE TherapistEmail = %s AND Status IN ('pending', 'processing')
+                ORDER BY CreatedAt DESC
+            """, (limit, therapist_email))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+        # Jobs running here may be further along than their last durable write
+        return [job_state.get(row[0]) or status_from_row(row) for row in rows]
+
     def retry_job(self, job_id: str) -> bool:
         """Retry a failed job"""
         conn = self._get_db_connection()
@@ -274,6 +530,9 @@ class ProcessingJobService:
             
             if not job_row or job_row[0] >= job_row[1]:
                 return False
+            if self.scheduler.is_active(job_id):
+                return False
+            self.scheduler.check_capacity()
             
             # Update retry count and reset status
             cursor.execute("""
@@ -284,11 +543,19 @@ class ProcessingJobService:
                 WHERE JobID = %s
             """, (job_row[0] + 1, 'pending', 0, 'pending', datetime.utcnow(), job_id))
             conn.commit()
+            job_state.update(
+                job_id, status='pending', progress=0, transcription_status='pending',
+                transcription_error=None, retry_count=job_row[0] + 1,
+            )
             
-            # Start processing again
-            self.start_processing(job_id)
+            # Start processing again (behind fresh uploads)
+            self.start_processing(job_id, priority=PRIORITY_LOW)
             return True
             
+        except SchedulerFull:
+            conn.rollback()
+            job_state.release(job_id, linger=False)
+            raise
         except Exception as e:
             conn.rollback()
             print(f"Failed to retry job {job_id}: {e}")
@@ -0,0 +1,109 @@
+# services/query_budget.py
+"""
+Per-endpoint SQL statement budgets
+----------------------------------
+
+Every round-trip to Azure SQL costs tens of milliseconds, so an endpoint
+that quietly turns into N+1 queries gets slow long before anyone notices.
+
+    @router.get("/all-sessions")
+    @query_budget(1)
+    def get_all_sessions_for_patient(...): ...
+
+counts the statements the handler executes through the SQLAlchemy engine.
+Going over budget logs a warning, or raises when QUERY_BUDGET_STRICT=1
+(use that in dev / CI so a regression fails the request instead of
+slipping through). /metrics/query-budget shows the worst count seen per
+endpoint next to its budget.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from config import QUERY_BUDGET_STRICT
+from database import engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when an endpoint runs more statements than allowed."""
+
+
+class _Counter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+_current: ContextVar[Optional[_Counter]] = ContextVar("query_budget_counter", default=None)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, dict] = {}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def _record(name: str, budget: int, count: int) -> None:
+    with _stats_lock:
+        s = _stats.setdefault(name, {"budget": budget, "calls": 0, "max_statements": 0, "violations": 0})
+        s["calls"] += 1
+        s["max_statements"] = max(s["max_statements"], count)
+        if count > budget:
+            s["violations"] += 1
+
+    if count > budget:
+        msg = f"{name} ran {count} SQL statements (budget {budget})"
+        if QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(msg)
+        print(f"⚠️ Query budget exceeded: {msg}")
+
+
+def query_budget(max_statements: int):
+    """Decorator for route handlers (sync or async)."""
+
+    def decorator(fn):
+        name = fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                counter = _Counter()
+                token = _current.set(counter)
+                try:
+                    result = await fn(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+                _record(name, max_statements, counter.count)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            counter = _Counter()
+            token = _current.set(counter)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+            _record(name, max_statements, counter.count)
+            return result
+        return wrapper
+
+    return decorator
+
+
+def report() -> Dict[str, dict]:
+    with _stats_lock:
+        return {name: dict(s) for name, s in _stats.items()}
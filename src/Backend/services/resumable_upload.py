@@ -0,0 +1,290 @@
+# services/resumable_upload.py
+"""
+Resumable, chunked uploads for long session recordings
+------------------------------------------------------
+
+Protocol (see routes/audio_upload_async.py):
+  1. create   - client sends filename, total size and session metadata,
+                gets an `upload_id` and the fixed `chunk_size`
+  2. PUT      - chunk bytes at `offset` (a multiple of chunk_size); every
+                chunk is staged as one Azure block, re-sending is harmless
+  3. progress - which offsets are stored, so a dropped connection resumes
+                at the first missing chunk instead of byte 0
+  4. commit   - put-block-list in offset order, then enqueue the ProcessingJob
+
+The session manifest lives in memory and in `uploads/<id>.json`, and the
+received chunks are re-derived from the blob's uncommitted block list, so
+an upload survives an API restart or lands on another replica.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from config import UPLOAD_BLOCK_SIZE, UPLOAD_MAX_BYTES, UPLOAD_SESSION_TTL
+from services.blob_service import (
+    stage_block,
+    commit_blocks,
+    unique_blob_name,
+    list_uncommitted_blocks,
+    upload_json_to_azure,
+    read_json_blob,
+)
+
+MANIFEST_FOLDER = "uploads"
+
+
+class UploadSessionError(Exception):
+    """Bad request against an upload session (wrong offset, incomplete, ...)."""
+
+
+class UploadSessionNotFound(UploadSessionError):
+    """Unknown or expired upload id."""
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    owner: str
+    filename: str
+    blob_name: str
+    total_size: int
+    chunk_size: int
+    patient_email: str
+    therapist_email: str
+    session_date: str
+    notes: str
+    created_at: float
+    expires_at: float
+    received: Dict[int, int] = field(default_factory=dict)   # offset -> bytes
+    job_id: Optional[str] = None
+    audio_url: Optional[str] = None
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_length(self, offset: int) -> int:
+        return min(self.chunk_size, self.total_size - offset)
+
+    def block_id(self, offset: int) -> str:
+        # Equal length for every block of the blob (Azure requires it)
+        return f"{self.upload_id[:12]}-{offset:016d}"
+
+    @property
+    def received_bytes(self) -> int:
+        if self.audio_url is not None:
+            return self.total_size
+        return sum(self.received.values())
+
+    def missing_offsets(self) -> List[int]:
+        if self.audio_url is not None:      # blob already assembled
+            return []
+        return [
+            i * self.chunk_size
+            for i in range(self.chunk_count)
+            if i * self.chunk_size not in self.received
+        ]
+
+    def progress(self) -> dict:
+        missing = self.missing_offsets()
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "total_size": self.total_size,
+            "chunk_size": self.chunk_size,
+            "received_bytes": self.received_bytes,
+            "next_offset": missing[0] if missing else None,
+            "missing_offsets": missing,
+            "complete": not missing,
+            "committed": self.job_id is not None,
+            "job_id": self.job_id,
+            "expires_at": self.expires_at,
+        }
+
+    def manifest(self) -> dict:
+        data = asdict(self)
+        data.pop("received")     # re-derived from the block list
+        return data
+
+
+class ResumableUploadService:
+    def __init__(self, chunk_size: int, max_size: int, ttl: int):
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+        # Commit is one-at-a-time per upload
+        self._commit_locks: Dict[str, threading.Lock] = {}
+
+    # ------------------------------------------------------------------ #
+    # Session lifecycle
+    # ------------------------------------------------------------------ #
+    def create(
+        self,
+        owner: str,
+        filename: str,
+        total_size: int,
+        patient_email: str,
+        therapist_email: str,
+        session_date: str,
+        notes: str = "",
+    ) -> UploadSession:
+        if total_size <= 0:
+            raise UploadSessionError("File is empty")
+        if total_size > self.max_size:
+            raise UploadSessionError(
+                f"File too large. Maximum size allowed: {self.max_size // (1024*1024)}MB"
+            )
+
+        now = time.time()
+        upload_id = str(uuid.uuid4())
+        session = UploadSession(
+            upload_id=upload_id,
+            owner=owner,
+            filename=filename,
+            # Own blob per session: committing one block list discards every
+            # other uncommitted block on the same blob
+            blob_name=unique_blob_name("recordings", filename, upload_id),
+            total_size=total_size,
+            chunk_size=self.chunk_size,
+            patient_email=patient_email,
+            therapist_email=therapist_email,
+            session_date=session_date,
+            notes=notes,
+            created_at=now,
+            expires_at=now + self.ttl,
+        )
+        self._save_manifest(session)
+        with self._lock:
+            self._purge_expired_locked(now)
+            self._sessions[session.upload_id] = session
+        print(f"📤 Upload session {session.upload_id} created for {filename} ({total_size} bytes)")
+        return session
+
+    def get(self, upload_id: str, owner: str) -> UploadSession:
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if session is None:
+            session = self._load(upload_id)
+        if session.expires_at < time.time() and session.job_id is None:
+            raise UploadSessionNotFound("Upload session expired")
+        if owner != "admin" and session.owner != owner:
+            # Same answer as a missing id: don't confirm someone else's upload exists
+            raise UploadSessionNotFound("Upload session not found")
+        return session
+
+    def _load(self, upload_id: str) -> UploadSession:
+        """Rebuild a session after a restart / on another replica."""
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise UploadSessionNotFound("Upload session not found")
+
+        data = read_json_blob(f"{MANIFEST_FOLDER}/{upload_id}.json")
+        if data is None:
+            raise UploadSessionNotFound("Upload session not found")
+        session = UploadSession(**data)
+        self._refresh_received(session)
+
+        with self._lock:
+            session = self._sessions.setdefault(upload_id, session)
+        return session
+
+    def _refresh_received(self, session: UploadSession) -> None:
+        """
+        Re-derive the stored chunks from the blob's uncommitted block list:
+        chunks may have gone to another replica since this one last looked.
+        """
+        if session.audio_url is not None:
+            return
+        prefix = session.upload_id[:12] + "-"
+        for block_id, size in list_uncommitted_blocks(session.blob_name):
+            if block_id.startswith(prefix):
+                session.received[int(block_id[len(prefix):])] = size
+
+    def _save_manifest(self, session: UploadSession) -> None:
+        upload_json_to_azure(
+            session.manifest(), f"{session.upload_id}.json", folder=MANIFEST_FOLDER
+        )
+
+    def _purge_expired_locked(self, now: float) -> None:
+        # Memory only - manifests are tiny and Azure drops stale uncommitted
+        # blocks on its own after 7 days
+        for upload_id in [u for u, s in self._sessions.items() if s.expires_at < now]:
+            self._sessions.pop(upload_id, None)
+            self._commit_locks.pop(upload_id, None)
+
+    # ------------------------------------------------------------------ #
+    # Chunks
+    # ------------------------------------------------------------------ #
+    def check_chunk(self, session: UploadSession, offset: int) -> int:
+        """Validate an offset before reading the body. Returns the expected chunk length."""
+        if session.audio_url is not None:
+            raise UploadSessionError("Upload already committed")
+        if offset < 0 or offset >= session.total_size or offset % session.chunk_size:
+            raise UploadSessionError(
+                f"Offset must be a multiple of {session.chunk_size} below {session.total_size}"
+            )
+        return session.expected_length(offset)
+
+    def put_chunk(self, session: UploadSession, offset: int, data: bytes) -> dict:
+        expected = self.check_chunk(session, offset)
+        if len(data) != expected:
+            raise UploadSessionError(
+                f"Chunk at offset {offset} must be exactly {expected} bytes, got {len(data)}"
+            )
+        # Same offset -> same block id, so a re-sent chunk simply replaces itself
+        stage_block(session.blob_name, session.block_id(offset), data)
+        session.received[offset] = len(data)
+        return session.progress()
+
+    # ------------------------------------------------------------------ #
+    # Commit
+    # ------------------------------------------------------------------ #
+    def commit(self, session: UploadSession, create_job) -> UploadSession:
+        """
+        Assemble the blob and enqueue processing via `create_job(session, audio_url)`.
+        Idempotent: a repeated commit returns the job created the first time.
+        """
+        with self._lock:
+            lock = self._commit_locks.setdefault(session.upload_id, threading.Lock())
+
+        with lock:
+            if session.job_id is not None:
+                return session
+
+            if session.audio_url is None:
+                self._refresh_received(session)
+                missing = session.missing_offsets()
+                if missing:
+                    raise UploadSessionError(
+                        f"Upload incomplete: {len(missing)} chunk(s) missing, first at offset {missing[0]}"
+                    )
+                offsets = sorted(session.received)
+                session.audio_url = commit_blocks(
+                    session.blob_name,
+                    [session.block_id(o) for o in offsets],
+                    "audio/wav",
+                )
+                self._save_manifest(session)
+                print(f"✅ Resumable upload {session.upload_id} committed: {session.audio_url}")
+
+            # May raise (e.g. queue full) - the blob stays committed and the
+            # client just retries the commit call
+            session.job_id = create_job(session, session.audio_url)
+            self._save_manifest(session)
+            return session
+
+
+# Global instance
+resumable_uploads = ResumableUploadService(
+    chunk_size=UPLOAD_BLOCK_SIZE,
+    max_size=UPLOAD_MAX_BYTES,
+    ttl=UPLOAD_SESSION_TTL,
+)
@@ -1,9 +1,10 @@
 # services/sql_service.py
 
 from datetime import datetime
-import pymssql
 import os
 
+from services.db_pool import pooled_connection
+
 # -------------------------------------------------------------------------
 # Load DB settings once from env or config
 # -------------------------------------------------------------------------
@@ -31,49 +32,102 @@ def _check_db_config():
 # -------------------------------------------------------------------------
 # DB Functions
 # -------------------------------------------------------------------------
-def update_session_analysis(session_id: int, analysis_blob_url: str) -> None:
+def update_session_analysis(
+    session_id: int,
+    analysis_blob_url: str,
+    positive_count: int | None = None,
+    negative_count: int | None = None,
+) -> None:
     _check_db_config()
-    conn = pymssql.connect(**DB_CONFIG)
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+
+        sql = """
+            UPDATE dbo.Sessions
+            SET analysis = %s, Timestamp = %s,
+                PositiveCount = %s, NegativeCount = %s
+            WHERE SessionID = %s;
+        """
+        cur.execute(sql, (
+            analysis_blob_url, datetime.utcnow(),
+            positive_count, negative_count, session_id,
+        ))
+        conn.commit()
+
+
+def update_session_sentiment_counts(session_id: int, positive_count: int, negative_count: int) -> None:
+    """Counters only (backfill) - leaves the analysis URL and Timestamp untouched."""
+    _check_db_config()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE dbo.Sessions SET PositiveCount = %s, NegativeCount = %s WHERE SessionID = %s",
+            (positive_count, negative_count, session_id),
+        )
+        conn.commit()
 
-    sql = """
-        UPDATE dbo.Sessions
-        SET analysis = %s, Timestamp = %s
-        WHERE SessionID = %s;
+
+def get_sentiment_trend(patient_email: str) -> list[dict] | None:
     """
-    cur.execute(sql, (analysis_blob_url, datetime.utcnow(), session_id))
-    conn.commit()
-    conn.close()
+    Every analyzed session of the patient (oldest first) with its stored
+    sentiment counters, in one query. None if the patient doesn't exist.
+    """
+    _check_db_config()
+    with pooled_connection() as conn:
+        cur = conn.cursor(as_dict=True)
+        cur.execute(
+            """
+            SELECT p.PatientID, s.SessionID, s.SessionDate,
+                   s.PositiveCount, s.NegativeCount
+            FROM dbo.Patients p
+            LEFT JOIN dbo.Sessions s
+                   ON s.PatientID = p.PatientID
+                  AND s.analysis LIKE 'http%%'
+            WHERE p.PatientEmail = %s
+            ORDER BY s.SessionDate, s.SessionID
+            """,
+            (patient_email,),
+        )
+        rows = cur.fetchall()
+
+    if not rows:
+        return None
+    return [r for r in rows if r["SessionID"] is not None]
 
 
 def get_transcript_url_by_SID(session_id: int) -> str | None:
     _check_db_config()
-    conn = pymssql.connect(**DB_CONFIG)
-    cur = conn.cursor()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT Transcript FROM dbo.Sessions WHERE SessionID = %s", (session_id,))
+        row = cur.fetchone()
 
-    cur.execute("SELECT Transcript FROM dbo.Sessions WHERE SessionID = %s", (session_id,))
-    row = cur.fetchone()
-    conn.close()
+    return row[0] if row else None
+
+def get_analysis_url_by_SID(session_id: int) -> str | None:
+    _check_db_config()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT analysis FROM dbo.Sessions WHERE SessionID = %s", (session_id,))
+        row = cur.fetchone()
 
     return row[0] if row else None
 
 def get_patient_id_by_email(email: str) -> int | None:
     _check_db_config()
-    conn = pymssql.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute("SELECT PatientID FROM dbo.Patients WHERE PatientEmail = %s", (email,))
-    row = cur.fetchone()
-    conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT PatientID FROM dbo.Patients WHERE PatientEmail = %s", (email,))
+        row = cur.fetchone()
     return row[0] if row else None
 
 
 def get_therapist_id_by_email(email: str) -> int | None:
     _check_db_config()
-    conn = pymssql.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM dbo.TherapistsLogin WHERE email = %s", (email,))
-    row = cur.fetchone()
-    conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM dbo.TherapistsLogin WHERE email = %s", (email,))
+        row = cur.fetchone()
     return row[0] if row else None
 
 
@@ -100,9 +154,6 @@ def save_session_to_db(
     if not patient_id or not therapist_id:
         raise ValueError("Invalid patient or therapist email")
     
-    conn = pymssql.connect(**DB_CONFIG)
-    cur = conn.cursor()
-
     sql = """
         INSERT INTO dbo.Sessions
             (PatientID, TherapistID, SessionDate,
@@ -110,17 +161,18 @@ def save_session_to_db(
         VALUES
             (%s, %s, %s, %s, %s, %s, %s);
     """
-    cur.execute(
-        sql,
-        (
-            patient_id,  # PatientID placeholder
-            therapist_id,  # TherapistID placeholder
-            session_date,
-            notes,
-            blob_url,
-            transcript_url,
-            datetime.utcnow(),
-        ),
-    )
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            sql,
+            (
+                patient_id,  # PatientID placeholder
+                therapist_id,  # TherapistID placeholder
+                session_date,
+                notes,
+                blob_url,
+                transcript_url,
+                datetime.utcnow(),
+            ),
+        )
+        conn.commit()
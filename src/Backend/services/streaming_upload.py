@@ -0,0 +1,212 @@
+# services/streaming_upload.py
+"""
+Streaming multipart ingest straight into Azure block blobs
+----------------------------------------------------------
+
+* The request body is parsed chunk by chunk as it arrives (`request.stream()`),
+  so the WAV is never held in memory or written to a local temp file.
+* File bytes are cut into UPLOAD_BLOCK_SIZE blocks and staged with
+  put-block; at most one block (+ one network chunk) is buffered per upload.
+* The size limit is enforced on the bytes actually received - a lying or
+  missing Content-Length cannot get past it.
+* Nothing becomes visible in the container until `commit()` (put-block-list),
+  so a rejected / aborted upload leaves no blob behind (Azure garbage-collects
+  uncommitted blocks after 7 days).
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from config import UPLOAD_MAX_BYTES, UPLOAD_BLOCK_SIZE
+from services.blob_service import stage_block, commit_blocks, unique_blob_name
+from services.blocking import io_calls
+
+MAX_FIELD_BYTES = 64 * 1024        # plain form fields (emails, notes, date)
+MULTIPART_OVERHEAD = 64 * 1024     # boundaries + part headers + small fields
+
+
+class UploadTooLarge(Exception):
+    """The uploaded file exceeds the configured maximum size."""
+
+
+class UploadFormError(Exception):
+    """The request is not a usable multipart form (missing file, bad body...)."""
+
+
+class StreamedUpload:
+    """A file that has been staged as blocks but not yet committed."""
+
+    def __init__(self, filename: str, folder: str):
+        self.filename = filename
+        self._nonce = uuid.uuid4().hex[:12]
+        # The nonce is part of the blob name, so two uploads of the same
+        # filename stage into (and commit) different blobs: a put-block-list
+        # replaces the whole blob and discards every other uncommitted block
+        self.blob_name = unique_blob_name(folder, filename, self._nonce)
+        self.fields: Dict[str, str] = {}
+        self.size = 0
+        self.block_ids: List[str] = []
+
+    async def stage(self, data: bytes) -> None:
+        block_id = f"{self._nonce}-{len(self.block_ids):06d}"
+        await io_calls.run(stage_block, self.blob_name, block_id, data)
+        self.block_ids.append(block_id)
+        self.size += len(data)
+
+    async def commit(self, content_type: str = "audio/wav") -> str:
+        """Make the blob visible. Returns its HTTPS URL."""
+        return await io_calls.run(
+            commit_blocks, self.blob_name, self.block_ids, content_type
+        )
+
+
+class _FormCollector:
+    """python-multipart callbacks: small fields to a dict, file bytes to a buffer."""
+
+    def __init__(self, file_field: str, max_size: int):
+        self.file_field = file_field
+        self.max_size = max_size
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.file_buf = bytearray()
+        self.file_bytes = 0
+        self.finished = False
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._part_name: Optional[str] = None
+        self._in_file = False
+        self._field_buf = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_end": self._on_end,
+        }
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._part_name = None
+        self._in_file = False
+        self._field_buf = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        self._part_name = name
+
+        if name == self.file_field and filename is not None:
+            if self.filename is not None:
+                raise UploadFormError("Only one file may be uploaded per request")
+            self.filename = os.path.basename(filename.decode("utf-8", "replace"))
+            if not self.filename:
+                raise UploadFormError("File has no filename")
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.file_bytes += end - start
+            if self.file_bytes > self.max_size:
+                raise UploadTooLarge(
+                    f"File too large. Maximum size allowed: {self.max_size // (1024*1024)}MB"
+                )
+            self.file_buf += data[start:end]
+        elif self._part_name is not None:
+            self._field_buf += data[start:end]
+            if len(self._field_buf) > MAX_FIELD_BYTES:
+                raise UploadFormError(f"Form field '{self._part_name}' is too large")
+
+    def _on_part_end(self) -> None:
+        if not self._in_file and self._part_name:
+            self.fields[self._part_name] = self._field_buf.decode("utf-8", "replace")
+        self._in_file = False
+        self._part_name = None
+
+    def _on_end(self) -> None:
+        self.finished = True
+
+
+async def receive_upload(
+    request: Request,
+    folder: str,
+    file_field: str = "file",
+    filename_for: Optional[Callable[[str], str]] = None,
+    max_size: int = UPLOAD_MAX_BYTES,
+    block_size: int = UPLOAD_BLOCK_SIZE,
+) -> StreamedUpload:
+    """
+    Stream a multipart/form-data request into staged blocks of `<folder>/<filename>`.
+    `filename_for` may rename the client's filename (e.g. force a .wav suffix).
+    Returns the (uncommitted) upload together with the plain form fields.
+    """
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise UploadFormError("Expected a multipart/form-data body")
+
+    # Cheap early rejection; the real limit is enforced while streaming
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_size + MULTIPART_OVERHEAD:
+            raise UploadTooLarge(
+                f"File too large. Maximum size allowed: {max_size // (1024*1024)}MB"
+            )
+
+    form = _FormCollector(file_field, max_size)
+    parser = MultipartParser(boundary, form.callbacks())
+    upload: Optional[StreamedUpload] = None
+
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        parser.write(chunk)
+
+        if upload is None and form.filename is not None:
+            filename = filename_for(form.filename) if filename_for else form.filename
+            upload = StreamedUpload(filename, folder)
+
+        # Stage full blocks as they fill; awaiting here also stops us reading
+        # the socket, so a slow Blob upload pushes back on the client
+        while upload is not None and len(form.file_buf) >= block_size:
+            block = bytes(form.file_buf[:block_size])
+            del form.file_buf[:block_size]
+            await upload.stage(block)
+
+    parser.finalize()
+    if not form.finished:
+        raise UploadFormError("Incomplete multipart body")
+    if upload is None:
+        raise UploadFormError("No file provided")
+    if form.file_buf:
+        await upload.stage(bytes(form.file_buf))
+        form.file_buf.clear()
+    if upload.size == 0:
+        raise UploadFormError("File is empty")
+
+    upload.fields = form.fields
+    return upload
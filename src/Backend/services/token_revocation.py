@@ -0,0 +1,215 @@
+# services/token_revocation.py
+"""
+Revoked-token list (by jti) checked on every request without I/O
+----------------------------------------------------------------
+
+* A Bloom filter answers "definitely not revoked" for almost every token
+  in a few hash operations; only a filter hit looks at the exact set.
+* The exact set maps jti -> token expiry. Once a token has expired it is
+  rejected by its `exp` anyway, so expired entries are dropped on reload.
+* Revocations are written to dbo.RevokedTokens first, loaded at startup,
+  and synced incrementally every REVOCATION_SYNC_SECONDS so a logout on
+  one replica reaches the others.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import pymssql
+
+from config import (
+    REVOCATION_BLOOM_CAPACITY,
+    REVOCATION_BLOOM_ERROR_RATE,
+    REVOCATION_SYNC_SECONDS,
+)
+from services.db_pool import pooled_connection
+
+FULL_RELOAD_SECONDS = 3600      # rebuild (and compact) the filter hourly
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked: Dict[str, float] = {}        # jti -> exp (epoch seconds)
+        self._synced_until: Optional[datetime] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ #
+    # Hot path
+    # ------------------------------------------------------------------ #
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._bloom:
+            return False
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+    def revoke(self, jti: str, expires_at: float, reason: str = "logout") -> bool:
+        """
+        Persist first, so a revocation is never only in one process' memory.
+        Returns False if the jti was already revoked: Jti is the primary key,
+        so of two concurrent calls (on any replica) exactly one returns True.
+        """
+        try:
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    INSERT INTO dbo.RevokedTokens (Jti, ExpiresAt, RevokedAt, Reason)
+                    VALUES (%s, %s, GETUTCDATE(), %s)
+                    """,
+                    (jti, datetime.utcfromtimestamp(expires_at), reason),
+                )
+                conn.commit()
+            revoked = True
+        except pymssql.IntegrityError:
+            revoked = False
+        self._add_many([(jti, expires_at)])
+        return revoked
+
+    def _add_many(self, entries: Iterable[Tuple[str, float]]) -> None:
+        with self._lock:
+            for jti, exp in entries:
+                if jti in self._revoked:
+                    continue
+                self._revoked[jti] = exp
+                self._bloom.add(jti)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild_locked()
+
+    def _rebuild_locked(self) -> None:
+        now = time.time()
+        live = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        bloom = BloomFilter(max(self.capacity, len(live) * 2), self.error_rate)
+        for jti in live:
+            bloom.add(jti)
+        self._revoked, self._bloom = live, bloom
+
+    # ------------------------------------------------------------------ #
+    # Loading / syncing
+    # ------------------------------------------------------------------ #
+    def load(self) -> None:
+        """Full reload of live revocations; also deletes long-expired rows."""
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "DELETE FROM dbo.RevokedTokens WHERE ExpiresAt < DATEADD(day, -1, GETUTCDATE())"
+            )
+            conn.commit()
+            cur.execute(
+                "SELECT Jti, ExpiresAt, GETUTCDATE() FROM dbo.RevokedTokens WHERE ExpiresAt > GETUTCDATE()"
+            )
+            rows = cur.fetchall()
+
+        # Build aside and swap, so lookups never see a half-filled list
+        revoked = {jti: _epoch(exp) for jti, exp, _ in rows}
+        bloom = BloomFilter(max(self.capacity, len(revoked) * 2), self.error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+        with self._lock:
+            self._revoked, self._bloom = revoked, bloom
+            self._synced_until = rows[0][2] if rows else datetime.utcnow()
+        print(f"🔒 Loaded {len(rows)} revoked token(s)")
+
+    def sync(self) -> None:
+        """Pick up revocations written since the last sync (e.g. by other replicas)."""
+        if self._synced_until is None:
+            self.load()
+            return
+        # Small overlap: rows committed late with an earlier RevokedAt
+        since = self._synced_until - timedelta(seconds=5)
+        with pooled_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT Jti, ExpiresAt, GETUTCDATE() FROM dbo.RevokedTokens WHERE RevokedAt >= %s",
+                (since,),
+            )
+            rows = cur.fetchall()
+        if rows:
+            self._synced_until = rows[0][2]
+            self._add_many((jti, _epoch(exp)) for jti, exp, _ in rows)
+
+    def start(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"⚠️ Could not load revoked tokens: {e}")
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._sync_loop, name="token-revocation-sync", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _sync_loop(self) -> None:
+        last_full = time.monotonic()
+        while not self._stop_event.wait(self.sync_seconds):
+            try:
+                if time.monotonic() - last_full > FULL_RELOAD_SECONDS:
+                    self.load()
+                    last_full = time.monotonic()
+                else:
+                    self.sync()
+            except Exception as e:
+                print(f"⚠️ Revoked token sync failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "revoked": len(self._revoked),
+                "bloom_bits": self._bloom.size,
+                "bloom_hashes": self._bloom.hashes,
+                "synced_until": self._synced_until.isoformat() if self._synced_until else None,
+            }
+
+
+def _epoch(value: datetime) -> float:
+    # DATETIME columns come back naive, in UTC
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+# Global instance
+revocation_list = RevocationList(
+    capacity=REVOCATION_BLOOM_CAPACITY,
+    error_rate=REVOCATION_BLOOM_ERROR_RATE,
+    sync_seconds=REVOCATION_SYNC_SECONDS,
+)
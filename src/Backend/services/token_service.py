@@ -1,13 +1,21 @@
-from datetime import datetime
-from fastapi import HTTPException, Depends, Security, Request
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fastapi import HTTPException, Depends, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from database import get_db
+from database import SessionLocal
 from models.TherapistLogin import TherapistLogin
-from config import SECRET_KEY
+from config import (
+    SECRET_KEY,
+    AUTH_PRINCIPAL_CACHE_TTL,
+    AUTH_PRINCIPAL_CACHE_SIZE,
+    ACCESS_TOKEN_TTL,
+    REFRESH_TOKEN_TTL,
+)
+from services.token_revocation import revocation_list
 
 # Basic config
 ALGORITHM = "HS256"
@@ -17,29 +25,136 @@ bearer_scheme = HTTPBearer()
 # TOKEN CREATION / DECODING
 # ==========================
 
-def create_access_token(user_id: int | str, role: str) -> str:
-    """
-    Create a signed JWT token without expiration (session-style).
-    You may later add exp if needed.
-    """
-    #expire = datetime.utcnow()+timedelta(hours=4)
+def _encode(user_id: int | str, role: str, token_type: str, ttl: int, **claims) -> str:
+    now = int(time.time())
     payload = {
         "sub": str(user_id),
         "role": role,
-        "iat": datetime.utcnow().timestamp()
-        #"exp": expire
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + ttl,
+        **claims,
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def decode_access_token(token: str) -> dict:
+def create_access_token(user_id: int | str, role: str, refresh_jti: str | None = None) -> str:
+    """
+    Short-lived access token (ACCESS_TOKEN_TTL). `rjti` links it to the
+    refresh token it was issued with, so logout can revoke both.
+    """
+    claims = {"rjti": refresh_jti} if refresh_jti else {}
+    return _encode(user_id, role, "access", ACCESS_TOKEN_TTL, **claims)
+
+
+def create_refresh_token(user_id: int | str, role: str) -> str:
+    return _encode(user_id, role, "refresh", REFRESH_TOKEN_TTL)
+
+
+def issue_token_pair(user_id: int | str, role: str) -> dict:
+    refresh_token = create_refresh_token(user_id, role)
+    refresh_jti = jwt.decode(refresh_token, options={"verify_signature": False})["jti"]
+    return {
+        "access_token": create_access_token(user_id, role, refresh_jti=refresh_jti),
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_TTL,
+    }
+
+
+def _decode(token: str, token_type: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM],
+            options={"require": ["exp", "jti", "sub"]},
+        )
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != token_type:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+def decode_access_token(token: str) -> dict:
+    return _decode(token, "access")
+
 
+def decode_refresh_token(token: str) -> dict:
+    return _decode(token, "refresh")
+
+
+
+# ==========================
+# VERIFIED-PRINCIPAL CACHE
+# ==========================
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of therapists already checked against the DB (exists and
+    is_approved), keyed by the token's `sub`. Only positive results are kept.
+    Changes to a therapist must call invalidate(); on other replicas the
+    entry lives at most `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sub: str) -> dict | None:
+        with self._lock:
+            item = self._entries.get(sub)
+            if item is None:
+                return None
+            expires_at, principal = item
+            if expires_at < time.monotonic():
+                del self._entries[sub]
+                return None
+            self._entries.move_to_end(sub)
+            return principal
+
+    def put(self, sub: str, principal: dict) -> None:
+        with self._lock:
+            self._entries[sub] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(sub)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sub: int | str) -> None:
+        with self._lock:
+            self._entries.pop(str(sub), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instance
+principal_cache = PrincipalCache(ttl=AUTH_PRINCIPAL_CACHE_TTL, max_entries=AUTH_PRINCIPAL_CACHE_SIZE)
+
+
+def _load_therapist_principal(user_id: str) -> dict | None:
+    db = SessionLocal()
+    try:
+        therapist = db.query(TherapistLogin).filter(TherapistLogin.id == int(user_id)).first()
+        if not therapist or not therapist.is_approved:
+            return None
+        return {"id": therapist.id, "role": "therapist", "email": therapist.email}
+    finally:
+        db.close()
+
+
+def resolve_therapist_principal(user_id: str) -> dict | None:
+    """Approved therapist principal, from the cache or (on a miss) the DB."""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = _load_therapist_principal(user_id)
+        if principal is not None:
+            principal_cache.put(user_id, principal)
+    return principal
 
 
 # ==========================
@@ -48,25 +163,28 @@ def decode_access_token(token: str) -> dict:
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Security(bearer_scheme),
-    db: Session = Depends(get_db)
 ):
     """
     Validates a Bearer token and returns either an admin identity or a therapist object.
+    Revocation is an in-memory check; the DB is only consulted when the
+    therapist isn't in the principal cache.
     """
     try:
         payload = decode_access_token(credentials.credentials)
-        user_id = payload.get("sub")
+        if revocation_list.is_revoked(payload["jti"]):
+            raise HTTPException(status_code=401, detail="Token revoked")
+        user_id = str(payload.get("sub"))
         role = payload.get("role")
 
         if role == "admin":
             return {"id": "admin", "role": "admin"}
 
-        therapist = db.query(TherapistLogin).filter(TherapistLogin.id == int(user_id)).first()
-
-        if not therapist or not therapist.is_approved:
+        principal = resolve_therapist_principal(user_id)
+        if principal is None:
             raise HTTPException(status_code=401, detail="User not found or not approved")
 
-        return {"id": therapist.id, "role": "therapist"}
+        # Copy: callers must not be able to modify the cached entry
+        return dict(principal)
 
     except Exception:
         raise HTTPException(status_code=401, detail="Unauthorized")
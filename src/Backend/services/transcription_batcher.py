@@ -0,0 +1,106 @@
+# services/transcription_batcher.py
+"""
+Groups queued recordings into multi-file Azure Speech jobs
+----------------------------------------------------------
+
+Instead of one Speech job (and one polling loop) per upload, recordings
+submitted within SPEECH_BATCH_WINDOW seconds are sent together as one job
+with many `contentUrls` (up to SPEECH_BATCH_MAX_SIZE, per locale).
+Each caller gets its own Future that resolves to `(lines, transcript_url)`
+for *its* recording, or to that recording's individual error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    SPEECH_BATCH_WINDOW,
+    SPEECH_BATCH_MAX_SIZE,
+    PROCESSING_TRANSCRIPTION_CONCURRENCY,
+)
+from services.azure_transcription import transcribe_many, run_on_speech_loop, source_key
+
+
+class TranscriptionBatcher:
+    def __init__(self, window: float, max_size: int, max_inflight: int):
+        self.window = window
+        self.max_size = max(1, max_size)
+        self.max_inflight = max(1, max_inflight)
+        # Everything below is only touched on the speech loop
+        self._pending: Dict[str, List[Tuple[str, Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._inflight: Optional[asyncio.Semaphore] = None
+
+    def submit(self, sas_url: str, locale: str = "he-IL") -> Future:
+        """Thread-safe. Returns a Future resolving to (lines, transcript_url)."""
+        result: Future = Future()
+        run_on_speech_loop(self._enqueue(sas_url, locale, result))
+        return result
+
+    def transcribe(self, sas_url: str, locale: str = "he-IL") -> Tuple[List[str], str]:
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(sas_url, locale).result()
+
+    async def _enqueue(self, sas_url: str, locale: str, result: Future) -> None:
+        batch = self._pending.setdefault(locale, [])
+        batch.append((sas_url, result))
+        if len(batch) >= self.max_size:
+            self._flush(locale)
+        elif locale not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[locale] = loop.call_later(self.window, self._flush, locale)
+
+    def _flush(self, locale: str) -> None:
+        timer = self._timers.pop(locale, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(locale, [])
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(locale, batch))
+
+    async def _run(self, locale: str, batch: List[Tuple[str, Future]]) -> None:
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(self.max_inflight)
+
+        # The same recording may be queued twice (e.g. retry), each time with
+        # a fresh SAS token: transcribe it once per blob and share the outcome
+        by_blob: Dict[str, str] = {}
+        for url, _ in batch:
+            by_blob.setdefault(source_key(url), url)
+        urls = list(by_blob.values())
+
+        try:
+            async with self._inflight:
+                print(f"📦 Submitting batch of {len(urls)} recording(s) [{locale}]")
+                try:
+                    outcomes = await transcribe_many(urls, locale)
+                except Exception as e:
+                    outcomes = {url: e for url in urls}
+
+            for url, result in batch:
+                if result.done():
+                    continue
+                outcome = outcomes.get(by_blob[source_key(url)])
+                if isinstance(outcome, Exception):
+                    result.set_exception(outcome)
+                elif outcome is None:
+                    result.set_exception(RuntimeError("Recording missing from batch result"))
+                else:
+                    result.set_result(outcome)
+        finally:
+            # Cancelled (e.g. speech loop shutting down): a worker is blocked
+            # on each of these futures, so none may be left unresolved
+            for _, result in batch:
+                if not result.done():
+                    result.set_exception(RuntimeError("Transcription batch was cancelled"))
+
+
+# Global instance
+transcription_batcher = TranscriptionBatcher(
+    window=SPEECH_BATCH_WINDOW,
+    max_size=SPEECH_BATCH_MAX_SIZE,
+    max_inflight=PROCESSING_TRANSCRIPTION_CONCURRENCY,
+)
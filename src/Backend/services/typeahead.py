@@ -0,0 +1,135 @@
+# services/typeahead.py
+"""
+Per-therapist cache of recent autocomplete results
+--------------------------------------------------
+
+Typing "d", "da", "dan" sends three requests. Each result set is cached
+for TYPEAHEAD_CACHE_TTL seconds under the therapist who asked; when the
+cached set for "da" was complete (fewer than TYPEAHEAD_CANDIDATES matches),
+"dan" is answered by filtering that set in memory - every "dan" match is
+also a "da" match - instead of searching the index again.
+
+Entries are tied to the index version, so an added / reloaded patient
+invalidates them (and the ETag) immediately.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config import (
+    TYPEAHEAD_CACHE_TTL,
+    TYPEAHEAD_CANDIDATES,
+    TYPEAHEAD_CACHE_ENTRIES,
+    TYPEAHEAD_CACHE_USERS,
+)
+from services.patient_search import patient_search, normalize
+
+
+class _CachedResult:
+    __slots__ = ("version", "ids", "complete", "expires_at")
+
+    def __init__(self, version: int, ids: List[int], complete: bool, expires_at: float):
+        self.version = version
+        self.ids = ids
+        self.complete = complete
+        self.expires_at = expires_at
+
+
+class TypeaheadService:
+    def __init__(self, ttl: float, candidates: int, entries_per_user: int, max_users: int):
+        self.ttl = ttl
+        self.candidates = candidates
+        self.entries_per_user = entries_per_user
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        # user -> (field, normalized query) -> result, both levels LRU
+        self._cache: "OrderedDict[str, OrderedDict[Tuple[str, str], _CachedResult]]" = OrderedDict()
+        self.stats = {"hits": 0, "narrowed": 0, "misses": 0}
+
+    def etag(self, field: str, query: str, limit: int) -> str:
+        """Changes whenever the answer could: index version, query, limit."""
+        index = patient_search.index
+        return f'W/"{index.version}-{field}-{limit}-{zlib.crc32(normalize(query).encode()):x}"'
+
+    def search(self, user: str, field: str, query: str, limit: int) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        q = normalize(query)
+        if not q:
+            return []
+        by_email = field == "email"
+        index = patient_search.index
+        version = index.version
+        now = time.time()
+
+        cached = self._lookup(user, field, q, version, now)
+        if cached is not None:
+            hit_query, hit = cached
+            if hit_query == q:
+                self.stats["hits"] += 1
+                ids = hit.ids
+            else:
+                # Narrow the shorter query's complete set; stable sort keeps
+                # its order within each rank tier
+                self.stats["narrowed"] += 1
+                tiers = ((index.match_tier(pid, q, by_email), pid) for pid in hit.ids)
+                ids = [pid for tier, pid in sorted(
+                    (t for t in tiers if t[0] is not None), key=lambda t: t[0]
+                )]
+                self._store(user, field, q, _CachedResult(version, ids, True, now + self.ttl))
+        else:
+            self.stats["misses"] += 1
+            found = (patient_search.search_emails if by_email else patient_search.search_names)(
+                q, self.candidates + 1
+            )
+            complete = len(found) <= self.candidates
+            ids = found[: self.candidates]
+            self._store(user, field, q, _CachedResult(version, ids, complete, now + self.ttl))
+
+        return index.display(ids[:limit])
+
+    def _lookup(self, user: str, field: str, q: str, version: int, now: float):
+        """Exact entry, else the longest complete entry whose query is a prefix of q."""
+        with self._lock:
+            entries = self._cache.get(user)
+            if entries is None:
+                return None
+            self._cache.move_to_end(user)
+            best = None
+            for (f, cached_q), result in list(entries.items()):
+                if result.expires_at < now or result.version != version:
+                    del entries[(f, cached_q)]
+                    continue
+                if f != field or not q.startswith(cached_q):
+                    continue
+                if cached_q == q:
+                    entries.move_to_end((f, cached_q))
+                    return cached_q, result
+                if result.complete and (best is None or len(cached_q) > len(best[0])):
+                    best = (cached_q, result)
+            return best
+
+    def _store(self, user: str, field: str, q: str, result: _CachedResult) -> None:
+        with self._lock:
+            entries = self._cache.get(user)
+            if entries is None:
+                entries = self._cache[user] = OrderedDict()
+            self._cache.move_to_end(user)
+            entries[(field, q)] = result
+            entries.move_to_end((field, q))
+            while len(entries) > self.entries_per_user:
+                entries.popitem(last=False)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+
+
+# Global instance
+typeahead = TypeaheadService(
+    ttl=TYPEAHEAD_CACHE_TTL,
+    candidates=TYPEAHEAD_CANDIDATES,
+    entries_per_user=TYPEAHEAD_CACHE_ENTRIES,
+    max_users=TYPEAHEAD_CACHE_USERS,
+)
@@ -0,0 +1,51 @@
+"""
+Send a few messages through services/email_queue.py and check they arrive.
+
+Starts an in-process aiosmtpd stub unless SMTP_SERVER already points at
+one (pip install aiosmtpd). Run from src/Backend:
+
+    python test_email_queue.py
+"""
+
+import os
+import time
+
+os.environ.setdefault("SMTP_SERVER", "localhost")
+os.environ.setdefault("SMTP_PORT", "8025")
+os.environ.setdefault("SMTP_USE_TLS", "false")
+os.environ.setdefault("SMTP_FROM_EMAIL", "noreply@therapyai.local")
+
+received = []
+
+try:
+    from aiosmtpd.controller import Controller
+
+    class _Collect:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope)
+            return "250 OK"
+
+    controller = Controller(_Collect(), hostname=os.environ["SMTP_SERVER"], port=int(os.environ["SMTP_PORT"]))
+    controller.start()
+except ImportError:
+    controller = None
+    print("ℹ️ aiosmtpd not installed - using the SMTP server from the environment")
+
+from services.email_queue import email_queue
+
+COUNT = 5
+started = time.perf_counter()
+for i in range(COUNT):
+    email_queue.enqueue(f"therapist{i}@example.com", "Password Reset Request", f"code {i}")
+print(f"📨 Enqueued {COUNT} emails in {(time.perf_counter() - started) * 1000:.2f} ms")
+
+deadline = time.time() + 15
+while email_queue.pending() and time.time() < deadline:
+    time.sleep(0.1)
+email_queue.stop()
+
+print("📊", email_queue.snapshot())
+if controller is not None:
+    controller.stop()
+    ok = len(received) == COUNT
+    print(("✅" if ok else "❌") + f" Stub received {len(received)}/{COUNT} messages")
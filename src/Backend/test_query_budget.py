@@ -0,0 +1,66 @@
+"""
+Call the patient dashboard endpoints with QUERY_BUDGET_STRICT=1 and check
+each one stays within its SQL statement budget (services/query_budget.py).
+
+Needs the database from .env and a patient that has sessions. Run from
+src/Backend:
+
+    python test_query_budget.py patient@example.com
+"""
+
+import os
+import sys
+
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.query_budget import QueryBudgetExceeded, report
+from services.token_service import get_current_user
+
+patient_email = sys.argv[1] if len(sys.argv) > 1 else os.getenv("TEST_PATIENT_EMAIL", "")
+if not patient_email:
+    sys.exit("Usage: python test_query_budget.py <patient_email>")
+
+# Skip login: the budget is about the handler's queries, not the JWT
+app.dependency_overrides[get_current_user] = lambda: {"id": "admin", "role": "admin"}
+client = TestClient(app)     # no `with`: don't start the background workers
+
+calls = [
+    ("/patientsdb/dashboard-data", {"patient_email": patient_email}),
+    ("/patientsdb/all-sessions", {"patient_email": patient_email}),
+    ("/patientsdb/sessions", {"patient_email": patient_email, "limit": 5}),
+]
+
+failed = 0
+for path, params in calls:
+    try:
+        response = client.get(path, params=params)
+    except QueryBudgetExceeded as exc:
+        print(f"❌ {path}: {exc}")     # counted in the report below
+        continue
+    if response.status_code != 200:
+        failed += 1
+        print(f"❌ {path}: HTTP {response.status_code} {response.text[:200]}")
+        continue
+    print(f"✅ {path}: HTTP 200")
+
+    # Second page of the keyset pagination must cost the same
+    if path.endswith("/sessions") and response.json().get("next_cursor"):
+        try:
+            page = client.get(path, params={**params, "cursor": response.json()["next_cursor"]})
+            print(f"✅ {path} (page 2): HTTP {page.status_code}")
+        except QueryBudgetExceeded as exc:
+            print(f"❌ {path} (page 2): {exc}")
+
+print("\n📊 Statements per endpoint:")
+for name, s in report().items():
+    ok = s["max_statements"] <= s["budget"]
+    print(f"  {'✅' if ok else '❌'} {name:35} max {s['max_statements']} / budget {s['budget']} ({s['calls']} calls)")
+    if not ok:
+        failed += 1
+
+if failed:
+    sys.exit(f"\n❌ {failed} budget check(s) failed")
+print("\n🎉 All endpoints within their query budget")
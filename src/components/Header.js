@@ -1,7 +1,8 @@
 import React, { useState, useEffect, useRef } from "react";
-import { Link, useNavigate } from "react-router-dom";
+import { Link } from "react-router-dom";
 import "./Header.css";
 import { useTranslation } from "react-i18next";
+import tokenService from "../services/tokenService";
 
 const LanguageSwitcher = () => {
   const { i18n } = useTranslation();
@@ -39,7 +40,6 @@ const LanguageSwitcher = () => {
 
 const Header = () => {
   const { t } = useTranslation("header");
-  const navigate = useNavigate();
   const isAuthenticated = !!localStorage.getItem("access_token");
   const therapistName = localStorage.getItem("therapist_name");
   const isAdmin = therapistName === "Admin";
@@ -57,10 +57,8 @@ const Header = () => {
   };
 
   const handleLogout = () => {
-    localStorage.removeItem("access_token");
-    localStorage.removeItem("therapist_id");
-    localStorage.removeItem("therapist_name");
-    navigate("/login");
+    // Revokes the tokens server-side, clears storage and goes to /login
+    tokenService.logout();
   };
 
   useEffect(() => {
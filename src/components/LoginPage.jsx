@@ -4,6 +4,7 @@ import { useNavigate, Link } from "react-router-dom";
 import "./LoginPage.css";
 import { useTranslation } from "react-i18next";
 import { LanguageSwitcher } from "./Header";
+import tokenService from "../services/tokenService";
 
 const LoginPage = () => {
   const { t } = useTranslation("login");
@@ -71,13 +72,10 @@ const LoginPage = () => {
       }
 
       const data = await res.json();
-      const { therapist_id, access_token, full_name } = data;
+      const { therapist_id, access_token, refresh_token, full_name } = data;
 
-
-      localStorage.setItem("access_token", access_token);
-      localStorage.setItem("therapist_id", therapist_id);
-      localStorage.setItem("therapist_name", full_name);
-      localStorage.setItem("therapist_email", email); // Save therapist email
+      // Access token is short-lived; tokenService renews it with the refresh token
+      tokenService.setTokens(access_token, refresh_token, therapist_id, full_name, email);
 
       setTherapistName(full_name);
       setSuccess(therapist_id === -1 ? "Admin Login successful!" : "Login successful!");
@@ -73,28 +73,44 @@ const PatientDashboard = () => {
   const [viewMode, setViewMode] = useState(""); // "" | "single" | "progress"
 
 
+  // Debounced typeahead; a newer keystroke aborts the request still in flight
   useEffect(() => {
-    if (inputName.trim().length === 0) {
+    const query = inputName.trim();
+    if (query.length === 0) {
       setSuggestions([]);
+      setIsLoadingSuggestions(false);
       return;
     }
-    setIsLoadingSuggestions(true);
-    const token = localStorage.getItem("access_token");
-    fetch(
-      `http://localhost:8000/patientsdb/search-patients?name=${encodeURIComponent(inputName)}`,
-      {
-        headers: { Authorization: `Bearer ${token}` },
-      }
-    )
-      .then((res) => res.json())
-      .then((data) => {
-        setSuggestions(data);
-        setIsLoadingSuggestions(false);
-      })
-      .catch(() => {
-        setSuggestions([]);
-        setIsLoadingSuggestions(false);
-      });
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      setIsLoadingSuggestions(true);
+      const token = localStorage.getItem("access_token");
+      fetch(
+        `http://localhost:8000/patientsdb/typeahead?field=name&q=${encodeURIComponent(query)}`,
+        {
+          headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal,
+        }
+      )
+        .then((res) => {
+          if (!res.ok) throw new Error("Search failed");
+          return res.json();
+        })
+        .then((data) => {
+          setSuggestions(data);
+          setIsLoadingSuggestions(false);
+        })
+        .catch((err) => {
+          if (err.name === "AbortError") return;
+          setSuggestions([]);
+          setIsLoadingSuggestions(false);
+        });
+    }, 250);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
   }, [inputName]);
 
   const fetchPatientData = async (email, sessionId = null) => {
@@ -139,7 +155,7 @@ const PatientDashboard = () => {
         (s) => s.IsAnalyzed === true || s.is_analyzed === true
       );
       if (analyzedSessions.length > 0) {
-        fetchSessionRatios(analyzedSessions);
+        fetchSessionRatios(email);
       } else {
         setSessionRatios([]);
       }
@@ -150,43 +166,27 @@ const PatientDashboard = () => {
     }
   };
 
-const fetchSessionRatios = async (sessions) => {
+// One request for the whole trend (ratios are computed server-side from stored counters)
+const fetchSessionRatios = async (email) => {
   const token = localStorage.getItem("access_token");
 
-  const results = await Promise.all(
-    sessions.map(async (session) => {
-      try {
-        const res = await fetch(
-          `http://localhost:8000/sentiment/get-analysis-from-url/?url=${encodeURIComponent(session.SessionAnalysis)}`,
-          { headers: { Authorization: `Bearer ${token}` } }
-        );
-        if (!res.ok) return null;
-
-        const data = await res.json();
-        const sentiment = data.sentiment || data;
-
-        return {
-          sessionDate: session.SessionDate || session.session_date,
-          ratio:
-            sentiment && sentiment.total_negative > 0
-              ? Number(
-                  (
-                    sentiment.total_positive / sentiment.total_negative
-                  ).toFixed(2)
-                )
-              : null,
-        };
-      } catch {
-        return null;
-      }
-    })
-  );
+  try {
+    const res = await fetch(
+      `http://localhost:8000/sentiment/trend/?patient_email=${encodeURIComponent(email)}`,
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+    if (!res.ok) throw new Error("Failed to fetch sentiment trend");
+    const data = await res.json();
 
-  const sortedResults = results
-    .filter((r) => r && r.ratio !== null && r.sessionDate)
-    .sort((a, b) => new Date(a.sessionDate) - new Date(b.sessionDate));
+    const sortedResults = data.sessions
+      .filter((s) => s.ratio !== null && s.session_date)
+      .map((s) => ({ sessionDate: s.session_date, ratio: s.ratio }))
+      .sort((a, b) => new Date(a.sessionDate) - new Date(b.sessionDate));
 
-  setSessionRatios(sortedResults);
+    setSessionRatios(sortedResults);
+  } catch {
+    setSessionRatios([]);
+  }
 };
 
 
@@ -7,42 +7,95 @@ const ProcessingStatus = ({ jobId, onClose }) => {
   const [status, setStatus] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [retryRound, setRetryRound] = useState(0);
 
   useEffect(() => {
     if (!jobId) return;
 
-    const fetchStatus = async () => {
-      try {
-        const response = await fetch(`http://127.0.0.1:8000/audio-async/upload-status/${jobId}`, {
-          headers: { Authorization: `Bearer ${localStorage.getItem("access_token")}` },
-        });
+    // Status is pushed by the server: an SSE stream read with fetch (so the
+    // Authorization header can be sent), or long-polling if streaming fails.
+    const controller = new AbortController();
+    const statusUrl = `http://127.0.0.1:8000/audio-async/upload-status/${jobId}`;
+    const authHeaders = () => ({ Authorization: `Bearer ${localStorage.getItem("access_token")}` });
+    const isDone = (data) => data?.status === 'completed' || data?.status === 'failed';
 
-        if (response.ok) {
-          const data = await response.json();
-          setStatus(data);
-          setError(null);
-        } else {
-          setError(t("failed_to_fetch_status"));
+    const applyStatus = (data) => {
+      setStatus(data);
+      setError(null);
+      setLoading(false);
+    };
+
+    const streamStatus = async () => {
+      const response = await fetch(`${statusUrl}/events`, {
+        headers: { ...authHeaders(), Accept: 'text/event-stream' },
+        signal: controller.signal,
+      });
+      if (!response.ok || !response.body) throw new Error(`stream ${response.status}`);
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = '';
+      let last = null;
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) return last;
+        buffer += value;
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, end);
+          buffer = buffer.slice(end + 2);
+          const data = block
+            .split('\n')
+            .filter((line) => line.startsWith('data:'))
+            .map((line) => line.slice(5).trim())
+            .join('\n');
+          if (data) {
+            last = JSON.parse(data);
+            applyStatus(last);
+          }
         }
-      } catch (err) {
-        setError(t("connection_error"));
-      } finally {
-        setLoading(false);
       }
     };
 
-    // Fetch initial status
-    fetchStatus();
+    const pollStatus = async () => {
+      let etag = null;
+      while (!controller.signal.aborted) {
+        const headers = authHeaders();
+        if (etag) headers['If-None-Match'] = etag;
+        try {
+          const response = await fetch(`${statusUrl}/poll`, { headers, signal: controller.signal });
+          if (response.status === 304) continue;
+          if (!response.ok) {
+            setError(t("failed_to_fetch_status"));
+            setLoading(false);
+            return;
+          }
+          etag = response.headers.get('ETag');
+          const data = await response.json();
+          applyStatus(data);
+          if (isDone(data)) return;
+        } catch (err) {
+          if (controller.signal.aborted) return;
+          setError(t("connection_error"));
+          setLoading(false);
+          await new Promise((resolve) => setTimeout(resolve, 5000));
+        }
+      }
+    };
 
-    // Poll for updates every 3 seconds if not completed
-    const interval = setInterval(() => {
-      if (status?.status !== 'completed' && status?.status !== 'failed') {
-        fetchStatus();
+    const follow = async () => {
+      try {
+        const last = await streamStatus();
+        if (isDone(last)) return;
+      } catch (err) {
+        if (controller.signal.aborted) return;
       }
-    }, 3000);
+      // Stream unsupported or dropped before the job finished
+      await pollStatus();
+    };
 
-    return () => clearInterval(interval);
-  }, [jobId, status?.status, t]);
+    follow();
+    return () => controller.abort();
+  }, [jobId, retryRound, t]);
 
   const handleRetry = async () => {
     try {
@@ -55,6 +108,7 @@ const ProcessingStatus = ({ jobId, onClose }) => {
       if (response.ok) {
         setStatus({ ...status, status: 'pending', progress: 0 });
         setError(null);
+        setRetryRound((round) => round + 1);   // re-open the status stream
       } else {
         setError(t("failed_to_retry"));
       }
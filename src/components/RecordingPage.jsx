@@ -247,28 +247,44 @@ const RecordingPage = () => {
   };
 
   // Fetch patient suggestions as user types
+  // Debounced; a newer keystroke aborts the request still in flight
   useEffect(() => {
-    if (!patientName || patientName.trim().length === 0) {
+    const query = (patientName || "").trim();
+    if (query.length === 0) {
       setPatientSuggestions([]);
+      setIsLoadingSuggestions(false);
       return;
     }
-    setIsLoadingSuggestions(true);
-    const token = localStorage.getItem("access_token");
-    fetch(
-      `http://localhost:8000/patientsdb/mail-search?name=${encodeURIComponent(patientName)}`,
-      {
-        headers: { Authorization: `Bearer ${token}` },
-      }
-    )
-      .then((res) => res.json())
-      .then((data) => {
-        setPatientSuggestions(data);
-        setIsLoadingSuggestions(false);
-      })
-      .catch(() => {
-        setPatientSuggestions([]);
-        setIsLoadingSuggestions(false);
-      });
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      setIsLoadingSuggestions(true);
+      const token = localStorage.getItem("access_token");
+      fetch(
+        `http://localhost:8000/patientsdb/typeahead?field=email&q=${encodeURIComponent(query)}`,
+        {
+          headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal,
+        }
+      )
+        .then((res) => {
+          if (!res.ok) throw new Error("Search failed");
+          return res.json();
+        })
+        .then((data) => {
+          setPatientSuggestions(data);
+          setIsLoadingSuggestions(false);
+        })
+        .catch((err) => {
+          if (err.name === "AbortError") return;
+          setPatientSuggestions([]);
+          setIsLoadingSuggestions(false);
+        });
+    }, 250);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
   }, [patientName]);
 
   // Hide suggestions when clicking outside
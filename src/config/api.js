@@ -1 +1,17 @@
+/**
+ * Backend API location and endpoint paths
+ */
 
+export const API_CONFIG = {
+  BASE_URL: process.env.REACT_APP_API_URL || "http://localhost:8000",
+  ENDPOINTS: {
+    AUTH: {
+      LOGIN: "/auth/login",
+      REFRESH: "/auth/refresh",
+      LOGOUT: "/auth/logout",
+      VALIDATE: "/auth/validate",
+    },
+  },
+};
+
+export const buildApiUrl = (endpoint) => `${API_CONFIG.BASE_URL}${endpoint}`;
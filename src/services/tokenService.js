@@ -81,16 +81,16 @@ class TokenService {
   }
 
   /**
-   * Check if token is expired (client-side check)
+   * Check if token is expired, or will be within `skewSeconds` (client-side check)
    */
-  isTokenExpired(token) {
+  isTokenExpired(token, skewSeconds = 0) {
     if (!token) return true;
     
     const decoded = this.decodeToken(token);
     if (!decoded || !decoded.exp) return false; // No expiration set
     
     const currentTime = Date.now() / 1000;
-    return decoded.exp < currentTime;
+    return decoded.exp < currentTime + skewSeconds;
   }
 
   /**
@@ -102,8 +102,19 @@ class TokenService {
       throw new Error('No refresh token available');
     }
 
+    // One refresh at a time: refresh tokens are single-use (rotated)
+    if (this.refreshPromise) {
+      return this.refreshPromise;
+    }
+
     this.log('Attempting to refresh token');
+    this.refreshPromise = this.doRefresh(refreshToken).finally(() => {
+      this.refreshPromise = null;
+    });
+    return this.refreshPromise;
+  }
 
+  async doRefresh(refreshToken) {
     try {
       const response = await fetch(buildApiUrl(API_CONFIG.ENDPOINTS.AUTH.REFRESH), {
         method: 'POST',
@@ -140,8 +151,8 @@ class TokenService {
   async authenticatedFetch(url, options = {}) {
     let accessToken = this.getAccessToken();
 
-    // Check if token is expired and try to refresh
-    if (this.isTokenExpired(accessToken)) {
+    // Check if token is (about to be) expired and try to refresh
+    if (this.isTokenExpired(accessToken, 30)) {
       try {
         accessToken = await this.refreshToken();
       } catch (error) {
@@ -187,15 +198,16 @@ class TokenService {
    * Setup automatic token refresh
    */
   setupTokenRefresh() {
-    // Check token every 5 minutes
+    // Access tokens live 15 minutes: check every minute and renew ahead of
+    // expiry, so plain fetch() calls reading localStorage keep working
     setInterval(() => {
       const accessToken = this.getAccessToken();
-      if (accessToken && this.isTokenExpired(accessToken)) {
+      if (accessToken && this.getRefreshToken() && this.isTokenExpired(accessToken, 120)) {
         this.refreshToken().catch(() => {
           // Silent fail - user will be redirected to login when they make a request
         });
       }
-    }, 5 * 60 * 1000); // 5 minutes
+    }, 60 * 1000); // 1 minute
   }
 
   /**